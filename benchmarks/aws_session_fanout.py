@@ -0,0 +1,44 @@
+"""
+Sequential create_aws_session calls vs. create_aws_sessions fan-out, against the local stand-in API with injected latency.
+
+Run from the repository root: python -m benchmarks.aws_session_fanout [--accounts 200] [--latency 0.05] [--workers 16]
+"""
+import argparse
+import time
+
+from unittest import mock
+
+from vectrix.standin import StandInServer
+from vectrix.main import VectrixUtils
+
+
+def run(accounts: int, latency: float, workers: int):
+    account_pairs = [("arn:aws:iam::{0:012d}:role/vectrix".format(index), str(index)) for index in range(accounts)]
+    with StandInServer(latency=latency) as server, \
+            mock.patch("vectrix.graphql.client.API_URL", server.url), \
+            mock.patch("vectrix.main.PRODUCTION_MODE", True), \
+            mock.patch("vectrix.main.activate_sentry"), \
+            mock.patch("vectrix.main.CREDENTIAL_CACHE", False):
+        utils = VectrixUtils()
+        started = time.perf_counter()
+        for role_arn, external_id in account_pairs:
+            utils.create_aws_session(aws_role_arn=role_arn, aws_external_id=external_id)
+        sequential = time.perf_counter() - started
+
+        utils = VectrixUtils()
+        started = time.perf_counter()
+        errors = [result.error for result in utils.create_aws_sessions(account_pairs, max_workers=workers) if result.error]
+        fan_out = time.perf_counter() - started
+
+    print(f"accounts={accounts} latency={latency * 1000:.0f}ms workers={workers}")
+    print(f"sequential create_aws_session: {sequential:.2f}s ({accounts / sequential:.0f} sessions/s)")
+    print(f"create_aws_sessions fan-out:   {fan_out:.2f}s ({accounts / fan_out:.0f} sessions/s, {sequential / fan_out:.1f}x, {len(errors)} errors)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=16)
+    arguments = parser.parse_args()
+    run(arguments.accounts, arguments.latency, arguments.workers)
@@ -0,0 +1,72 @@
+"""
+snake_case -> camelCase conversion: the previous uncached, recursive implementation vs. the memoized, iterative one.
+
+Run from the repository root: python -m benchmarks.key_conversion [--items 100000]
+"""
+import argparse
+import time
+
+from vectrix.graphql.utils import convert, snake_case_to_camel_case, vectrix_item_converter
+
+
+def previous_convert(snake_str):
+    components = snake_str.split('_')
+    return components[0] + ''.join(x.title() for x in components[1:])
+
+
+def previous_snake_case_to_camel_case(input):
+    if isinstance(input, str):
+        return previous_convert(input)
+    formatted_dict = {}
+    for item in input:
+        if isinstance(input[item], dict):
+            formatted_dict[previous_convert(item)] = previous_snake_case_to_camel_case(input[item])
+        else:
+            formatted_dict[previous_convert(item)] = input[item]
+    return formatted_dict
+
+
+def previous_vectrix_item_converter(item_list):
+    import json
+    return [{('metadata' if key == 'metadata' else previous_snake_case_to_camel_case(key)):
+             (str(json.dumps(item['metadata'])) if key == 'metadata' else item[key]) for key in item} for item in item_list]
+
+
+def generate_items(count: int):
+    return [{"type": "aws_s3_bucket", "id": "arn:aws:s3:::sample-id-{0}".format(index), "display_name": "Bucket",
+             "link": "https://localhost.com", "asset_id": ["arn"], "event_time": index, "metadata": {}} for index in range(count)]
+
+
+def timed(function, repeat: int = 3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(item_count: int):
+    items = generate_items(item_count)
+    keys = [key for item in items for key in item]
+    variables = {"input{0}".format(index): {"log_type": "LOG", "log_visibility": "INTERNAL", "log_message": "message",
+                                             "log_context": {"aws_account_number": "123", "aws_region": "us-east-1"}}
+                 for index in range(100)}
+
+    results = [
+        ("convert (per key)", lambda: [previous_convert(key) for key in keys], lambda: [convert(key) for key in keys]),
+        ("vectrix_item_converter", lambda: previous_vectrix_item_converter(items), lambda: vectrix_item_converter(items)),
+        ("snake_case_to_camel_case (variables)", lambda: [previous_snake_case_to_camel_case(variables) for _ in range(1000)],
+         lambda: [snake_case_to_camel_case(variables) for _ in range(1000)]),
+    ]
+    print(f"items={item_count} keys={len(keys)}")
+    for name, previous, current in results:
+        previous_time, current_time = timed(previous), timed(current)
+        print(f"{name:<40} previous {previous_time:.3f}s  current {current_time:.3f}s  ({previous_time / current_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    run(parser.parse_args().items)
@@ -0,0 +1,71 @@
+"""
+Memory held by a scan's assets as dicts, as Asset objects, and as an AssetBatch.
+
+Run from the repository root: python -m benchmarks.model_memory [--assets 200000]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from vectrix.assets import Asset
+from vectrix.batch import AssetBatch
+
+
+class DictAsset:
+    """
+    Asset as it was before __slots__ (per-instance __dict__)
+    """
+
+    def __init__(self, type, id, display_name, metadata, link=None):
+        self._display_name = display_name
+        self._id = id
+        self._link = link
+        self._metadata = metadata
+        self._type = type
+
+
+def asset_fields(count: int):
+    for index in range(count):
+        # Built per asset, as a pack decoding API responses would
+        asset_type = "_".join(["aws", "s3", "bucket"])
+        yield dict(type=asset_type, id="arn:aws:s3:::sample-id-{0}".format(index),
+                   display_name="Bucket: sample-id-{0}".format(index), link="https://localhost.com",
+                   metadata={"aws_s3_bucket_name": {"priority": 50, "value": "sample-id-{0}".format(index)}})
+
+
+def build_batch(count: int):
+    batch = AssetBatch()
+    for fields in asset_fields(count):
+        batch.append(**fields)
+    return batch
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    held = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return size
+
+
+def run(count: int):
+    representations = [
+        ("dicts", lambda: [fields for fields in asset_fields(count)]),
+        ("Asset objects (__dict__)", lambda: [DictAsset(**fields) for fields in asset_fields(count)]),
+        ("Asset objects (__slots__)", lambda: [Asset(**fields) for fields in asset_fields(count)]),
+        ("AssetBatch", lambda: build_batch(count)),
+    ]
+    print(f"assets={count}")
+    baseline = None
+    for name, build in representations:
+        size = measure(build)
+        baseline = baseline or size
+        print(f"{name:<28} {size / 1e6:8.1f} MB  {size / count:6.0f} B/asset  ({size / baseline:.2f}x dicts)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--assets", type=int, default=200000)
+    run(parser.parse_args().assets)
@@ -0,0 +1,65 @@
+"""
+Encoding an output request body for a large scan: converted payload + requests json= (previous path) vs. the single-pass encoder.
+
+Run from the repository root: python -m benchmarks.output_encoder [--assets 100000]
+"""
+import argparse
+import json
+import time
+
+from vectrix.graphql.encoder import encode_output_body, json_backend
+from vectrix.graphql.routes import GraphQLRoutes
+from vectrix.graphql.utils import snake_case_to_camel_case
+from vectrix.main import output_variables
+
+
+def generate_assets(count: int):
+    return [{
+        "type": "aws_s3_bucket",
+        "id": "arn:aws:s3:::sample-id-{0}".format(index),
+        "display_name": "Bucket: Sample ID {0}".format(index),
+        "link": "https://s3.console.aws.amazon.com/s3/buckets/sample-id-{0}".format(index),
+        "metadata": {
+            "aws_s3_bucket_name": {"priority": 50, "value": "sample-id-{0}".format(index)},
+            "aws_region": {"priority": 10, "value": "us-east-1"},
+            "aws_account_number": {"priority": -1, "value": "123456789012"}
+        }
+    } for index in range(count)]
+
+
+def previous_body(assets, state):
+    variables = snake_case_to_camel_case(output_variables(assets, [], [], state))
+    return json.dumps({"query": GraphQLRoutes.OUTPUT_RESULTS.value, "variables": variables}, allow_nan=False).encode("utf-8")
+
+
+def timed(function, repeat: int = 3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(asset_count: int):
+    assets, state = generate_assets(asset_count), {"cursor": "abc"}
+    query = GraphQLRoutes.OUTPUT_RESULTS.value
+
+    baseline, baseline_body = timed(lambda: previous_body(assets, state))
+    print(f"assets={asset_count}")
+    print(f"converted payload + json=:       {baseline:.3f}s ({len(baseline_body) / 1e6:.1f} MB)")
+    for name in ("json", "orjson"):
+        try:
+            backend = json_backend(name)
+        except ImportError:
+            print(f"single-pass encoder ({name}):     not installed")
+            continue
+        elapsed, body = timed(lambda: encode_output_body(query, assets, [], [], state, backend=backend))
+        print(f"single-pass encoder ({name}):{' ' * (11 - len(name))}{elapsed:.3f}s ({len(body) / 1e6:.1f} MB, {baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--assets", type=int, default=100000)
+    run(parser.parse_args().assets)
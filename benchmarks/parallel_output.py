@@ -0,0 +1,48 @@
+"""
+Validating and encoding a large output in-process vs. with a pool of 1/2/4/8 worker processes.
+
+Run from the repository root: python -m benchmarks.parallel_output [--assets 200000]
+"""
+import argparse
+import os
+import time
+
+from vectrix.checks import output_type_check
+from vectrix.graphql.encoder import encode_output_body, json_backend
+from vectrix.graphql.routes import GraphQLRoutes
+from vectrix.parallel import parallel_output_check, process_pool
+
+from .output_encoder import generate_assets, timed
+
+
+def generate_issues(assets):
+    return [{
+        "issue": "Public S3 Bucket",
+        "asset_id": [asset["id"]],
+        "metadata": {"aws_s3_bucket_name": {"priority": 50, "value": asset["id"]}}
+    } for asset in assets[::4]]
+
+
+def run(asset_count: int):
+    assets = generate_assets(asset_count)
+    issues = generate_issues(assets)
+    backend, state, query = json_backend(), {"cursor": "abc"}, GraphQLRoutes.OUTPUT_RESULTS.value
+
+    def serial():
+        output_type_check(assets, issues, [])
+        return encode_output_body(query, assets, issues, [], state, backend=backend)
+
+    baseline, _ = timed(serial)
+    print(f"assets={asset_count} issues={len(issues)} cpus={os.cpu_count()} backend={backend.name}")
+    print(f"in-process:  {baseline:.3f}s")
+    for workers in (1, 2, 4, 8):
+        # Start the workers outside of the timed runs; the pool is reused across outputs
+        process_pool(workers).submit(int).result()
+        elapsed, _ = timed(lambda: parallel_output_check(assets, issues, [], workers, backend=backend))
+        print(f"{workers} worker{'s' if workers > 1 else ' '}:   {elapsed:.3f}s ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--assets", type=int, default=200000)
+    run(parser.parse_args().assets)
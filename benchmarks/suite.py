@@ -0,0 +1,242 @@
+"""
+Benchmark suite of the SDK's hot paths on a synthetic workload, with stored baselines to catch regressions.
+
+Run from the repository root:
+    python -m benchmarks.suite                     compare against benchmarks/baselines.json
+    python -m benchmarks.suite --save              record new baselines
+    python -m benchmarks.suite --cases output_type_check,output_production --assets 50000
+
+Throughput is the best of --repeat runs; peak memory is traced (tracemalloc) over one extra run. Exits with status 1 when a
+case's throughput drops, or its peak memory grows, by more than --tolerance relative to its baseline. Baselines are only
+comparable on the machine and workload they were recorded with.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from vectrix import vectrix, MetadataElement
+from vectrix import main as vectrix_main
+from vectrix.checks import output_type_check
+from vectrix.graphql import client as graphql_client_module
+from vectrix.graphql.utils import snake_case_to_camel_case, vectrix_item_converter
+
+from .workload import generate_workload
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+
+class MockResponse:
+    status_code = 200
+
+    @staticmethod
+    def json():
+        return {"data": {"deploymentScanEntryCreate": {"errors": []}}}
+
+
+class MockTransport:
+    """
+    Stands in for GraphQLTransport: request bodies are accepted (and counted) without being sent
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+
+    def post(self, url: str, payload: dict):
+        return self.post_body(url, json.dumps(payload).encode("utf-8"))
+
+    def post_body(self, url: str, body: bytes):
+        self.requests += 1
+        self.bytes += len(body)
+        return MockResponse()
+
+
+@contextlib.contextmanager
+def production_mode():
+    """
+    Runs VectrixUtils.output in production mode against a MockTransport
+    """
+    transport, mode = graphql_client_module._transport, vectrix_main.PRODUCTION_MODE
+    graphql_client_module._transport, vectrix_main.PRODUCTION_MODE = MockTransport(), True
+    try:
+        yield
+    finally:
+        graphql_client_module._transport, vectrix_main.PRODUCTION_MODE = transport, mode
+
+
+def item_count(workload: dict):
+    return sum(len(workload[kind]) for kind in ("assets", "issues", "events"))
+
+
+def metadata_elements(workload: dict):
+    return [element for kind in ("assets", "issues", "events") for item in workload[kind] for element in item["metadata"].values()]
+
+
+def case_output_type_check(workload):
+    return lambda: output_type_check(workload["assets"], workload["issues"], workload["events"]), item_count(workload)
+
+
+def case_vectrix_item_converter(workload):
+    def run():
+        for kind in ("assets", "issues", "events"):
+            vectrix_item_converter(workload[kind])
+    return run, item_count(workload)
+
+
+def case_snake_case_to_camel_case(workload):
+    variables = {"input": {kind: workload[kind] for kind in ("assets", "issues", "events")}}
+    return lambda: snake_case_to_camel_case(variables), item_count(workload)
+
+
+def case_metadata_element(workload):
+    elements = [(element["priority"], element["value"], element.get("link")) for element in metadata_elements(workload)]
+    return lambda: [MetadataElement(priority, value, link).to_dict() for priority, value, link in elements], len(elements)
+
+
+def case_output_development(workload):
+    def run():
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            vectrix.output(assets=list(workload["assets"]), issues=list(workload["issues"]), events=list(workload["events"]))
+    return run, item_count(workload)
+
+
+def case_output_production(workload):
+    def run():
+        with production_mode():
+            vectrix.output(assets=list(workload["assets"]), issues=list(workload["issues"]), events=list(workload["events"]))
+    return run, item_count(workload)
+
+
+CASES = {
+    "output_type_check": case_output_type_check,
+    "vectrix_item_converter": case_vectrix_item_converter,
+    "snake_case_to_camel_case": case_snake_case_to_camel_case,
+    "metadata_element": case_metadata_element,
+    "output_development": case_output_development,
+    "output_production": case_output_production,
+}
+
+
+def measure(run, repeat: int):
+    """
+    :returns: (best time of repeat runs in seconds, peak traced memory of one run in bytes)
+    """
+    best = None
+    # As with timeit, the garbage collector is off while timing, so collections of the (large) workload don't land at random in a run
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        gc.enable()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def load_baselines(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def regressions(name: str, result: dict, baseline: dict, tolerance: float):
+    found = []
+    if result["items_per_second"] < baseline["items_per_second"] * (1 - tolerance):
+        found.append(f"{name}: throughput {result['items_per_second']:.0f} items/s vs. baseline {baseline['items_per_second']:.0f}")
+    if result["peak_bytes"] > baseline["peak_bytes"] * (1 + tolerance):
+        found.append(f"{name}: peak memory {result['peak_bytes'] / 1e6:.1f} MB vs. baseline {baseline['peak_bytes'] / 1e6:.1f} MB")
+    return found
+
+
+def run(workload_options: dict, cases: list, repeat: int, baselines_path: str, save: bool, tolerance: float):
+    workload = generate_workload(**workload_options)
+    baselines = None if save else load_baselines(baselines_path)
+    if baselines is not None and baselines.get("workload") != workload_options:
+        print(f"baselines in {baselines_path} were recorded with a different workload, not comparing")
+        baselines = None
+
+    print(f"workload: {workload_options}")
+    print(f"{'case':<26}{'items':>9}{'seconds':>10}{'items/s':>12}{'peak MB':>10}{'vs. baseline':>14}")
+    results, found = {}, []
+    for name in cases:
+        case_run, items = CASES[name](workload)
+        seconds, peak = measure(case_run, repeat)
+        result = results[name] = {"items_per_second": items / seconds, "peak_bytes": peak}
+        comparison = ""
+        baseline = baselines["cases"].get(name) if baselines is not None else None
+        if baseline is not None:
+            comparison = f"{result['items_per_second'] / baseline['items_per_second'] - 1:+.0%}"
+            found.extend(regressions(name, result, baseline, tolerance))
+        print(f"{name:<26}{items:>9}{seconds:>10.3f}{result['items_per_second']:>12.0f}{peak / 1e6:>10.1f}{comparison:>14}")
+
+    if save:
+        recorded = load_baselines(baselines_path) or {}
+        if recorded.get("workload") != workload_options:
+            recorded = {"cases": {}}
+        recorded.update({"workload": workload_options, "python": platform.python_version(), "machine": platform.machine()})
+        recorded["cases"].update(results)
+        with open(baselines_path, "w") as f:
+            json.dump(recorded, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baselines saved to {baselines_path}")
+    for regression in found:
+        print(f"REGRESSION {regression}")
+    return 1 if found else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--assets", type=int, default=10000)
+    parser.add_argument("--issue-ratio", type=float, default=0.25)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--metadata-width", type=int, default=8)
+    parser.add_argument("--list-metadata", type=int, default=2)
+    parser.add_argument("--list-length", type=int, default=5)
+    parser.add_argument("--cases", default=",".join(CASES), help="comma separated subset of: " + ", ".join(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--save", action="store_true", help="record the results as the new baselines")
+    arguments = parser.parse_args(argv)
+
+    cases = arguments.cases.split(",")
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    workload_options = {"assets": arguments.assets, "issue_ratio": arguments.issue_ratio, "events": arguments.events,
+                        "metadata_width": arguments.metadata_width, "list_metadata": arguments.list_metadata,
+                        "list_length": arguments.list_length}
+
+    baselines_path, working_directory = os.path.abspath(arguments.baselines), os.getcwd()
+    # Development mode output keeps its .vectrix directory (state, last scan results) in a scratch directory
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            os.mkdir(".vectrix")
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                vectrix.get_state()
+            return run(workload_options, cases, arguments.repeat, baselines_path, arguments.save, arguments.tolerance)
+        finally:
+            os.chdir(working_directory)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Validating an unchanged output: strict validation vs. cached validation with a warm cache.
+
+Run from the repository root: python -m benchmarks.validation_cache [--assets 100000] [--metadata 10]
+"""
+import argparse
+
+from vectrix.checks import output_type_check
+from vectrix.validation_cache import ValidationCache, HASH_ENCODER
+
+from .output_encoder import timed
+
+
+def generate_assets(count: int, metadata_count: int):
+    return [{
+        "type": "aws_s3_bucket",
+        "id": "arn:aws:s3:::sample-id-{0}".format(index),
+        "display_name": "Bucket: Sample ID {0}".format(index),
+        "link": "https://s3.console.aws.amazon.com/s3/buckets/sample-id-{0}".format(index),
+        "metadata": {"aws_s3_key_{0}".format(key): {"priority": 50, "value": "value-{0}".format(index)}
+                     for key in range(metadata_count)}
+    } for index in range(count)]
+
+
+def run(asset_count: int, metadata_count: int):
+    assets = generate_assets(asset_count, metadata_count)
+    cache = ValidationCache(max_size=asset_count)
+    output_type_check(assets, [], [], "cached", cache=cache)
+
+    strict, _ = timed(lambda: output_type_check(assets, [], [], "strict"))
+    cached, _ = timed(lambda: output_type_check(assets, [], [], "cached", cache=cache))
+    print(f"assets={asset_count} metadata elements={metadata_count} hashing={HASH_ENCODER}")
+    print(f"strict:        {strict:.3f}s")
+    print(f"cached (warm): {cached:.3f}s ({strict / cached:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--assets", type=int, default=100000)
+    parser.add_argument("--metadata", type=int, default=10)
+    arguments = parser.parse_args()
+    run(arguments.assets, arguments.metadata)
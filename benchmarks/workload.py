@@ -0,0 +1,80 @@
+"""
+Synthetic scan populations for the benchmarks: assets of a handful of types, issues referencing them, and events,
+with a configurable number of metadata elements per item (some of them list-valued, some with links).
+"""
+import random
+
+ASSET_TYPES = (
+    ("aws_s3_bucket", "Bucket", "arn:aws:s3:::{name}"),
+    ("aws_ec2_instance", "Instance", "arn:aws:ec2:us-east-1:123456789012:instance/{name}"),
+    ("aws_iam_role", "Role", "arn:aws:iam::123456789012:role/{name}"),
+    ("aws_iam_accessKey", "Access Key", "arn:aws:iam::123456789012:user/{name}/accessKey"),
+    ("github_repository", "Repository", "https://github.com/example/{name}"),
+)
+ISSUES = ("Public S3 Bucket", "Unencrypted Volume", "Stale Access Key", "Overly Permissive Role", "Missing Branch Protection")
+EVENTS = ("S3 Bucket Created", "Console Login", "Access Key Rotated", "Role Assumed")
+PRIORITIES = (-1, 0, 10, 50, 100)
+REGIONS = ("us-east-1", "us-west-2", "eu-west-1", "ap-southeast-2")
+
+
+def metadata(rng: random.Random, prefix: str, index: int, width: int, list_width: int, list_length: int):
+    """
+    width metadata elements, of which list_width have list values of list_length strings. Every fifth scalar element has a link.
+    """
+    elements = {}
+    for key in range(width):
+        element = {"priority": PRIORITIES[key % len(PRIORITIES)]}
+        if key < list_width:
+            element["value"] = ["{0}-tag-{1}-{2}".format(prefix, index, position) for position in range(list_length)]
+        elif key % 5 == 4:
+            element["value"] = "see https://console.example.com/{0}/{1}".format(prefix, index)
+            element["link"] = "https://console.example.com/{0}/{1}".format(prefix, index)
+        else:
+            element["value"] = "{0}-{1}".format(REGIONS[rng.randrange(len(REGIONS))], index)
+        elements["{0}_field_{1}".format(prefix.lower(), key)] = element
+    return elements
+
+
+def generate_workload(assets: int = 10000, issue_ratio: float = 0.25, events: int = 2000, metadata_width: int = 8,
+                      list_metadata: int = 2, list_length: int = 5, seed: int = 0):
+    """
+    :params: assets - number of assets
+    :params: issue_ratio - number of issues per asset; each issue references one to three assets
+    :params: events - number of events
+    :params: metadata_width - metadata elements per item
+    :params: list_metadata - how many of the metadata elements have list values
+    :params: list_length - strings per list value
+    :returns: dict of 'assets', 'issues', and 'events' lists of dicts, valid output for VectrixUtils.output
+    """
+    rng = random.Random(seed)
+    generated_assets = []
+    for index in range(assets):
+        asset_type, label, id_format = ASSET_TYPES[index % len(ASSET_TYPES)]
+        name = "resource-{0}".format(index)
+        asset = {
+            "type": asset_type,
+            "id": id_format.format(name=name),
+            "display_name": "{0}: {1}".format(label, name),
+            "metadata": metadata(rng, asset_type, index, metadata_width, list_metadata, list_length)
+        }
+        if index % 2 == 0:
+            asset["link"] = "https://console.example.com/{0}/{1}".format(asset_type, name)
+        generated_assets.append(asset)
+
+    generated_issues = []
+    for index in range(int(assets * issue_ratio)):
+        referenced = rng.sample(generated_assets, min(rng.randint(1, 3), assets))
+        generated_issues.append({
+            "issue": ISSUES[index % len(ISSUES)],
+            "asset_id": [asset["id"] for asset in referenced],
+            "metadata": metadata(rng, "issue", index, metadata_width, list_metadata, list_length)
+        })
+
+    generated_events = [{
+        "event": EVENTS[index % len(EVENTS)],
+        "event_time": 1609459200 + index,
+        "display_name": "Event: {0}".format(index),
+        "metadata": metadata(rng, "event", index, metadata_width, list_metadata, list_length)
+    } for index in range(events)]
+
+    return {"assets": generated_assets, "issues": generated_issues, "events": generated_events}
@@ -0,0 +1,49 @@
+import pytest
+from tests import vectrix
+
+from vectrix.standin import StandInServer
+from .test_vectrix import correct_asset, correct_issue, correct_event
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "standin(**options): StandInServer options of the standin fixture")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def development_directory(tmp_path_factory):
+    """
+    Runs the tests from a temporary directory, so local development mode files (.vectrix/) are never written into the repository.
+    vectrix is initialized lazily; initialize it in local development mode before any test patches PRODUCTION_MODE
+    """
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(tmp_path_factory.mktemp("development"))
+        vectrix.prefetch().result()
+        yield
+
+
+@pytest.fixture
+def standin(request, mocker):
+    """
+    StandInServer that vectrix (and AsyncVectrixUtils) send their requests to in production mode.
+    Options of the server are given with the standin marker, e.g. @pytest.mark.standin(latency=0.01)
+    """
+    marker = request.node.get_closest_marker("standin")
+    with StandInServer(**(marker.kwargs if marker else {})) as server:
+        mocker.patch("vectrix.graphql.client.API_URL", server.url)
+        mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+        mocker.patch("vectrix.aio.PRODUCTION_MODE", True)
+        mocker.patch("vectrix.main.activate_sentry")
+        yield server
+
+
+def generate_scan(count):
+    """
+    Valid scan of count assets, each with an issue referencing it and an event
+    """
+    assets, issues, events = [], [], []
+    for index in range(count):
+        asset_id = "arn:aws:s3:::sample-id-{0}".format(index)
+        assets.append(dict(correct_asset[0], id=asset_id))
+        issues.append(dict(correct_issue[0], asset_id=[asset_id]))
+        events.append(dict(correct_event[0], event_time=1596843510 + index))
+    return {"assets": assets, "issues": issues, "events": events}
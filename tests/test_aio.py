@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import json
+import pytest
+from pytest_mock import mocker
+
+from .conftest import generate_scan
+from .test_vectrix import correct_asset, correct_issue, correct_event
+from vectrix import AsyncVectrixUtils, VectrixUtils
+from vectrix.graphql.routes import GraphQLRoutes
+from tests import vectrix
+
+pytestmark = pytest.mark.standin(latency=0.01)
+
+
+def test_async_bounded_concurrency(standin):
+    async_vectrix = AsyncVectrixUtils(max_in_flight=4)
+
+    async def scan():
+        return await asyncio.gather(*[async_vectrix.get_last_scan_results() for _ in range(40)])
+
+    asyncio.run(scan())
+    async_vectrix.close()
+
+    assert len(standin.requests_for(GraphQLRoutes.GET_LAST_SCAN_RESULTS)) == 40
+    assert 1 < standin.max_in_flight <= 4
+
+
+def test_async_logs_are_shipped_with_the_singleton(standin):
+    async_vectrix = AsyncVectrixUtils()
+    assert async_vectrix.utils is vectrix
+
+    async def scan():
+        await asyncio.gather(*[async_vectrix.log("account {0}".format(index)) for index in range(40)])
+        await async_vectrix.external_error("denied")
+
+    asyncio.run(scan())
+    vectrix.flush_logs()
+    async_vectrix.close()
+
+    assert len(standin.logs) == 41
+    assert sorted(log["logMessage"] for log in standin.logs[:40]) == sorted("account {0}".format(index) for index in range(40))
+    assert standin.logs[40] == {"logType": "ERROR", "logVisibility": "EXTERNAL", "logMessage": "denied"}
+    assert len(standin.requests_for(GraphQLRoutes.CREATE_LOG)) < 41
+
+
+def test_async_output_and_last_scan_results(standin):
+    async_vectrix = AsyncVectrixUtils()
+
+    async def scan():
+        await async_vectrix.output(**generate_scan(3))
+        return await async_vectrix.get_last_scan_results()
+
+    results = asyncio.run(scan())
+
+    assert standin.last_scan["assets"][0]["displayName"] == "Bucket: Sample ID"
+    assert results == {kind: standin.last_scan[kind] for kind in ("assets", "issues", "events")}
+    async_vectrix.close()
+
+
+def test_async_output_options_match_output(standin):
+    async_vectrix = AsyncVectrixUtils()
+    asyncio.run(async_vectrix.output(**generate_scan(3), validation="off", report_metrics=True))
+    vectrix.flush_logs()
+
+    assert len(standin.requests_for(GraphQLRoutes.OUTPUT_RESULTS)) == 1
+    assert [log for log in standin.logs if log["logMessage"].startswith("Vectrix SDK metrics: ")]
+    with pytest.raises(ValueError):
+        asyncio.run(async_vectrix.output(assets=list(correct_asset), issues=[], events=[], workers=2, validation="cached"))
+    async_vectrix.close()
+
+
+def test_async_create_aws_sessions(standin):
+    async_vectrix = AsyncVectrixUtils(max_in_flight=8)
+
+    async def fan_out():
+        return await asyncio.gather(*[async_vectrix.create_aws_session(aws_role_arn="arn", aws_external_id=str(index))
+                                      for index in range(16)])
+
+    sessions = asyncio.run(fan_out())
+    async_vectrix.close()
+
+    assert [session.get_credentials().access_key for session in sessions] == ["AKIA{0}".format(index) for index in range(16)]
+
+
+def test_async_log_type_check():
+    with pytest.raises(ValueError) as excinfo:
+        asyncio.run(AsyncVectrixUtils(VectrixUtils()).log(1))
+    assert "log requires str type parameter containing log message" == str(excinfo.value)
+
+
+def test_async_development_mode_output(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".vectrix").mkdir()
+    async_vectrix = AsyncVectrixUtils(VectrixUtils())
+
+    asyncio.run(async_vectrix.output(assets=list(correct_asset), issues=list(correct_issue), events=list(correct_event)))
+
+    assert json.loads((tmp_path / ".vectrix" / "last_scan_results.json").read_text()) == {
+        "assets": correct_asset, "issues": correct_issue, "events": correct_event}
+    assert asyncio.run(async_vectrix.get_last_scan_results()) == {
+        "assets": correct_asset, "issues": correct_issue, "events": correct_event}
+
+
+def test_async_output_does_not_block_the_event_loop(standin, mocker):
+    async_vectrix = AsyncVectrixUtils()
+    loop_threads = set()
+    blocking_threads = []
+    flush_logs = vectrix.flush_logs
+    mocker.patch.object(vectrix, "flush_logs", side_effect=lambda: blocking_threads.append(threading.get_ident()) or flush_logs())
+
+    async def scan():
+        loop_threads.add(threading.get_ident())
+        await async_vectrix.log("account 1")
+        await async_vectrix.output(**generate_scan(3))
+
+    asyncio.run(scan())
+    async_vectrix.close()
+
+    assert blocking_threads and loop_threads.isdisjoint(blocking_threads)
+    assert standin.logs[-1]["logMessage"] == "account 1"
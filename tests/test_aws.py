@@ -0,0 +1,130 @@
+import time
+import threading
+import boto3
+import pytest
+from botocore.config import Config
+
+from vectrix.aws import AwsClientPool, shared_loader
+from vectrix.main import VectrixUtils
+
+
+def make_session():
+    return boto3.Session(aws_access_key_id="AKIA", aws_secret_access_key="secret", aws_session_token="token",
+                         region_name="us-east-1")
+
+
+def test_client_pool_reuses_clients():
+    pool = AwsClientPool(max_pool_connections=32)
+    session = make_session()
+
+    client = pool.client(session, "s3")
+
+    assert pool.client(session, "s3") is client
+    assert pool.client(session, "s3", config=Config(retries={"max_attempts": 2})) is not client
+    assert pool.client(session, "s3", config=Config(retries={"max_attempts": 2})) is pool.client(
+        session, "s3", config=Config(retries={"max_attempts": 2}))
+    assert pool.client(session, "s3", region_name="eu-west-1").meta.region_name == "eu-west-1"
+    assert pool.client(make_session(), "s3") is not client
+    assert client.meta.config.max_pool_connections == 32
+    assert pool.client(session, "ec2", config=Config(max_pool_connections=5)).meta.config.max_pool_connections == 5
+    assert pool.stats() == {"created": 5, "reused": 3, "max_pool_connections": 32}
+
+
+def test_client_pool_shares_service_models():
+    pool = AwsClientPool()
+    sessions = [make_session(), make_session()]
+
+    for session in sessions:
+        pool.client(session, "sts")
+
+    assert all(session._session.get_component("data_loader") is shared_loader() for session in sessions)
+
+
+def test_client_pool_threads_share_one_client():
+    pool = AwsClientPool()
+    session = make_session()
+    clients = []
+
+    def scan():
+        clients.append(pool.client(session, "s3"))
+
+    threads = [threading.Thread(target=scan) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(map(id, clients))) == 1
+    assert pool.stats()["created"] == 1
+
+
+def test_client_pool_creates_clients_of_different_sessions_in_parallel(mocker):
+    pool = AwsClientPool()
+    sessions = [make_session(), make_session()]
+    # Each client creation waits for the other one, which only finishes if they aren't serialized
+    barrier = threading.Barrier(2, timeout=5)
+
+    def create_client(*args, **kwargs):
+        barrier.wait()
+        return object()
+    for session in sessions:
+        mocker.patch.object(session, "client", side_effect=create_client)
+    clients = []
+
+    threads = [threading.Thread(target=lambda session=session: clients.append(pool.client(session, "s3"))) for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(clients) == 2
+    assert pool.stats()["created"] == 2
+
+
+def test_client_pool_creates_clients_of_one_session_one_at_a_time(mocker):
+    pool = AwsClientPool()
+    session = make_session()
+    creating = []
+    overlaps = []
+
+    def create_client(*args, **kwargs):
+        creating.append(1)
+        overlaps.append(len(creating))
+        time.sleep(0.01)
+        creating.pop()
+        return object()
+    mocker.patch.object(session, "client", side_effect=create_client)
+
+    threads = [threading.Thread(target=pool.client, args=(session, service_name)) for service_name in ("s3", "ec2", "sts", "iam")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert overlaps == [1, 1, 1, 1]
+    assert pool.stats()["created"] == 4
+
+
+def test_client_pool_resources_are_per_thread():
+    pool = AwsClientPool()
+    session = make_session()
+    resource = pool.resource(session, "s3")
+    other_thread = []
+
+    thread = threading.Thread(target=lambda: other_thread.append(pool.resource(session, "s3")))
+    thread.start()
+    thread.join()
+
+    assert pool.resource(session, "s3") is resource
+    assert other_thread[0] is not resource
+
+
+def test_client_pool_validation():
+    with pytest.raises(ValueError):
+        AwsClientPool(max_pool_connections=0)
+
+
+def test_vectrix_aws_client():
+    utils = VectrixUtils()
+    session = make_session()
+    assert utils.aws_client(session, "s3") is utils.aws_client(session, "s3")
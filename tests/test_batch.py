@@ -0,0 +1,110 @@
+import json
+import pytest
+from pytest_mock import mocker
+from tests import vectrix
+
+from vectrix.standin import StandInServer
+from .conftest import generate_scan
+from .test_vectrix import correct_asset, correct_issue, correct_event
+from vectrix import Asset, Issue, Event, MetadataElement, MetadataPriority
+from vectrix.batch import AssetBatch, IssueBatch, EventBatch
+from vectrix.graphql.encoder import StdlibJSONBackend, encode_output_body
+from vectrix.graphql.routes import GraphQLRoutes
+
+
+def make_batches(count):
+    scan = generate_scan(count)
+    assets, issues, events = AssetBatch(), IssueBatch(), EventBatch(scan["events"])
+    for index, asset in enumerate(scan["assets"]):
+        assets.append(**dict(asset, type="aws_s3_" + "bucket", link=asset["link"] if index % 2 else None))
+    issues.extend(scan["issues"])
+    return assets, issues, events
+
+
+def test_models_use_slots():
+    asset = Asset(type="aws_s3_bucket", id="arn:aws:s3:::sample-id", display_name="Bucket: Sample ID",
+                  metadata=correct_asset[0]["metadata"], link="https://localhost.com")
+    assert asset.to_dict() == correct_asset[0]
+    asset.link = None
+    assert "link" not in asset.to_dict()
+
+    issue = Issue(issue="Public S3 Bucket", asset_id=["arn:aws:s3:::sample-id"], metadata=correct_issue[0]["metadata"])
+    assert issue.to_dict() == correct_issue[0]
+    event = Event(event="S3 Bucket Created", event_time=1596843510, display_name="Bucket: Storage Bucket created",
+                  metadata=correct_event[0]["metadata"])
+    assert event.to_dict() == correct_event[0]
+
+    for model in (asset, issue, event, MetadataElement(MetadataPriority.LOW, "value")):
+        assert not hasattr(model, "__dict__")
+
+
+def test_batch_columns():
+    assets, _, _ = make_batches(3)
+
+    assert len(assets) == 3
+    assert assets.column("type")[0] is assets.column("type")[2]
+    assert assets[0] == {"type": "aws_s3_bucket", "id": "arn:aws:s3:::sample-id-0", "display_name": "Bucket: Sample ID",
+                         "metadata": correct_asset[0]["metadata"]}
+    assert assets.to_dicts()[1]["link"] == "https://localhost.com"
+    assert AssetBatch(correct_asset + [Asset(**{key: value for key, value in correct_asset[0].items()})]).to_dicts() == correct_asset * 2
+
+
+def test_batch_rejects_unknown_keys():
+    with pytest.raises(ValueError) as excinfo:
+        IssueBatch([dict(correct_issue[0], display_name="Issue: Public")])
+    assert "issue dict does not allow key 'display_name'" in str(excinfo.value)
+
+
+def test_batch_encoding_matches_lists():
+    batches = make_batches(20)
+    lists = [batch.to_dicts() for batch in batches]
+
+    assert encode_output_body("query", *batches, {}, backend=StdlibJSONBackend()) == encode_output_body(
+        "query", *lists, {}, backend=StdlibJSONBackend())
+
+
+@pytest.mark.parametrize("change, message", [
+    (lambda assets, issues: assets.append("Aws_s3_bucket", "x", "Bucket: x", {}), "asset type vendor instantiation"),
+    (lambda assets, issues: assets.append("aws_s3_bucket", "x", None, {}), "asset dict requires 'display_name' key"),
+    (lambda assets, issues: assets.append("aws_s3_bucket", "x", "Bucket x", {}), "asset dict key 'display_name' requires a colon"),
+    (lambda assets, issues: assets.append("aws_s3_bucket", "arn:aws:s3:::sample-id-0", "Bucket: x", {}), "Duplicate asset id entry"),
+    (lambda assets, issues: issues.append("Public S3 Bucket", ["missing"], {}), "Vectrix issue (Public S3 Bucket) references non-existent asset: missing"),
+])
+def test_batch_validation(change, message):
+    assets, issues, events = make_batches(3)
+    change(assets, issues)
+    with pytest.raises(ValueError) as excinfo:
+        vectrix.output(assets=assets, issues=issues, events=events)
+    assert message in str(excinfo.value)
+
+
+def test_output_batches(mocker):
+    batches = make_batches(50)
+    with StandInServer() as server:
+        mocker.patch("vectrix.graphql.client.API_URL", server.url)
+        mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+        vectrix.output(assets=batches[0], issues=batches[1], events=batches[2])
+        batch_scan = server.last_scan
+        vectrix.output(assets=batches[0].to_dicts(), issues=batches[1].to_dicts(), events=batches[2].to_dicts())
+
+    assert batch_scan == server.last_scan
+
+
+def test_output_batches_development_mode(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".vectrix").mkdir()
+    batches = make_batches(5)
+
+    vectrix.output(assets=batches[0], issues=batches[1], events=batches[2])
+    batch_output = capsys.readouterr().out
+    vectrix.output(assets=batches[0].to_dicts(), issues=batches[1].to_dicts(), events=batches[2].to_dicts())
+
+    assert batch_output == capsys.readouterr().out
+    assert vectrix.get_last_scan_results()["assets"] == batches[0].to_dicts()
+
+
+def test_batch_missing_interned_field_reaches_validator():
+    assets = AssetBatch([{"id": "arn:aws:s3:::sample-id", "display_name": "Bucket: Sample ID", "metadata": {}}])
+    with pytest.raises(ValueError) as excinfo:
+        vectrix.output(assets=assets, issues=[], events=[])
+    assert "asset dict requires 'type' key" in str(excinfo.value)
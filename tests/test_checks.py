@@ -0,0 +1,58 @@
+import pytest
+
+from vectrix.checks import OutputValidator, output_type_check
+
+asset = {
+    "type": "aws_s3_bucket",
+    "id": "arn:aws:s3:::sample-id",
+    "display_name": "Bucket: Sample ID",
+    "link": "https://localhost.com",
+    "metadata": {
+        "aws_s3_bucket_name": {
+            "priority": 50,
+            "value": "sample-id",
+            "link": "https://localhost.com"
+        }
+    }
+}
+
+
+def test_output_validator_memoizes_verdicts():
+    validator = OutputValidator()
+    validator.validate_asset(asset)
+
+    assert "aws_s3_bucket" in validator._asset_types
+    assert "aws_s3_bucket_name" in validator._metadata_keys
+
+
+def test_output_validator_memo_is_bounded():
+    validator = OutputValidator(memo_size=2)
+    for asset_type in ["aws_s3_bucket", "aws_iam_role", "aws_iam_user"]:
+        validator.check_asset_type({"type": asset_type})
+
+    assert len(validator._asset_types) <= 2
+
+
+def test_output_validator_memoized_type_still_checks_other_fields():
+    validator = OutputValidator()
+    validator.validate_asset(asset)
+    bad_asset = dict(asset, display_name="Sample ID")
+
+    with pytest.raises(ValueError) as excinfo:
+        validator.validate_asset(bad_asset)
+    assert "asset dict key 'display_name' requires a colon that separates a key and value" == str(
+        excinfo.value).split(".")[0]
+
+
+def test_output_type_check_duplicate_asset_id():
+    with pytest.raises(ValueError) as excinfo:
+        output_type_check([asset, dict(asset)], [], [])
+    assert "Duplicate asset id entry 'arn:aws:s3:::sample-id'" == str(excinfo.value).split(".")[0]
+
+
+def test_output_type_check_missing_issue_reference():
+    issue = {"issue": "Public S3 Bucket", "asset_id": ["arn:aws:s3:::missing"], "metadata": {}}
+
+    with pytest.raises(ValueError) as excinfo:
+        output_type_check([asset], [issue], [])
+    assert "Vectrix issue (Public S3 Bucket) references non-existent asset: arn:aws:s3:::missing" == str(excinfo.value)
@@ -0,0 +1,172 @@
+import time
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from pytest_mock import mocker
+
+from vectrix import AsyncVectrixUtils
+from vectrix.credentials import CredentialCache
+from vectrix.graphql.routes import GraphQLRoutes
+from vectrix.main import VectrixUtils
+
+
+def aws_session_fetcher(lifetimes):
+    """
+    Returns a fetch callable handing out awsSessions AKIA0, AKIA1, ... that expire after the given lifetimes, and the list of fetches made
+    """
+    fetches = []
+
+    def fetch():
+        index = len(fetches)
+        expiration = datetime.fromtimestamp(time.time() + lifetimes[index], timezone.utc).isoformat()
+        fetches.append(index)
+        return {"accessKeyId": "AKIA{0}".format(index), "secretAccessKey": "secret", "sessionToken": "token", "expiration": expiration}
+    return fetch, fetches
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_aws_session_cache_hits():
+    cache = CredentialCache(background_refresh=False)
+    fetch, fetches = aws_session_fetcher([3600, 3600])
+
+    session = cache.get_aws_session(("arn", "1"), fetch)
+
+    assert cache.get_aws_session(("arn", "1"), fetch) is session
+    assert cache.get_aws_session(("arn", "2"), fetch) is not session
+    assert fetches == [0, 1]
+    assert cache.stats() == {"hits": 1, "misses": 2, "refreshes": 0, "evictions": 0, "cached": 2}
+    assert session.get_credentials().get_frozen_credentials().access_key == "AKIA0"
+
+
+def test_credentials_cache_returns_copies():
+    cache = CredentialCache(background_refresh=False)
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return {"AWS_ROLE_ARN": "arn"}
+
+    cache.get_credentials(fetch)["AWS_ROLE_ARN"] = "changed"
+
+    assert cache.get_credentials(fetch) == {"AWS_ROLE_ARN": "arn"}
+    assert len(fetches) == 1
+
+
+def test_aws_session_refresh_ahead():
+    cache = CredentialCache(refresh_margin=1200)
+    fetch, fetches = aws_session_fetcher([0.4, 3600])
+
+    session = cache.get_aws_session(("arn", "1"), fetch)
+    wait_for(lambda: cache.stats()["refreshes"] == 1)
+
+    # botocore's copy of the credentials has expired; it reads the refreshed credentials from the cache without another request
+    assert session.get_credentials().get_frozen_credentials().access_key == "AKIA1"
+    assert cache.get_aws_session(("arn", "1"), fetch) is session
+    assert fetches == [0, 1]
+    cache.close()
+
+
+def test_idle_entry_is_evicted_instead_of_refreshed():
+    cache = CredentialCache(refresh_margin=1200, idle_ttl=0.1)
+    fetch, fetches = aws_session_fetcher([0.4, 3600])
+
+    cache.get_aws_session(("arn", "1"), fetch)
+    wait_for(lambda: cache.stats()["evictions"] == 1)
+
+    assert fetches == [0]
+    assert cache.stats()["cached"] == 0
+    session = cache.get_aws_session(("arn", "1"), fetch)
+    assert session.get_credentials().get_frozen_credentials().access_key == "AKIA1"
+    assert cache.stats()["refreshes"] == 0
+    cache.close()
+
+
+def test_expired_entry_is_refreshed_on_use():
+    cache = CredentialCache(background_refresh=False, credentials_ttl=0.05)
+    cache.get_credentials(lambda: {"AWS_ROLE_ARN": "old"})
+    time.sleep(0.06)
+
+    assert cache.get_credentials(lambda: {"AWS_ROLE_ARN": "new"}) == {"AWS_ROLE_ARN": "new"}
+    assert cache.stats()["refreshes"] == 1
+
+
+def test_vectrix_caches_credentials_and_sessions(standin):
+    utils = VectrixUtils()
+
+    sessions = [utils.create_aws_session(aws_role_arn="arn", aws_external_id=str(index % 2)) for index in range(10)]
+    credentials = [utils.get_credentials() for _ in range(10)]
+
+    assert len(standin.requests_for(GraphQLRoutes.CREATE_AWS_SESSION)) == 2
+    assert len(standin.requests_for(GraphQLRoutes.GET_CREDENTIALS)) == 1
+    assert sessions[0] is sessions[2] and sessions[0] is not sessions[1]
+    assert credentials[9] == {"AWS_ROLE_ARN": "arn:aws:iam::123456789012:role/vectrix"}
+    assert utils.credential_cache_stats() == {"hits": 17, "misses": 3, "refreshes": 0, "evictions": 0, "cached": 3}
+
+
+def test_aws_session_expiration_from_api(standin, mocker):
+    mocker.patch("vectrix.main.AWS_SESSION_EXPIRATION", True)
+    utils = VectrixUtils()
+
+    session = utils.create_aws_session(aws_role_arn="arn", aws_external_id="1")
+
+    assert len(standin.requests_for(GraphQLRoutes.CREATE_AWS_SESSION_EXPIRATION)) == 1
+    assert session.get_credentials()._expiry_time.timestamp() > time.time() + 3000
+
+
+def test_aws_session_expiration_is_opt_in(standin):
+    utils = VectrixUtils()
+
+    session = utils.create_aws_session(aws_role_arn="arn", aws_external_id="1")
+
+    assert len(standin.requests_for(GraphQLRoutes.CREATE_AWS_SESSION)) == 1
+    # Without an expiration the session is assumed to live as long as the shortest STS session
+    assert session.get_credentials()._expiry_time.timestamp() < time.time() + 901
+
+
+def test_async_vectrix_shares_cache(standin):
+    utils = VectrixUtils()
+    session = utils.create_aws_session(aws_role_arn="arn", aws_external_id="1")
+    async_vectrix = AsyncVectrixUtils(utils)
+
+    async def scan():
+        return await asyncio.gather(async_vectrix.create_aws_session(aws_role_arn="arn", aws_external_id="1"),
+                                    async_vectrix.create_aws_session(aws_role_arn="arn", aws_external_id="2"))
+
+    sessions = asyncio.run(scan())
+    async_vectrix.close()
+
+    assert sessions[0] is session
+    assert sessions[1].get_credentials().access_key == "AKIA2"
+    assert len(standin.requests_for(GraphQLRoutes.CREATE_AWS_SESSION)) == 2
+
+
+@pytest.mark.standin(latency=0.05, denied_external_ids=["3"])
+def test_create_aws_sessions_fan_out(standin):
+    accounts = [("arn:aws:iam::{0}:role/vectrix".format(index), str(index)) for index in range(20)]
+
+    started = time.perf_counter()
+    results = list(VectrixUtils().create_aws_sessions(accounts, max_workers=10))
+    elapsed = time.perf_counter() - started
+
+    assert sorted(result.account for result in results) == sorted(accounts)
+    # Serial requests would take at least 20 * latency; boto3 session creation is CPU-bound, so the bound is kept loose
+    assert elapsed < 20 * 0.05
+    assert 1 < standin.max_in_flight <= 10
+    for result in results:
+        if result.account[1] == "3":
+            assert result.session is None
+            assert str(result.error).startswith("Error retreiving AWS Session from Vectrix API")
+        else:
+            assert result.error is None
+            assert result.session.get_credentials().access_key == "AKIA" + result.account[1]
+
+
+def test_create_aws_sessions_development_mode():
+    with pytest.raises(NotImplementedError):
+        VectrixUtils().create_aws_sessions([("arn", "1")])
@@ -0,0 +1,119 @@
+import json
+import random
+import pytest
+from pytest_mock import mocker
+from tests import vectrix
+
+from vectrix.standin import StandInServer
+from .conftest import generate_scan
+from .test_vectrix import correct_asset, correct_issue, correct_event
+from vectrix.delta import apply_delta, compute_delta, delta_size, fingerprint
+from vectrix.graphql.routes import GraphQLRoutes
+from vectrix.graphql.utils import vectrix_item_converter
+
+
+def change_scan(scan, seed):
+    """
+    Modifies, removes, adds, and duplicates a few items of a scan
+    """
+    rng = random.Random(seed)
+    current = {kind: list(items) for kind, items in scan.items()}
+    half = len(current["assets"]) // 2
+    for index in rng.sample(range(half), 5):
+        current["assets"][index] = dict(current["assets"][index], display_name="Bucket: Renamed {0}".format(index))
+    for index in sorted(rng.sample(range(half, len(current["assets"])), 3), reverse=True):
+        for kind in ("assets", "issues", "events"):
+            del current[kind][index]
+    current["assets"].append(dict(correct_asset[0], id="arn:aws:s3:::new-id"))
+    current["issues"].append(dict(correct_issue[0], asset_id=["arn:aws:s3:::new-id"]))
+    current["events"].extend([dict(correct_event[0], event_time=1), dict(correct_event[0], event_time=1)])
+    return current
+
+
+def test_fingerprint_ignores_key_order():
+    asset = correct_asset[0]
+    reordered = {key: asset[key] for key in reversed(list(asset))}
+    assert fingerprint(asset) == fingerprint(reordered)
+    assert fingerprint(asset) == fingerprint(vectrix_item_converter([asset])[0])
+    assert fingerprint(asset) != fingerprint(dict(asset, display_name="Bucket: Other"))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_apply_delta_reproduces_output(seed):
+    previous = generate_scan(100)
+    current = change_scan(previous, seed)
+
+    delta = compute_delta(previous, current)
+
+    assert {change: len(items) for change, items in delta["assets"].items()} == {"added": 1, "modified": 5, "removed": 3}
+    assert {change: len(items) for change, items in delta["events"].items()} == {"added": 2, "modified": 0, "removed": 3}
+    assert delta_size(delta) == 18
+    applied = apply_delta(previous, delta)
+    for kind in ("assets", "issues", "events"):
+        assert sorted(map(fingerprint, applied[kind])) == sorted(map(fingerprint, current[kind]))
+
+
+def test_delta_of_unchanged_scan_is_empty():
+    scan = generate_scan(10)
+    api_scan = {kind: vectrix_item_converter(items) for kind, items in scan.items()}
+    assert delta_size(compute_delta(api_scan, scan)) == 0
+    assert delta_size(compute_delta({"assets": None, "issues": None, "events": None}, scan)) == 30
+
+
+def test_output_delta(mocker):
+    previous = generate_scan(200)
+    current = change_scan(previous, 0)
+    with StandInServer() as server:
+        mocker.patch("vectrix.graphql.client.API_URL", server.url)
+        mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+        vectrix.output(**previous)
+        vectrix.output(**current, delta=True)
+
+    full_request, delta_request = server.requests_for(GraphQLRoutes.OUTPUT_RESULTS)[0], server.requests_for(
+        GraphQLRoutes.OUTPUT_RESULTS_DELTA)[0]
+    assert delta_request["size"] * 10 < full_request["size"]
+    for kind in ("assets", "issues", "events"):
+        assert sorted(map(fingerprint, server.last_scan[kind])) == sorted(map(fingerprint, current[kind]))
+    assert json.loads(delta_request["variables"]["input"]["state"]) == vectrix.get_state()
+
+
+def test_output_delta_development_mode(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".vectrix").mkdir()
+    previous = generate_scan(10)
+    vectrix.output(**previous)
+    capsys.readouterr()
+
+    vectrix.output(**change_scan(previous, 0), delta=True)
+
+    printed = capsys.readouterr().out.split("**** DELTA ****\n")[1]
+    assert json.loads(printed)["assets"] == {"added": 1, "modified": 5, "removed": 3}
+
+
+@pytest.mark.parametrize("status", [400, 500])
+def test_output_delta_falls_back_to_full_output(mocker, status):
+    scan = generate_scan(20)
+    with StandInServer() as server:
+        mocker.patch("vectrix.graphql.client.API_URL", server.url)
+        mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+        server.last_scan = {kind: vectrix_item_converter(items) for kind, items in scan.items()}
+        server.fail_next(status, route=GraphQLRoutes.OUTPUT_RESULTS_DELTA)
+        vectrix.output(**change_scan(scan, 0), delta=True)
+
+    assert [request["status"] for request in server.requests_for(GraphQLRoutes.OUTPUT_RESULTS_DELTA)] == [status]
+    assert len(server.requests_for(GraphQLRoutes.OUTPUT_RESULTS)) == 1
+    assert len(server.last_scan["assets"]) == len(change_scan(scan, 0)["assets"])
+
+
+def test_output_delta_falls_back_on_errors(mocker):
+    fake_graphql_client = mocker.patch("vectrix.main.graphql_client")
+    fake_graphql_client.side_effect = [
+        {"deploymentLastScanResults": {"assets": "[]", "issues": "[]", "events": "[]"}},
+        {"deploymentScanDeltaCreate": {"errors": ["Unknown fingerprint"]}},
+        {"deploymentScanEntryCreate": {"errors": []}}
+    ]
+    mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+    vectrix.output(**generate_scan(2), delta=True)
+
+    assert [call[1]["route"] for call in fake_graphql_client.call_args_list] == [
+        GraphQLRoutes.GET_LAST_SCAN_RESULTS, GraphQLRoutes.OUTPUT_RESULTS_DELTA, GraphQLRoutes.OUTPUT_RESULTS]
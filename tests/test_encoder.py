@@ -0,0 +1,61 @@
+import json
+import pytest
+
+from .test_assets import TestAsset
+from .test_vectrix import correct_asset, correct_issue, correct_event
+from vectrix.graphql.encoder import OrjsonBackend, StdlibJSONBackend, encode_output_body, json_backend
+from vectrix.graphql.routes import GraphQLRoutes
+from vectrix.graphql.utils import snake_case_to_camel_case
+from vectrix.main import output_variables
+
+unicode_asset = dict(correct_asset[0], id="arn:aws:s3:::bücket", metadata={
+    "aws_s3_bucket_name": {"priority": 50, "value": "bücket \"quoted\" ☃"}})
+state = {"cursor": "ü", "pages": [1, 2]}
+
+
+def requests_body(assets, issues, events):
+    """
+    The body requests sends for graphql_client(route=OUTPUT_RESULTS, variables=output_variables(...))
+    """
+    variables = snake_case_to_camel_case(output_variables(assets, issues, events, state))
+    return json.dumps({"query": GraphQLRoutes.OUTPUT_RESULTS.value, "variables": variables}, allow_nan=False).encode("utf-8")
+
+
+def test_stdlib_backend_is_byte_identical():
+    assets = correct_asset + [unicode_asset]
+    body = encode_output_body(GraphQLRoutes.OUTPUT_RESULTS.value, assets, correct_issue, correct_event, state,
+                              backend=StdlibJSONBackend())
+    assert body == requests_body(assets, correct_issue, correct_event)
+
+
+def test_orjson_backend_is_equivalent():
+    pytest.importorskip("orjson")
+    assets = correct_asset + [unicode_asset]
+    body = json.loads(encode_output_body(GraphQLRoutes.OUTPUT_RESULTS.value, assets, correct_issue, correct_event, state,
+                                         backend=json_backend("orjson")))
+    expected = json.loads(requests_body(assets, correct_issue, correct_event))
+
+    for payload in (body, expected):
+        payload_input = payload["variables"]["input"]
+        payload_input["state"] = json.loads(payload_input["state"])
+        for kind in ("assets", "issues", "events"):
+            for item in payload_input[kind]:
+                item["metadata"] = json.loads(item["metadata"])
+    assert body == expected
+
+
+def test_encoder_accepts_objects():
+    asset = TestAsset()
+    body = encode_output_body(GraphQLRoutes.OUTPUT_RESULTS.value, [asset], [], [], {}, backend=StdlibJSONBackend())
+    assert body == requests_body([asset.to_dict()], [], [])[:-len(b'"{\\"cursor\\": \\"\\\\u00fc\\", \\"pages\\": [1, 2]}"}}}')] + b'"{}"}}}'
+
+
+def test_orjson_backend_falls_back_for_unsupported_values():
+    orjson = pytest.importorskip("orjson")
+    assert OrjsonBackend(orjson).dumps({"value": 2 ** 70}) == StdlibJSONBackend.dumps({"value": 2 ** 70})
+
+
+def test_json_backend_validation():
+    assert json_backend("json").name == "json"
+    with pytest.raises(ValueError):
+        json_backend("ujson")
@@ -0,0 +1,116 @@
+import pickle
+import pytest
+from datetime import datetime, timezone
+from tests import vectrix
+
+from vectrix import Asset, Event, MetadataElement, MetadataPriority
+from vectrix.batch import AssetBatch
+
+bucket_pages = [
+    {"Buckets": [
+        {"Name": "bucket-a", "CreationDate": datetime(2021, 1, 1, tzinfo=timezone.utc), "Owner": {"Id": "owner-1"}},
+        {"Name": "bucket-b", "CreationDate": datetime(2021, 1, 2, tzinfo=timezone.utc)}
+    ]},
+    {},
+    {"Buckets": [{"Name": "bucket-c", "CreationDate": datetime(2021, 1, 3, tzinfo=timezone.utc), "Owner": {"Id": "owner-1"}}]}
+]
+
+bucket_spec = {
+    "result_key": "Buckets",
+    "type": "aws_s3_bucket",
+    "id": lambda record: "arn:aws:s3:::" + record["Name"],
+    "display_name": "Bucket: {Name}",
+    "link": "https://s3.console.aws.amazon.com/s3/buckets/{Name}",
+    "metadata": {
+        "created": ("CreationDate", MetadataPriority.MEDIUM),
+        "owner": ("Owner.Id", MetadataPriority.LOW)
+    }
+}
+
+
+def test_assets_from_paginator_pages():
+    assets = list(Asset.from_records(bucket_pages, **bucket_spec))
+
+    assert [asset.id for asset in assets] == ["arn:aws:s3:::bucket-a", "arn:aws:s3:::bucket-b", "arn:aws:s3:::bucket-c"]
+    assert assets[0].to_dict() == {
+        "type": "aws_s3_bucket",
+        "id": "arn:aws:s3:::bucket-a",
+        "display_name": "Bucket: bucket-a",
+        "link": "https://s3.console.aws.amazon.com/s3/buckets/bucket-a",
+        "metadata": {
+            "created": {"priority": 50, "value": "2021-01-01T00:00:00+00:00"},
+            "owner": {"priority": 0, "value": "owner-1"}
+        }
+    }
+    # Missing sources leave the element out
+    assert "owner" not in assets[1].metadata
+
+
+def test_missing_format_string_fields_leave_the_element_out():
+    assets = list(Asset.from_records([{"Name": "bucket-a"}, {"Name": "bucket-b", "Owner": {"DisplayName": "alice"}}],
+                                     type="aws_s3_bucket", id="Name", display_name="Bucket: {Name}",
+                                     metadata={"owner": ("{Owner[DisplayName]} ({Name})", MetadataPriority.LOW)}))
+
+    assert assets[0].metadata == {}
+    assert assets[1].metadata == {"owner": {"priority": 0, "value": "alice (bucket-b)"}}
+
+
+def test_assets_from_records_are_lazy():
+    def records():
+        yield {"Name": "bucket-a"}
+        raise AssertionError("read past the first record")
+
+    assets = Asset.from_records(records(), type="aws_s3_bucket", id="Name", display_name="Bucket: {Name}", metadata={})
+    assert next(assets).id == "bucket-a"
+
+
+def test_assets_from_records_validates():
+    assets = Asset.from_records([{"Name": "bucket-a"}], type="aws_s3_bucket", id="Name", display_name="Bucket: {Name}",
+                                metadata={"name": ("Name", 101)})
+    with pytest.raises(ValueError):
+        next(assets)
+
+    assets = Asset.from_records([{"Name": "bucket-a"}], type="not_an_asset_type", id="Name", display_name="Bucket: {Name}", metadata={})
+    with pytest.raises(ValueError):
+        next(assets)
+
+
+def test_metadata_elements_are_interned(mocker):
+    intern = mocker.spy(MetadataElement, "intern")
+    list(Asset.from_records(bucket_pages, **bucket_spec))
+    owners = [result for call, result in zip(intern.call_args_list, intern.spy_return_list) if call.args[1] == "owner-1"]
+    assert len(owners) == 2 and owners[0] is owners[1]
+
+
+def test_metadata_element_dicts_are_shared():
+    assets = list(Asset.from_records(bucket_pages, **bucket_spec))
+
+    assert assets[0].metadata["owner"] is assets[2].metadata["owner"]
+    assert assets[0].metadata["created"] is not assets[2].metadata["created"]
+    with pytest.raises(TypeError):
+        assets[0].metadata["owner"]["value"] = "owner-2"
+    assert pickle.loads(pickle.dumps(assets[0].metadata)) == assets[0].metadata
+
+
+def test_events_from_records():
+    records = [
+        {"EventName": "ConsoleLogin", "EventTime": datetime(2021, 1, 1, tzinfo=timezone.utc), "Username": "alice",
+         "Resources": [{"ResourceName": "a"}, {"ResourceName": "b"}]}
+    ]
+    events = list(Event.from_records(
+        records, event="{EventName}", event_time="EventTime", display_name="{Username}: {EventName}",
+        metadata={"resources": (lambda record: [resource["ResourceName"] for resource in record["Resources"]], MetadataPriority.HIGH)}))
+
+    assert events[0].to_dict() == {
+        "event": "ConsoleLogin",
+        "event_time": 1609459200,
+        "display_name": "alice: ConsoleLogin",
+        "metadata": {"resources": {"priority": 100, "value": ["a", "b"]}}
+    }
+
+
+def test_records_into_batch_and_output(mocker):
+    mocker.patch('vectrix.main.PRODUCTION_MODE', False)
+    assets = AssetBatch(Asset.from_records(bucket_pages, **bucket_spec))
+    assert len(assets) == 3
+    vectrix.output(assets=assets, issues=[], events=[])
@@ -2,11 +2,14 @@ import pytest
 import json
 from pytest_mock import mocker
 
-from vectrix.graphql.client import graphql_client
+from vectrix.graphql.client import graphql_client, GraphQLTransport
+from vectrix.graphql.encoder import StdlibJSONBackend, encode_output_body
 from vectrix.graphql.routes import GraphQLRoutes
-from vectrix.graphql.utils import snake_case_to_camel_case
+from vectrix.graphql.utils import convert, snake_case_to_camel_case
 from vectrix.graphql.utils import vectrix_item_converter
 
+from vectrix.standin import StandInServer
+
 
 class TestraphQLUtils:
 
@@ -31,6 +34,26 @@ class TestraphQLUtils:
         assert snake_case_to_camel_case(test_string_2) == "alreadyInProperCase"
         assert correct_recursion_answer == snake_case_to_camel_case(test_recursion)
 
+    def test_snake_case_to_camel_case_lists(self):
+        test_lists = {"log_inputs": [{"log_type": "LOG", "log_tags": ["snake_value", {"tag_name": 1}]}, "plain_value"]}
+        assert snake_case_to_camel_case(test_lists) == {
+            "logInputs": [{"logType": "LOG", "logTags": ["snake_value", {"tagName": 1}]}, "plain_value"]}
+
+    def test_snake_case_to_camel_case_deep_nesting(self):
+        nested = {"leaf_key": 1}
+        for _ in range(5000):
+            nested = {"nested_key": [nested]}
+        converted = snake_case_to_camel_case(nested)
+        for _ in range(5000):
+            converted = converted["nestedKey"][0]
+        assert converted == {"leafKey": 1}
+
+    def test_convert_is_memoized(self):
+        convert.cache_clear()
+        for _ in range(10):
+            convert("display_name")
+        assert convert.cache_info().hits == 9 and convert.cache_info().currsize == 1
+
     def test_snake_case_to_camel_case_exception(self):
         with pytest.raises(Exception) as excinfo:
             snake_case_to_camel_case([])
@@ -77,7 +100,7 @@ class TestraphQLUtils:
 class TestGraphqlClient:
 
     def test_graphql_client_pass(self, mocker):
-        mocked_requests = mocker.patch("vectrix.graphql.client.requests")
+        mocked_transport = mocker.patch("vectrix.graphql.client.get_transport").return_value
         fake_post = mocker.Mock()
         fake_post.status_code = 200
         fake_post.json.return_value = {
@@ -85,15 +108,75 @@ class TestGraphqlClient:
                 "dummy": 1
             }
         }
-        mocked_requests.post.return_value = fake_post
+        mocked_transport.post.return_value = fake_post
 
         assert graphql_client(route=GraphQLRoutes.GET_STATE) == {"dummy": 1}
 
     def test_graphql_client_error(self, mocker):
 
-        mocked_requests = mocker.patch("vectrix.graphql.client.requests")
+        mocked_transport = mocker.patch("vectrix.graphql.client.get_transport").return_value
         fake_post = mocker.Mock()
         fake_post.status_code = 400
-        mocked_requests.post.return_value = fake_post
+        mocked_transport.post.return_value = fake_post
 
         assert graphql_client(route=GraphQLRoutes.GET_STATE) is None
+
+    def test_graphql_client_reuses_connections(self, mocker):
+        transport = GraphQLTransport(pool_size=2)
+        mocker.patch("vectrix.graphql.client._transport", transport)
+        with StandInServer(state={"cursor": 1}) as server:
+            mocker.patch("vectrix.graphql.client.API_URL", server.url)
+            for _ in range(5):
+                assert graphql_client(route=GraphQLRoutes.GET_STATE) == {"deployment": {"state": '{"cursor": 1}'}}
+
+        assert transport.stats() == {"requests": 5, "connections_opened": 1, "connections_reused": 4, "pool_size": 2}
+
+    def test_graphql_transport_auth_headers(self, mocker):
+        mocker.patch.dict("os.environ", {"DEPLOYMENT_ID": "id", "DEPLOYMENT_KEY": "key"})
+        transport = GraphQLTransport(keep_alive=False)
+
+        assert transport.session.headers['X-DEPLOYMENT-ID'] == "id"
+        assert transport.session.headers['X-DEPLOYMENT-KEY'] == "key"
+        assert transport.session.headers['Connection'] == "close"
+
+    def output_body(self, count):
+        assets = [dict(type="aws_s3_bucket", id="arn:aws:s3:::sample-id-{0}".format(index), display_name="Bucket",
+                       link="https://localhost.com", metadata={"aws_s3_bucket_name": {"priority": 50, "value": "sample-id"}})
+                  for index in range(count)]
+        return encode_output_body(GraphQLRoutes.OUTPUT_RESULTS.value, assets, [], [], {}, backend=StdlibJSONBackend())
+
+    @pytest.mark.parametrize("compression", ["gzip", "deflate"])
+    def test_graphql_transport_compression(self, mocker, compression):
+        transport = GraphQLTransport(compression=compression, compression_threshold=1024, compression_level=9)
+        mocker.patch("vectrix.graphql.client._transport", transport)
+        body = self.output_body(100)
+        with StandInServer() as server:
+            mocker.patch("vectrix.graphql.client.API_URL", server.url)
+            graphql_client(route=GraphQLRoutes.OUTPUT_RESULTS, body=body)
+            graphql_client(route=GraphQLRoutes.GET_STATE)
+
+        output_request, state_request = server.requests
+        assert output_request["encoding"] == compression and output_request["size"] * 10 < len(body)
+        assert state_request["encoding"] is None
+        assert len(server.last_scan["assets"]) == 100
+        stats = transport.compression_stats()
+        assert stats["compressed_requests"] == 1 and stats["uncompressed_bytes"] == len(body)
+        assert stats["ratio"] == len(body) / output_request["size"]
+        assert stats["seconds"] > 0 and stats["fallbacks"] == 0
+
+    def test_graphql_transport_compression_fallback(self, mocker):
+        transport = GraphQLTransport(compression="gzip", compression_threshold=1024)
+        mocker.patch("vectrix.graphql.client._transport", transport)
+        with StandInServer(accept_encodings=()) as server:
+            mocker.patch("vectrix.graphql.client.API_URL", server.url)
+            for _ in range(2):
+                assert graphql_client(route=GraphQLRoutes.OUTPUT_RESULTS, body=self.output_body(100)) == {
+                    "deploymentScanEntryCreate": {"errors": []}}
+
+        assert [request["encoding"] for request in server.requests] == ["gzip", None, None]
+        assert transport.compression_stats()["fallbacks"] == 1
+        assert transport.compression_stats()["compressed_requests"] == 0
+
+    def test_graphql_transport_compression_validation(self):
+        with pytest.raises(ValueError):
+            GraphQLTransport(compression="br")
@@ -0,0 +1,40 @@
+import os
+import sys
+import subprocess
+
+# Cumulative import time budget of the vectrix package, in microseconds
+IMPORT_TIME_BUDGET = 150000
+
+# Dependencies that are only imported on first use
+DEFERRED_IMPORTS = ["boto3", "botocore", "sentry_sdk", "requests", "asyncio"]
+
+
+def import_times(module):
+    """
+    Runs `python -X importtime -c "import <module>"` in a fresh interpreter and returns {module: cumulative microseconds}
+    """
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module], capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=package_root))
+    assert result.returncode == 0, result.stderr
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_defers_heavy_dependencies():
+    times = import_times("vectrix")
+
+    assert [module for module in DEFERRED_IMPORTS if module in times] == []
+
+
+def test_import_time_budget():
+    # Best of three runs, to keep noisy machines from failing the benchmark
+    best = min(import_times("vectrix")["vectrix"] for _ in range(3))
+
+    assert best < IMPORT_TIME_BUDGET
@@ -0,0 +1,99 @@
+import time
+import threading
+import pytest
+from pytest_mock import mocker
+
+from vectrix.graphql.routes import GraphQLRoutes
+from vectrix.logs import LogShipper
+
+
+def log_input(index):
+    return {"logType": "LOG", "logVisibility": "INTERNAL", "logMessage": "log {0}".format(index)}
+
+
+def test_log_shipper_batches_with_aliases(standin):
+    shipper = LogShipper(batch_size=100, flush_interval=60)
+    for index in range(250):
+        shipper.enqueue(log_input(index))
+    shipper.flush()
+
+    assert standin.logs == [log_input(index) for index in range(250)]
+    assert len(standin.requests_for(GraphQLRoutes.CREATE_LOG)) == 3
+    assert shipper.stats() == {"buffered": 0, "shipped": 250, "dropped": 0, "spilled": 0, "batches": 3}
+
+
+def test_log_shipper_flushes_on_interval(standin):
+    shipper = LogShipper(batch_size=100, flush_interval=0.05)
+    for index in range(3):
+        shipper.enqueue(log_input(index))
+
+    deadline = time.time() + 5
+    while len(standin.logs) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    assert standin.logs == [log_input(index) for index in range(3)]
+
+
+def test_log_shipper_overflow_drop(standin):
+    shipper = LogShipper(batch_size=10, buffer_size=2, flush_interval=60, overflow="drop")
+    for index in range(5):
+        shipper.enqueue(log_input(index))
+    shipper.flush()
+
+    assert standin.logs == [log_input(0), log_input(1)]
+    assert shipper.stats()["dropped"] == 3
+
+
+def test_log_shipper_overflow_spill(standin, tmp_path):
+    spill_path = str(tmp_path / "spill.jsonl")
+    shipper = LogShipper(batch_size=10, buffer_size=2, flush_interval=60, overflow="spill", spill_path=spill_path)
+    for index in range(5):
+        shipper.enqueue(log_input(index))
+
+    assert shipper.stats()["spilled"] == 3
+    shipper.flush()
+
+    assert standin.logs == [log_input(index) for index in range(5)]
+    assert not (tmp_path / "spill.jsonl").exists()
+
+
+def test_log_shipper_overflow_block(standin):
+    shipper = LogShipper(batch_size=2, buffer_size=2, flush_interval=60, overflow="block")
+    producer = threading.Thread(target=lambda: [shipper.enqueue(log_input(index)) for index in range(10)])
+    producer.start()
+    producer.join(5)
+    shipper.flush()
+
+    assert not producer.is_alive()
+    assert standin.logs == [log_input(index) for index in range(10)]
+
+
+def test_log_shipper_flush_errors(mocker):
+    fake_graphql_client = mocker.patch("vectrix.logs.graphql_client")
+    fake_graphql_client.return_value = {"deploymentLogCreate": {"errors": ["bad log"]}}
+    logger_error = mocker.patch("vectrix.logs.logger.error")
+    shipper = LogShipper(flush_interval=60)
+    shipper.enqueue(log_input(0))
+
+    assert shipper.flush() == ["bad log"]
+    logger_error.assert_called_once_with("Error creating log in Vectrix API: ['bad log']")
+
+
+def test_log_shipper_retries_failed_batches(standin, tmp_path):
+    shipper = LogShipper(batch_size=10, flush_interval=60, spill_path=str(tmp_path / "spill.jsonl"))
+    for index in range(3):
+        shipper.enqueue(log_input(index))
+    standin.fail_next(503, route=GraphQLRoutes.CREATE_LOG)
+
+    assert shipper.flush() == ["Failed sending 3 logs to Vectrix API, they are retried on the next flush"]
+    assert standin.logs == []
+    assert shipper.stats()["spilled"] == 3
+
+    shipper.enqueue(log_input(3))
+    assert shipper.flush() == []
+    assert standin.logs == [log_input(index) for index in (3, 0, 1, 2)]
+    assert shipper.stats()["spilled"] == 0
+
+
+def test_log_shipper_invalid_overflow():
+    with pytest.raises(ValueError):
+        LogShipper(overflow="ignore")
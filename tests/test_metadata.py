@@ -1,4 +1,6 @@
+import pytest
 from tests import MetadataElement, MetadataPriority
+from vectrix import MetadataTemplate
 
 correct_metadata = {
     "value_link": {
@@ -56,3 +58,63 @@ def test_metadata_custom_priority():
     test_metadata = MetadataElement(23, 'custom priority').to_dict()
 
     assert test_metadata == correct_metadata['custom_priority']
+
+
+def test_metadata_intern():
+    region = MetadataElement.intern(MetadataPriority.LOW, "us-east-1")
+
+    assert MetadataElement.intern(0, "us-east-1") is region
+    assert MetadataElement.intern(MetadataPriority.LOW, "us-west-2") is not region
+    assert MetadataElement.intern(MetadataPriority.LOW, "see https://localhost.com").link == "https://localhost.com"
+    assert MetadataElement.intern(MetadataPriority.LOW, ["a", "b"]) is not MetadataElement.intern(MetadataPriority.LOW, ["a", "b"])
+
+
+def test_metadata_template():
+    template = MetadataTemplate({
+        "aws_region": MetadataElement(MetadataPriority.LOW, "us-east-1"),
+        "aws_account_number": {"priority": -1, "value": "123456789012"}
+    })
+
+    assert template == {"aws_region": {"priority": 0, "value": "us-east-1"},
+                        "aws_account_number": {"priority": -1, "value": "123456789012"}}
+    with pytest.raises(TypeError):
+        template["aws_region"] = {"priority": 0, "value": "us-west-2"}
+    with pytest.raises(TypeError):
+        template["aws_region"]["priority"] = 500
+    resources = ["a"]
+    listed = MetadataTemplate({"resources": {"priority": 0, "value": resources}})
+    resources.append("b")
+    assert listed["resources"]["value"] == ["a"]
+    merged = template.merge({"aws_s3_bucket_name": MetadataElement(MetadataPriority.HIGH, "sample-id")})
+    assert merged["aws_s3_bucket_name"] == {"priority": 100, "value": "sample-id"} and len(template) == 2
+
+
+def test_metadata_template_serialized_once(mocker):
+    from vectrix.checks import output_validator
+    from vectrix.graphql.encoder import StdlibJSONBackend, encode_output_body
+
+    template = MetadataTemplate({"aws_region": MetadataElement(MetadataPriority.LOW, "us-east-1")})
+    assets = [{"type": "aws_s3_bucket", "id": str(index), "display_name": "Bucket: {0}".format(index), "metadata": template}
+              for index in range(10)]
+    backend = StdlibJSONBackend()
+    dumps_str = mocker.spy(backend, "dumps_str")
+
+    output_validator.validate(assets, [], [])
+    body = encode_output_body("query", assets, [], [], {}, backend=backend)
+
+    assert template.validated
+    assert dumps_str.call_count == 2
+    assert body == encode_output_body("query", [dict(asset, metadata=dict(template)) for asset in assets], [], [], {},
+                                      backend=StdlibJSONBackend())
+
+
+def test_metadata_template_validation():
+    from vectrix.checks import output_validator
+
+    template = MetadataTemplate({"AWS Region": {"priority": 0, "value": "us-east-1"}})
+    asset = {"type": "aws_s3_bucket", "id": "1", "display_name": "Bucket: 1", "metadata": template}
+    for _ in range(2):
+        with pytest.raises(ValueError) as excinfo:
+            output_validator.validate([asset], [], [])
+        assert "metadata keys aren't allowed to have spaces" in str(excinfo.value)
+    assert not template.validated
@@ -0,0 +1,97 @@
+import json
+import pytest
+from pytest_mock import mocker
+from tests import vectrix
+
+from .test_vectrix import correct_asset, correct_issue, correct_event
+from vectrix import VectrixUtils
+from vectrix.graphql.client import graphql_client
+from vectrix.graphql.routes import GraphQLRoutes
+from vectrix.metrics import MetricsRegistry, Histogram, metric_key, registry
+from vectrix.standin import StandInServer
+
+
+@pytest.fixture
+def fresh_registry():
+    registry.reset()
+    yield registry
+    registry.reset()
+
+
+def test_registry_counters_histograms_and_gauges():
+    metrics = MetricsRegistry()
+    metrics.increment("requests", route="GET_STATE")
+    metrics.increment("requests", 2, route="GET_STATE")
+    for value in (0.002, 0.003, 0.2, 30):
+        metrics.observe("seconds", value)
+    metrics.register_gauge("depth", lambda: 7)
+    metrics.register_gauge("broken", lambda: 1 / 0)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"] == {"requests{route=GET_STATE}": 3}
+    histogram = snapshot["histograms"]["seconds"]
+    assert histogram["count"] == 4 and histogram["max"] == 30
+    assert histogram["p50"] == 0.005 and histogram["p95"] == 30
+    assert histogram["buckets"]["+Inf"] == 1
+    assert snapshot["gauges"] == {"depth": 7}
+
+    metrics.reset()
+    assert metrics.snapshot()["counters"] == {} and metrics.snapshot()["gauges"] == {"depth": 7}
+
+
+def test_metric_key_and_empty_histogram():
+    assert metric_key("graphql.requests", {"status": 200, "route": "GET_STATE"}) == "graphql.requests{route=GET_STATE,status=200}"
+    assert Histogram().to_dict()["p95"] is None
+
+
+def test_graphql_client_metrics(mocker, fresh_registry):
+    with StandInServer() as server:
+        mocker.patch("vectrix.graphql.client.API_URL", server.url)
+        graphql_client(route=GraphQLRoutes.GET_STATE)
+        server.fail_next(500)
+        assert graphql_client(route=GraphQLRoutes.GET_STATE) is None
+
+    assert registry.counter("graphql.requests", route="GET_STATE") == 2
+    assert registry.counter("graphql.responses", route="GET_STATE", status=500) == 1
+    assert registry.counter("graphql.errors", route="GET_STATE") == 1
+    assert registry.counter("graphql.bytes_sent", route="GET_STATE") == sum(request["size"] for request in server.requests)
+    assert registry.counter("graphql.bytes_received", route="GET_STATE") > 0
+    assert registry.histogram("graphql.request.seconds", route="GET_STATE")["count"] == 2
+
+
+def test_output_metrics_development_mode(tmp_path, monkeypatch, fresh_registry):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".vectrix").mkdir()
+    vectrix.output(assets=correct_asset, issues=correct_issue, events=correct_event)
+
+    dumped = json.loads((tmp_path / ".vectrix" / "metrics.json").read_text())
+    assert dumped["counters"]["validation.items{kind=asset}"] == len(correct_asset)
+    for kind in ("asset", "issue", "event", "cross_item"):
+        assert dumped["histograms"][f"validation.seconds{{kind={kind}}}"]["count"] == 1
+    assert dumped["histograms"]["output.seconds"]["count"] == 1
+    assert {"aws_client_pool", "key_conversion_cache"} <= set(vectrix.metrics()["gauges"])
+
+
+def test_output_metrics_report(mocker, fresh_registry):
+    with StandInServer() as server:
+        mocker.patch("vectrix.graphql.client.API_URL", server.url)
+        mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+        vectrix.output(assets=correct_asset, issues=correct_issue, events=correct_event, report_metrics=True)
+        vectrix.flush_logs()
+
+    assert registry.counter("serialization.bytes") == server.requests_for(GraphQLRoutes.OUTPUT_RESULTS)[0]["size"]
+    report = [log["logMessage"] for log in server.logs if log["logMessage"].startswith("Vectrix SDK metrics: ")]
+    assert len(report) == 1
+    reported = json.loads(report[0][len("Vectrix SDK metrics: "):])
+    assert reported["counters"]["graphql.requests{route=OUTPUT_RESULTS}"] == 1
+    assert "logs" in reported["gauges"]
+
+
+def test_instances_keep_their_own_gauges():
+    other = VectrixUtils()
+    other.aws_clients.created = 99
+
+    assert other.metrics()["gauges"]["aws_client_pool"]["created"] == 99
+    assert vectrix.metrics()["gauges"]["aws_client_pool"]["created"] == vectrix.aws_clients.created != 99
+    assert "aws_client_pool" not in registry.snapshot()["gauges"]
+    assert "key_conversion_cache" in registry.snapshot()["gauges"]
@@ -0,0 +1,119 @@
+import os
+import sys
+import pytest
+import subprocess
+from pytest_mock import mocker
+from tests import vectrix
+
+from vectrix.standin import StandInServer
+from .test_batch import make_batches
+from vectrix.checks import output_type_check
+from vectrix.graphql.encoder import StdlibJSONBackend, assemble_output_body, encode_output_body
+from vectrix.parallel import parallel_output_check, process_pool, shards, main_module_guarded, source_is_guarded
+
+
+@pytest.fixture
+def small_shards(mocker):
+    mocker.patch("vectrix.parallel.MIN_SHARD_SIZE", 4)
+
+
+def test_shards_cover_items(small_shards):
+    assets, _, _ = make_batches(10)
+    lists = assets.to_dicts()
+
+    assert [len(shard) for shard in shards(lists, 2)] == [5, 5]
+    assert [len(shard) for shard in shards(lists, 8)] == [4, 4, 2]
+    assert [item for shard in shards(assets, 3) for item in shard] == lists
+
+
+def test_process_pool_does_not_fork():
+    assert process_pool(2)._mp_context.get_start_method() in ("forkserver", "spawn")
+
+
+@pytest.mark.parametrize("as_lists", [False, True])
+def test_parallel_encoding_matches_serial(small_shards, as_lists):
+    batches = make_batches(25)
+    if as_lists:
+        batches = tuple(batch.to_dicts() for batch in batches)
+    backend = StdlibJSONBackend()
+
+    encoded = parallel_output_check(*batches, workers=2, backend=backend)
+    assert assemble_output_body("query", *encoded, {"a": 1}, backend) == encode_output_body("query", *batches, {"a": 1}, backend=backend)
+    assert parallel_output_check(*batches, workers=2) is None
+
+
+@pytest.mark.parametrize("change", [
+    lambda assets, issues: assets.append(dict(assets[3], display_name="Bucket x")),
+    lambda assets, issues: assets.insert(2, dict(assets[20], type="aws_s3_Bucket")),
+    lambda assets, issues: assets.append(dict(assets[1])),
+    lambda assets, issues: issues.append(dict(issues[0], asset_id=["missing"])),
+    lambda assets, issues: issues.append(dict(issues[0], metadata={"bad key": {"priority": 1, "value": "x"}})),
+])
+def test_parallel_errors_match_serial(small_shards, change):
+    assets, issues, events = (batch.to_dicts() for batch in make_batches(25))
+    change(assets, issues)
+
+    with pytest.raises(ValueError) as serial:
+        output_type_check(assets, issues, events)
+    with pytest.raises(ValueError) as parallel:
+        parallel_output_check(assets, issues, events, workers=2)
+    assert str(parallel.value) == str(serial.value)
+
+
+def test_output_workers(mocker, small_shards):
+    batches = make_batches(30)
+    with StandInServer() as server:
+        mocker.patch("vectrix.graphql.client.API_URL", server.url)
+        mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+        vectrix.output(assets=batches[0], issues=batches[1], events=batches[2], workers=2)
+        parallel_scan = server.last_scan
+        vectrix.output(assets=batches[0], issues=batches[1], events=batches[2])
+
+    assert parallel_scan == server.last_scan
+
+    with pytest.raises(ValueError):
+        vectrix.output(assets=[], issues=[], events=[], workers=0)
+
+
+PACK = """
+from vectrix import vectrix
+from vectrix import MetadataPriority
+
+assets = [{{"type": "aws_s3_bucket", "id": "arn:aws:s3:::bucket-{{0}}".format(index), "display_name": "Bucket: {{0}}".format(index),
+           "metadata": {{"region": {{"priority": MetadataPriority.LOW, "value": "us-east-1"}}}}}} for index in range(10)]
+{0}
+"""
+
+
+def run_pack(tmp_path, body):
+    (tmp_path / ".vectrix").mkdir()
+    (tmp_path / "pack.py").write_text(PACK.format(body))
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return subprocess.run([sys.executable, "pack.py"], cwd=str(tmp_path), env=env, capture_output=True, text=True, timeout=120)
+
+
+def test_unguarded_pack_validates_serially(tmp_path):
+    pack = run_pack(tmp_path, 'print("scanning")\nvectrix.output(assets=assets, issues=[], events=[], workers=2)')
+
+    assert pack.returncode == 0, pack.stderr
+    assert pack.stdout.count("scanning") == 1
+    assert "Validating the output serially" in (tmp_path / ".vectrix" / "vectrix-detection-pack.log").read_text()
+
+
+def test_guarded_pack_uses_workers(tmp_path):
+    pack = run_pack(tmp_path, 'if __name__ == "__main__":\n    print("scanning")\n    vectrix.output(assets=assets, issues=[], events=[], workers=2)')
+
+    assert pack.returncode == 0, pack.stderr
+    assert pack.stdout.count("scanning") == 1
+    assert "Validating the output serially" not in (tmp_path / ".vectrix" / "vectrix-detection-pack.log").read_text()
+
+
+def test_main_module_guard_detection(tmp_path):
+    guarded, unguarded = tmp_path / "guarded.py", tmp_path / "unguarded.py"
+    guarded.write_text("import vectrix\n\nif '__main__' == __name__:\n    pass\n")
+    unguarded.write_text("import vectrix\n\ndef main():\n    if __name__ == '__main__':\n        pass\n")
+
+    assert source_is_guarded(str(guarded))
+    assert not source_is_guarded(str(unguarded))
+    # pytest runs with a guarded entry point (or as python -m pytest)
+    assert main_module_guarded()
@@ -0,0 +1,71 @@
+import pytest
+from pytest_mock import mocker
+
+from vectrix.standin import StandInServer
+from .test_vectrix import correct_asset, correct_issue, correct_event
+from vectrix.graphql.routes import GraphQLRoutes
+from vectrix.graphql.utils import vectrix_item_converter
+from vectrix.main import VectrixUtils
+from vectrix.scan_results import LastScanResults
+
+scan_results = {
+    "assets": [dict(correct_asset[0], id="arn:aws:s3:::a"), dict(correct_asset[0], id="arn:aws:s3:::b"),
+               dict(correct_asset[0], id="i-1", type="aws_ec2_instance")],
+    "issues": [dict(correct_issue[0], asset_id=["arn:aws:s3:::a", "arn:aws:s3:::b"]),
+               dict(correct_issue[0], issue="Unencrypted S3 Bucket", asset_id=["arn:aws:s3:::a"])],
+    "events": [dict(correct_event[0], event_time=30), dict(correct_event[0], event_time=10),
+               dict(correct_event[0], event_time=20), dict(correct_event[0], event="S3 Bucket Deleted", event_time=15)]
+}
+
+
+@pytest.mark.parametrize("convert", [False, True])
+def test_last_scan_results_lookups(convert):
+    results = {kind: vectrix_item_converter(items) for kind, items in scan_results.items()} if convert else scan_results
+    last_scan = LastScanResults(results)
+
+    assert "arn:aws:s3:::a" in last_scan and "arn:aws:s3:::c" not in last_scan
+    assert last_scan.get_asset("i-1") is results["assets"][2]
+    assert last_scan.get_asset("arn:aws:s3:::c") is None
+    assert last_scan.assets_of_type("aws_s3_bucket") == results["assets"][:2]
+    assert last_scan.assets_of_type("aws_iam_user") == []
+    assert last_scan.issues_for_asset("arn:aws:s3:::a") == results["issues"]
+    assert last_scan.issues_for_asset("arn:aws:s3:::b") == results["issues"][:1]
+    created = results["events"][:3]
+    assert last_scan.events_of_type("S3 Bucket Created") == [created[1], created[2], created[0]]
+    assert last_scan.events_of_type("S3 Bucket Created", start=15, end=30) == [created[2]]
+    assert last_scan.events_of_type("S3 Bucket Created", start=20) == [created[2], created[0]]
+    assert last_scan.events_of_type("S3 Bucket Modified") == []
+    assert last_scan.to_dict() == results
+
+
+def test_last_scan_results_empty():
+    last_scan = LastScanResults({"assets": None, "issues": None, "events": None})
+    assert last_scan.get_asset("arn:aws:s3:::a") is None
+    assert last_scan.to_dict() == {"assets": [], "issues": [], "events": []}
+
+
+def test_last_scan_results_is_cached(mocker):
+    with StandInServer() as server:
+        server.last_scan = {kind: vectrix_item_converter(items) for kind, items in scan_results.items()}
+        mocker.patch("vectrix.graphql.client.API_URL", server.url)
+        mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+        mocker.patch("vectrix.main.activate_sentry")
+        utils = VectrixUtils()
+
+        last_scan = utils.last_scan_results()
+        assert utils.last_scan_results() is last_scan
+
+    assert len(server.requests_for(GraphQLRoutes.GET_LAST_SCAN_RESULTS)) == 1
+    assert last_scan.get_asset("arn:aws:s3:::b")["displayName"] == "Bucket: Sample ID"
+
+
+def test_last_scan_results_development_mode(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    utils = VectrixUtils()
+    utils.output(assets=list(correct_asset), issues=list(correct_issue), events=list(correct_event))
+
+    last_scan = utils.last_scan_results()
+    utils.output(assets=[], issues=[], events=[])
+
+    assert utils.last_scan_results() is last_scan
+    assert last_scan.get_asset("arn:aws:s3:::sample-id") == correct_asset[0]
@@ -0,0 +1,75 @@
+import json
+import time
+import pytest
+import requests
+from pytest_mock import mocker
+from tests import vectrix
+
+from vectrix.graphql.routes import GraphQLRoutes
+from vectrix.standin import StandInServer
+
+
+def post(server, route: GraphQLRoutes, variables: dict = None):
+    return requests.post(server.url, json={"query": route.value, "variables": variables or {}})
+
+
+def test_state_and_scan_results_round_trip(mocker):
+    with StandInServer(state={"cursor": 1}) as server:
+        mocker.patch("vectrix.graphql.client.API_URL", server.url)
+        mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+        vectrix.output(assets=[], issues=[], events=[])
+
+        results = post(server, GraphQLRoutes.GET_LAST_SCAN_RESULTS).json()["data"]["deploymentLastScanResults"]
+        assert json.loads(results["assets"]) == []
+        assert post(server, GraphQLRoutes.GET_STATE).json()["data"]["deployment"]["state"] == json.dumps(server.state)
+
+    stats = server.stats()
+    assert stats["requests"] == 3
+    assert stats["by_route"]["OUTPUT_RESULTS"] == 1 and stats["by_status"] == {200: 3}
+    assert stats["bytes_received"] == sum(request["size"] for request in server.requests)
+
+
+def test_unknown_query():
+    with StandInServer() as server:
+        assert requests.post(server.url, json={"query": "{ unknown }", "variables": {}}).status_code == 400
+    assert server.stats()["by_status"] == {400: 1}
+
+
+def test_fail_next():
+    with StandInServer() as server:
+        server.fail_next(503, count=2, route=GraphQLRoutes.GET_STATE)
+        assert post(server, GraphQLRoutes.GET_CREDENTIALS).status_code == 200
+        assert [post(server, GraphQLRoutes.GET_STATE).status_code for _ in range(3)] == [503, 503, 200]
+
+    assert [request["status"] for request in server.requests_for(GraphQLRoutes.GET_STATE)] == [503, 503, 200]
+
+
+def test_error_rate_is_seeded():
+    statuses = []
+    for _ in range(2):
+        with StandInServer(error_rate=0.5, error_status=429, seed=7) as server:
+            statuses.append([post(server, GraphQLRoutes.GET_STATE).status_code for _ in range(20)])
+
+    assert statuses[0] == statuses[1]
+    assert set(statuses[0]) == {200, 429}
+    with pytest.raises(ValueError):
+        StandInServer(error_status=200)
+
+
+def test_throttling():
+    with StandInServer(max_requests_per_second=5, burst=2) as server:
+        responses = [post(server, GraphQLRoutes.GET_STATE) for _ in range(3)]
+        assert [response.status_code for response in responses] == [200, 200, 429]
+        assert int(responses[2].headers["Retry-After"]) >= 1
+        time.sleep(0.25)
+        assert post(server, GraphQLRoutes.GET_STATE).status_code == 200
+
+
+def test_route_latency():
+    with StandInServer(route_latency={GraphQLRoutes.GET_STATE: 0.1}) as server:
+        post(server, GraphQLRoutes.GET_STATE)
+        post(server, GraphQLRoutes.GET_CREDENTIALS)
+
+    state, credentials = server.requests_for(GraphQLRoutes.GET_STATE)[0], server.requests_for(GraphQLRoutes.GET_CREDENTIALS)[0]
+    assert state["seconds"] >= 0.1 > credentials["seconds"]
+    assert server.stats()["max_seconds"] == state["seconds"]
@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import subprocess
+import pytest
+from pytest_mock import mocker
+
+from vectrix.main import VectrixUtils
+from vectrix.storage import JournaledStateStore, SQLiteStore, atomic_write
+from vectrix.scan_results import StoredLastScanResults
+
+from .test_vectrix import correct_asset, correct_issue, correct_event
+
+scan_results = {"assets": correct_asset, "issues": correct_issue, "events": correct_event}
+
+
+def test_journaled_state_store_round_trip(tmp_path):
+    store = JournaledStateStore(str(tmp_path))
+    state = store.load()
+    assert state == {}
+
+    state.update({"cursor": 1, "page": "a"})
+    store.set({"cursor": 1, "page": "a"}, state)
+    state.pop("page")
+    store.unset("page", state)
+    state.update({"cursor": 2})
+    store.set({"cursor": 2}, state)
+    store.close()
+
+    assert json.loads((tmp_path / "module_state.json").read_text()) == {}
+    assert len((tmp_path / "module_state.journal").read_text().splitlines()) == 3
+    assert JournaledStateStore(str(tmp_path)).load() == {"cursor": 2}
+
+
+def test_journaled_state_store_compaction(tmp_path):
+    store = JournaledStateStore(str(tmp_path), compact_after=3)
+    state = store.load()
+    for index in range(4):
+        state.update({str(index): index})
+        store.set({str(index): index}, state)
+    store.close()
+
+    assert json.loads((tmp_path / "module_state.json").read_text()) == {"0": 0, "1": 1, "2": 2}
+    assert (tmp_path / "module_state.journal").read_text() == '{"set": {"3": 3}}\n'
+    assert JournaledStateStore(str(tmp_path)).load() == {"0": 0, "1": 1, "2": 2, "3": 3}
+
+
+def test_journaled_state_store_partial_patch(tmp_path):
+    (tmp_path / "module_state.json").write_text('{"cursor": 1}')
+    (tmp_path / "module_state.journal").write_text('{"set": {"cursor": 2}}\n{"set": {"cur')
+
+    store = JournaledStateStore(str(tmp_path))
+    state = store.load()
+    assert state == {"cursor": 2}
+
+    state.update({"page": 1})
+    store.set({"page": 1}, state)
+    store.close()
+    assert JournaledStateStore(str(tmp_path)).load() == {"cursor": 2, "page": 1}
+
+
+def test_atomic_write(tmp_path):
+    path = str(tmp_path / "last_scan_results.json")
+    atomic_write(path, '{"assets": []}')
+    atomic_write(path, '{"assets": [1]}')
+
+    assert json.loads((tmp_path / "last_scan_results.json").read_text()) == {"assets": [1]}
+    assert [path.name for path in tmp_path.iterdir()] == ["last_scan_results.json"]
+
+
+def test_sqlite_store_state(tmp_path):
+    store = SQLiteStore(str(tmp_path))
+    store.set({"cursor": 1, "pages": [1, 2]})
+    store.set({"cursor": 2})
+    store.unset("pages")
+
+    assert store.get("cursor") == 2
+    assert store.get("pages") is None
+    assert SQLiteStore(str(tmp_path)).load() == {"cursor": 2}
+
+
+def test_sqlite_store_scan_results(tmp_path):
+    store = SQLiteStore(str(tmp_path))
+    assert store.read() == {"assets": [], "issues": [], "events": []}
+
+    store.write(scan_results)
+
+    assert store.read() == scan_results
+    assert store.get_asset("arn:aws:s3:::sample-id") == correct_asset[0]
+    assert store.get_asset("arn:aws:s3:::missing") is None
+    assert store.assets_of_type("aws_s3_bucket") == correct_asset
+    assert store.issues_for_asset("arn:aws:s3:::sample-id") == correct_issue
+    assert store.events_of_type("S3 Bucket Created", start=1596843510, end=1596843511) == correct_event
+    assert store.events_of_type("S3 Bucket Created", start=1596843511) == []
+
+
+def test_sqlite_store_writer_replaces_scan_on_complete(tmp_path):
+    store = SQLiteStore(str(tmp_path))
+    store.write(scan_results)
+
+    writer = store.open_writer()
+    writer.begin("assets")
+    writer.write("assets", dict(correct_asset[0], id="new"), json.dumps(dict(correct_asset[0], id="new")))
+    assert store.read() == scan_results
+    writer.abort()
+    assert store.read() == scan_results
+
+    writer = store.open_writer()
+    writer.write("assets", dict(correct_asset[0], id="new"), json.dumps(dict(correct_asset[0], id="new")))
+    writer.complete()
+    assert store.read() == {"assets": [dict(correct_asset[0], id="new")], "issues": [], "events": []}
+
+
+def asset_with_id(asset_id):
+    asset = dict(correct_asset[0], id=asset_id)
+    return asset, json.dumps(asset)
+
+
+def test_sqlite_store_overlapping_writers(tmp_path):
+    store = SQLiteStore(str(tmp_path))
+    first, second = store.open_writer(), store.open_writer()
+    first.write("assets", *asset_with_id("first-0"))
+    second.write("assets", *asset_with_id("second-0"))
+    second.complete()
+    first.write("assets", *asset_with_id("first-1"))
+
+    assert [asset["id"] for asset in store.read()["assets"]] == ["second-0"]
+    first.complete()
+    assert [asset["id"] for asset in store.read()["assets"]] == ["first-0", "first-1"]
+
+    third = store.open_writer()
+    third.write("assets", *asset_with_id("third-0"))
+    store.write(scan_results)
+    third.complete()
+    assert [asset["id"] for asset in store.read()["assets"]] == ["third-0"]
+
+
+def test_sqlite_store_keeps_the_replaced_generation(tmp_path):
+    store = SQLiteStore(str(tmp_path))
+    store.write({"assets": [asset_with_id("a")[0]]})
+    pinned = store.scan_generation()
+    store.write(scan_results)
+
+    assert store.get_asset("a", pinned) == asset_with_id("a")[0]
+    assert store.get_asset("a") is None
+    store.write(scan_results)
+    assert store.read(pinned) == {"assets": [], "issues": [], "events": []}
+    generations = store._query("SELECT DISTINCT generation FROM scan_items")
+    assert len(generations) == 2
+
+
+def test_sqlite_store_deletes_generations_of_crashed_writers(tmp_path, monkeypatch):
+    monkeypatch.setattr(SQLiteStore, "BATCH_SIZE", 1)
+    store = SQLiteStore(str(tmp_path))
+    crashed, slow = store.open_writer(), store.open_writer()
+    crashed.write("assets", *asset_with_id("crashed-0"))
+    slow.write("assets", *asset_with_id("slow-0"))
+    store.write(scan_results)
+    store.write(scan_results)
+
+    # Rows of writers are kept while they could still be alive, and deleted once they timed out
+    assert {row[0] for row in store._query("SELECT DISTINCT generation FROM scan_items")} == {crashed.generation, slow.generation, 3, 4}
+    monkeypatch.setattr(SQLiteStore, "WRITER_TIMEOUT", -1)
+    store.write(scan_results)
+    assert {row[0] for row in store._query("SELECT DISTINCT generation FROM scan_items")} == {4, 5}
+    assert store._query("SELECT key FROM meta WHERE key LIKE 'writer:%'") == []
+
+    with pytest.raises(RuntimeError):
+        slow.complete()
+    assert store.read() == scan_results
+
+
+def test_sqlite_store_multiple_processes(tmp_path):
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    worker = ("import sys\n"
+              "from vectrix.storage import SQLiteStore\n"
+              "store = SQLiteStore(sys.argv[1])\n"
+              "for index in range(50):\n"
+              "    store.set({sys.argv[2] + str(index): index})\n")
+    workers = [subprocess.Popen([sys.executable, "-c", worker, str(tmp_path), "worker{0}-".format(number)],
+                                env=dict(os.environ, PYTHONPATH=package_root)) for number in range(4)]
+
+    assert [process.wait() for process in workers] == [0, 0, 0, 0]
+    assert len(SQLiteStore(str(tmp_path)).load()) == 200
+
+
+def test_vectrix_sqlite_backend(tmp_path, monkeypatch, mocker):
+    monkeypatch.chdir(tmp_path)
+    mocker.patch("vectrix.main.LOCAL_STORAGE_BACKEND", "sqlite")
+    sqlite_vectrix = VectrixUtils()
+
+    sqlite_vectrix.set_state({"cursor": 1, "page": 1})
+    sqlite_vectrix.unset_state("page")
+    sqlite_vectrix.output(assets=list(correct_asset), issues=list(correct_issue), events=list(correct_event))
+
+    assert (tmp_path / ".vectrix" / "vectrix.db").exists()
+    assert not (tmp_path / ".vectrix" / "module_state.json").exists()
+    assert not (tmp_path / ".vectrix" / "last_scan_results.json").exists()
+    assert VectrixUtils().get_state() == {"cursor": 1}
+    assert sqlite_vectrix.get_last_scan_results() == scan_results
+
+    sqlite_vectrix.output_stream(assets=iter(correct_asset))
+    assert sqlite_vectrix.get_last_scan_results() == {"assets": correct_asset, "issues": [], "events": []}
+
+
+def test_vectrix_sqlite_backend_point_reads(tmp_path, monkeypatch, mocker):
+    monkeypatch.chdir(tmp_path)
+    mocker.patch("vectrix.main.LOCAL_STORAGE_BACKEND", "sqlite")
+    sqlite_vectrix = VectrixUtils()
+    sqlite_vectrix.set_state({"cursor": 1})
+    sqlite_vectrix.output(assets=list(correct_asset), issues=list(correct_issue), events=list(correct_event))
+
+    reader = VectrixUtils()
+    load, read = mocker.spy(SQLiteStore, "load"), mocker.spy(SQLiteStore, "read")
+    assert reader.get_state("cursor") == 1
+    assert reader.get_state("missing", "default") == "default"
+    results = reader.last_scan_results()
+    assert isinstance(results, StoredLastScanResults)
+    assert "arn:aws:s3:::sample-id" in results
+    assert results.assets_of_type("aws_s3_bucket") == correct_asset
+    assert results.issues_for_asset("arn:aws:s3:::sample-id") == correct_issue
+    assert results.events_of_type("S3 Bucket Created", start=1596843510) == correct_event
+    assert load.call_count == 0 and read.call_count == 0
+
+    reader.output(assets=[], issues=[], events=[])
+    assert results.get_asset("arn:aws:s3:::sample-id") == correct_asset[0]
+    assert results.to_dict() == scan_results
@@ -0,0 +1,80 @@
+import json
+import pytest
+from pytest_mock import mocker
+from tests import vectrix
+
+from .conftest import generate_scan
+from .test_vectrix import correct_asset, correct_issue, correct_event
+from vectrix.graphql.routes import GraphQLRoutes
+from vectrix.graphql.utils import vectrix_item_converter, convert_item
+from vectrix.graphql.encoder import json_backend
+
+
+def test_output_stream_chunks(standin):
+    issue = dict(correct_issue[0], asset_id=["arn:aws:s3:::sample-id-3"])
+    vectrix.output_stream(assets=iter(generate_scan(25)["assets"]), issues=iter([issue]),
+                          events=iter(correct_event), chunk_size=10, scan_sessions=True)
+
+    assert len(standin.requests_for(GraphQLRoutes.CREATE_SCAN_SESSION)) == 1
+    assert len(standin.requests_for(GraphQLRoutes.OUTPUT_RESULTS_CHUNK)) == 3
+    assert len(standin.requests_for(GraphQLRoutes.COMPLETE_SCAN_SESSION)) == 1
+    assert standin.last_scan == {
+        "assets": vectrix_item_converter(generate_scan(25)["assets"]),
+        "issues": vectrix_item_converter([issue]),
+        "events": vectrix_item_converter(correct_event)
+    }
+
+
+def test_output_stream_chunk_bytes(standin):
+    vectrix.output_stream(assets=iter(generate_scan(10)["assets"]), chunk_bytes=1, scan_sessions=True)
+
+    assert len(standin.requests_for(GraphQLRoutes.OUTPUT_RESULTS_CHUNK)) == 10
+
+
+def test_output_stream_chunk_bytes_counts_each_item_once(standin):
+    item_bytes = len(json_backend().dumps(convert_item(generate_scan(1)["assets"][0])))
+    vectrix.output_stream(assets=iter(generate_scan(10)["assets"]), chunk_bytes=3 * item_bytes, scan_sessions=True)
+
+    chunks = standin.requests_for(GraphQLRoutes.OUTPUT_RESULTS_CHUNK)
+    assert [len(chunk["variables"]["input"]["assets"]) for chunk in chunks] == [3, 3, 3, 1]
+
+
+def test_output_stream_without_scan_sessions(standin):
+    issue = dict(correct_issue[0], asset_id=["arn:aws:s3:::sample-id-3"])
+    vectrix.output_stream(assets=iter(generate_scan(25)["assets"]), issues=iter([issue]), events=iter(correct_event), chunk_size=10)
+
+    assert len(standin.requests_for(GraphQLRoutes.OUTPUT_RESULTS)) == 1
+    assert standin.requests_for(GraphQLRoutes.CREATE_SCAN_SESSION) == []
+    expected = {"assets": generate_scan(25)["assets"], "issues": [issue], "events": correct_event}
+    for kind, items in expected.items():
+        sent = [dict(item, metadata=json.loads(item["metadata"])) for item in standin.last_scan[kind]]
+        assert sent == [dict(item, metadata=json.loads(item["metadata"])) for item in vectrix_item_converter(items)]
+
+
+def test_output_stream_validation_error_does_not_complete(standin):
+    def assets():
+        yield from generate_scan(5)["assets"]
+        yield dict(correct_asset[0], type="Aws_s3_bucket")
+
+    with pytest.raises(ValueError) as excinfo:
+        vectrix.output_stream(assets=assets(), chunk_size=2, scan_sessions=True)
+    assert 'asset type vendor instantiation is required to be all lowercase' == str(
+        excinfo.value).split(".")[0]
+    assert len(standin.requests_for(GraphQLRoutes.COMPLETE_SCAN_SESSION)) == 0
+    assert standin.last_scan is None
+
+
+def test_output_stream_development_mode_matches_output(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".vectrix").mkdir()
+    results_file = tmp_path / ".vectrix" / "last_scan_results.json"
+
+    vectrix.output(assets=list(correct_asset), issues=list(correct_issue), events=list(correct_event))
+    output_printed = capsys.readouterr().out
+    output_results = results_file.read_text()
+
+    vectrix.output_stream(assets=iter(correct_asset), issues=iter(correct_issue), events=iter(correct_event))
+
+    assert capsys.readouterr().out == output_printed
+    assert results_file.read_text() == output_results
+    assert json.loads(output_results) == {"assets": correct_asset, "issues": correct_issue, "events": correct_event}
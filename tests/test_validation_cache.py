@@ -0,0 +1,148 @@
+import pytest
+from pytest_mock import mocker
+from tests import vectrix
+
+from .conftest import generate_scan
+from .test_vectrix import correct_asset
+from vectrix.checks import output_type_check, output_validator
+from vectrix.validation_cache import ValidationCache, item_hash, CACHE_HEADER
+
+
+def make_output(count):
+    scan = generate_scan(count)
+    return scan["assets"], scan["issues"], scan["events"]
+
+
+def test_item_hash_ignores_key_order():
+    asset = correct_asset[0]
+    reordered = dict(reversed(list(asset.items())))
+    assert item_hash("asset", asset) == item_hash("asset", reordered)
+    assert item_hash("asset", asset) != item_hash("issue", asset)
+    assert item_hash("asset", asset) != item_hash("asset", dict(asset, id="other"))
+    assert item_hash("asset", dict(asset, id=object())) is None
+
+
+def test_cache_lru_eviction_and_persistence(tmp_path):
+    path = str(tmp_path / "validation_cache")
+    cache = ValidationCache(path, max_size=3)
+    cache.add(["a", "b", "c"])
+    assert "a" in cache
+    cache.add(["d"])
+
+    assert "b" not in cache
+    assert cache.stats() == {"hits": 1, "misses": 1, "cached": 3, "max_size": 3}
+    cache.save()
+    assert open(path).read().splitlines() == [CACHE_HEADER, "c", "a", "d"]
+
+    reloaded = ValidationCache(path, max_size=2)
+    assert len(reloaded) == 2 and "a" in reloaded and "d" in reloaded
+
+
+def test_cache_of_another_validator_version_is_discarded(tmp_path, mocker):
+    path = str(tmp_path / "validation_cache")
+    cache = ValidationCache(path)
+    cache.add(["a"])
+    cache.save()
+    mocker.patch("vectrix.validation_cache.CACHE_HEADER", "vectrix-validation-cache 0")
+
+    upgraded = ValidationCache(path)
+    assert len(upgraded) == 0
+    upgraded.save()
+    assert open(path).read().splitlines() == ["vectrix-validation-cache 0"]
+
+
+def test_cached_validation_skips_known_items(mocker, tmp_path):
+    cache = ValidationCache(str(tmp_path / "validation_cache"))
+    assets, issues, events = make_output(5)
+    output_type_check(assets, issues, events, "cached", cache=cache)
+    assert cache.stats()["misses"] == 15
+
+    validate_issue = mocker.spy(output_validator, "validate_issue")
+    output_type_check(assets, issues, events, "cached", cache=cache)
+    assert cache.stats()["hits"] == 15
+    assert validate_issue.call_count == 0
+
+
+def test_cached_validation_keeps_cross_item_checks(tmp_path):
+    cache = ValidationCache(str(tmp_path / "validation_cache"))
+    assets, issues, events = make_output(3)
+    output_type_check(assets, issues, events, "cached", cache=cache)
+
+    with pytest.raises(ValueError) as excinfo:
+        output_type_check(assets + [assets[0]], issues, events, "cached", cache=cache)
+    assert "Duplicate asset id entry" in str(excinfo.value)
+    with pytest.raises(ValueError) as excinfo:
+        output_type_check(assets[1:], issues, events, "cached", cache=cache)
+    assert "references non-existent asset" in str(excinfo.value)
+
+
+def test_invalid_items_are_not_cached(tmp_path):
+    cache = ValidationCache(str(tmp_path / "validation_cache"))
+    assets, issues, events = make_output(1)
+    invalid = dict(assets[0], display_name="Bucket Sample ID")
+    for _ in range(2):
+        with pytest.raises(ValueError) as excinfo:
+            output_type_check([invalid], [], [], "cached", cache=cache)
+        assert "requires a colon" in str(excinfo.value)
+
+
+def test_cross_item_errors_follow_asset_order():
+    assets, issues, events = make_output(2)
+    output = [assets[0], dict(assets[0]), dict(assets[1], type="aws s3 bucket")]
+    for validation in ("strict", "off"):
+        with pytest.raises(ValueError) as excinfo:
+            output_type_check(output, [], [], validation)
+        assert str(excinfo.value).startswith("Duplicate asset id entry 'arn:aws:s3:::sample-id-0'")
+
+
+def test_validation_off_and_modes():
+    assets, issues, events = make_output(2)
+    output_type_check([dict(assets[0], type="Not valid")], [], [], "off")
+    with pytest.raises(ValueError) as excinfo:
+        output_type_check(assets + [assets[0]], issues, events, "off")
+    assert str(excinfo.value).startswith("Duplicate asset id entry 'arn:aws:s3:::sample-id-0'")
+    with pytest.raises(ValueError) as excinfo:
+        output_type_check(assets[1:], issues, events, "off")
+    assert str(excinfo.value) == "Vectrix issue ({0}) references non-existent asset: arn:aws:s3:::sample-id-0".format(issues[0]["issue"])
+    with pytest.raises(ValueError):
+        output_type_check([], [], [], "sometimes")
+
+
+def test_output_cached_validation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".vectrix").mkdir()
+    monkeypatch.setattr(vectrix, "_validation_cache", None)
+    assets, issues, events = make_output(2)
+
+    vectrix.output(assets=assets, issues=issues, events=events, validation="cached")
+    assert (tmp_path / ".vectrix" / "validation_cache").read_text().splitlines()[0] == CACHE_HEADER
+    assert len((tmp_path / ".vectrix" / "validation_cache").read_text().splitlines()) == 7
+
+    with pytest.raises(ValueError):
+        vectrix.output(assets=assets, issues=issues, events=events, validation="cached", workers=2)
+
+
+def test_output_cached_validation_needs_orjson(tmp_path, monkeypatch, mocker):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".vectrix").mkdir()
+    monkeypatch.setattr(vectrix, "_validation_cache", None)
+    mocker.patch("vectrix.main.HASH_ENCODER", "json")
+    assets, issues, events = make_output(2)
+
+    vectrix.output(assets=assets, issues=issues, events=events, validation="cached")
+
+    assert not (tmp_path / ".vectrix" / "validation_cache").exists()
+    assert vectrix._validation_cache is None
+    with pytest.raises(ValueError):
+        vectrix.output(assets=assets + [assets[0]], issues=issues, events=events, validation="cached")
+
+
+def test_production_validation_cache_is_kept_in_memory(tmp_path, monkeypatch, mocker):
+    monkeypatch.chdir(tmp_path)
+    mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+    monkeypatch.setattr(vectrix, "_validation_cache", None)
+
+    assert vectrix.validation_cache.path is None
+    vectrix.validation_cache.add(["a"])
+    vectrix.validation_cache.save()
+    assert not (tmp_path / ".vectrix").exists()
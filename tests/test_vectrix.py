@@ -1,5 +1,8 @@
+import os
+import sys
 import pytest
 import json
+import subprocess
 from pytest_mock import mocker
 from tests import vectrix
 
@@ -7,6 +10,7 @@ from .test_assets import TestAsset
 from .test_issues import TestIssue
 from .test_events import TestEvent
 from vectrix.graphql.routes import GraphQLRoutes
+from vectrix.main import VectrixUtils
 
 correct_asset = [
     {
@@ -345,7 +349,7 @@ class TestVectrixUtils():
     def test_production_mode_log(self, mocker):
         fake_pm = mocker.patch("vectrix.main.PRODUCTION_MODE")
         fake_pm = True
-        fake_graphql_client = mocker.patch("vectrix.main.graphql_client")
+        fake_graphql_client = mocker.patch("vectrix.logs.graphql_client")
         fake_graphql_client.return_value = {
             "deploymentLogCreate": {
                 "errors": []
@@ -354,13 +358,14 @@ class TestVectrixUtils():
         correct_variables = {'input': {'logType': 'LOG', 'logVisibility': 'INTERNAL', 'logMessage': 'dummy'}}
 
         vectrix.log(message="dummy")
+        vectrix.flush_logs()
         assert len(fake_graphql_client.mock_calls) == 1
         assert fake_graphql_client.call_args[1]['variables'] == correct_variables
 
     def test_production_mode_external_log(self, mocker):
         fake_pm = mocker.patch("vectrix.main.PRODUCTION_MODE")
         fake_pm = True
-        fake_graphql_client = mocker.patch("vectrix.main.graphql_client")
+        fake_graphql_client = mocker.patch("vectrix.logs.graphql_client")
         fake_graphql_client.return_value = {
             "deploymentLogCreate": {
                 "errors": []
@@ -369,13 +374,14 @@ class TestVectrixUtils():
         correct_variables = {'input': {'logType': 'LOG', 'logVisibility': 'EXTERNAL', 'logMessage': 'dummy'}}
 
         vectrix.external_log(message="dummy")
+        vectrix.flush_logs()
         assert len(fake_graphql_client.mock_calls) == 1
         assert fake_graphql_client.call_args[1]['variables'] == correct_variables
 
     def test_production_mode_error(self, mocker):
         fake_pm = mocker.patch("vectrix.main.PRODUCTION_MODE")
         fake_pm = True
-        fake_graphql_client = mocker.patch("vectrix.main.graphql_client")
+        fake_graphql_client = mocker.patch("vectrix.logs.graphql_client")
         fake_graphql_client.return_value = {
             "deploymentLogCreate": {
                 "errors": []
@@ -384,13 +390,14 @@ class TestVectrixUtils():
         correct_variables = {'input': {'logType': 'ERROR', 'logVisibility': 'INTERNAL', 'logMessage': 'dummy'}}
 
         vectrix.error(error="dummy")
+        vectrix.flush_logs()
         assert len(fake_graphql_client.mock_calls) == 1
         assert fake_graphql_client.call_args[1]['variables'] == correct_variables
 
     def test_production_mode_external_error(self, mocker):
         fake_pm = mocker.patch("vectrix.main.PRODUCTION_MODE")
         fake_pm = True
-        fake_graphql_client = mocker.patch("vectrix.main.graphql_client")
+        fake_graphql_client = mocker.patch("vectrix.logs.graphql_client")
         fake_graphql_client.return_value = {
             "deploymentLogCreate": {
                 "errors": []
@@ -399,5 +406,63 @@ class TestVectrixUtils():
         correct_variables = {'input': {'logType': 'ERROR', 'logVisibility': 'EXTERNAL', 'logMessage': 'dummy'}}
 
         vectrix.external_error(error="dummy")
+        vectrix.flush_logs()
         assert len(fake_graphql_client.mock_calls) == 1
         assert fake_graphql_client.call_args[1]['variables'] == correct_variables
+
+    def test_production_mode_rejected_log_does_not_fail_output(self, mocker):
+        mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+        logs_graphql_client = mocker.patch("vectrix.logs.graphql_client")
+        logs_graphql_client.return_value = {"deploymentLogCreate": {"errors": ["bad log"]}}
+        output_graphql_client = mocker.patch("vectrix.main.graphql_client")
+        output_graphql_client.return_value = {"deploymentScanEntryCreate": {"errors": []}}
+        logger_error = mocker.patch("vectrix.logs.logger.error")
+
+        vectrix.log(message="dummy")
+        vectrix.output(assets=[], issues=[], events=[])
+        assert output_graphql_client.call_count == 1
+        logger_error.assert_called_once_with("Error creating log in Vectrix API: ['bad log']")
+
+    def test_import_has_no_side_effects(self, tmp_path):
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", "import vectrix"], cwd=str(tmp_path), capture_output=True, text=True,
+                                env=dict(os.environ, PYTHONPATH=package_root))
+
+        assert result.returncode == 0
+        assert result.stdout == ""
+        assert not (tmp_path / ".vectrix").exists()
+
+    def test_production_mode_lazy_state(self, mocker):
+        mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+        fake_sentry = mocker.patch("vectrix.main.activate_sentry")
+        fake_graphql_client = mocker.patch("vectrix.main.graphql_client")
+        fake_graphql_client.return_value = {
+            "deployment": {
+                "state": '{"cursor": 1}'
+            }
+        }
+
+        lazy_vectrix = VectrixUtils()
+        assert len(fake_graphql_client.mock_calls) == 0
+        assert len(fake_sentry.mock_calls) == 0
+
+        assert lazy_vectrix.get_state() == {"cursor": 1}
+        assert lazy_vectrix.set_state({"page": 2}) == {"cursor": 1, "page": 2}
+        assert len(fake_graphql_client.mock_calls) == 1
+        assert len(fake_sentry.mock_calls) == 1
+
+    def test_production_mode_prefetch(self, mocker):
+        mocker.patch("vectrix.main.PRODUCTION_MODE", True)
+        mocker.patch("vectrix.main.activate_sentry")
+        fake_graphql_client = mocker.patch("vectrix.main.graphql_client")
+        fake_graphql_client.return_value = {
+            "deployment": {
+                "state": '{"cursor": 1}'
+            }
+        }
+
+        lazy_vectrix = VectrixUtils()
+        assert lazy_vectrix.prefetch().result() == {"cursor": 1}
+        assert lazy_vectrix.prefetch() is lazy_vectrix.prefetch()
+        assert lazy_vectrix.get_state() == {"cursor": 1}
+        assert len(fake_graphql_client.mock_calls) == 1
@@ -1,7 +1,10 @@
-from .main import VectrixUtils
+from .main import VectrixUtils, AwsSessionResult
+from .aio import AsyncVectrixUtils
 from .assets import Asset
 from .events import Event
 from .issues import Issue
-from .metadata import MetadataElement, MetadataPriority
+from .batch import AssetBatch, IssueBatch, EventBatch
+from .metadata import MetadataElement, MetadataPriority, MetadataTemplate
+from .scan_results import LastScanResults
 
 vectrix = VectrixUtils()
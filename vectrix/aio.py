@@ -0,0 +1,169 @@
+"""
+Vectrix Detection Pack Utilities for asyncio
+"""
+import time
+
+from .main import (VectrixUtils, parse_output_response, delta_accepted, parse_credentials_response,
+                   aws_session_variables, parse_aws_session_response, parse_aws_session_credentials, parse_last_scan_results_response,
+                   log_variables, parse_log_response, fetch_credentials, fetch_aws_session_credentials, aws_session_route)
+
+from .graphql.routes import GraphQLRoutes
+from .graphql.client import AsyncGraphQLClient
+from .credentials import CREDENTIALS_KEY
+from .settings import PRODUCTION_MODE, ASYNC_MAX_IN_FLIGHT, OUTPUT_DELTA, OUTPUT_WORKERS, OUTPUT_VALIDATION, OUTPUT_METRICS_REPORT
+
+
+class AsyncVectrixUtils:
+    """
+    Awaitable versions of the VectrixUtils methods that talk to the Vectrix API, for detection packs that scan concurrently.
+    At most max_in_flight API requests are active at once, no matter how many coroutines are awaiting.
+
+    State, buffered logs, and caches are shared with the wrapped VectrixUtils instance (the vectrix singleton by default), and
+    local development mode (.vectrix/ files, logging) is handled by it, so development behaviour is identical to the synchronous class.
+    Calls into it that can block (requests, validation, log buffering) run on the request workers rather than on the event loop.
+    """
+
+    def __init__(self, utils: VectrixUtils = None, max_in_flight: int = ASYNC_MAX_IN_FLIGHT):
+        if utils is None:
+            from . import vectrix as utils
+        self.utils = utils
+        self._client = AsyncGraphQLClient(max_in_flight=max_in_flight)
+
+    def get_state(self):
+        return self.utils.get_state()
+
+    def set_state(self, new_state: dict):
+        return self.utils.set_state(new_state)
+
+    def unset_state(self, key: str):
+        return self.utils.unset_state(key)
+
+    async def output(self, *ignore, assets=None, issues=None, events=None, delta: bool = OUTPUT_DELTA, workers: int = OUTPUT_WORKERS,
+                     validation: str = OUTPUT_VALIDATION, report_metrics: bool = OUTPUT_METRICS_REPORT):
+        """
+        Awaitable VectrixUtils.output
+        """
+        if PRODUCTION_MODE is False:
+            return await self._client.run(self.utils.output, assets=assets, issues=issues, events=events, delta=delta,
+                                          workers=workers, validation=validation, report_metrics=report_metrics)
+
+        run = self._client.run
+        started = time.perf_counter()
+        encoded = await run(self.utils._check_output, assets, issues, events, delta, workers, validation)
+        await run(self.utils.flush_logs)
+        sent = False
+        if delta:
+            last_scan_results = await self.get_last_scan_results()
+            variables = await run(self.utils._output_delta_variables, last_scan_results, assets, issues, events)
+            sent = delta_accepted(await self._client(route=GraphQLRoutes.OUTPUT_RESULTS_DELTA, variables=variables))
+        if not sent:
+            # The body includes the state, which is requested first if it isn't loaded yet
+            body = await run(self.utils._output_body, assets, issues, events, encoded)
+            response = await self._client(route=GraphQLRoutes.OUTPUT_RESULTS, body=body)
+            parse_output_response(response)
+        await run(self.utils._output_sent, started, report_metrics)
+
+    async def get_credentials(self):
+        """
+        Awaitable VectrixUtils.get_credentials
+        """
+        if PRODUCTION_MODE is False:
+            return self.utils.get_credentials()
+
+        cache = self.utils.credential_cache
+        if cache is not None:
+            credentials = cache.lookup(CREDENTIALS_KEY)
+            if credentials is not None:
+                return dict(credentials)
+        response = await self._client(route=GraphQLRoutes.GET_CREDENTIALS)
+        if cache is None:
+            return parse_credentials_response(response)
+        return cache.store_credentials(parse_credentials_response(response), fetch_credentials)
+
+    async def create_aws_session(self, aws_role_arn=None, aws_external_id=None):
+        """
+        Awaitable VectrixUtils.create_aws_session
+        """
+        if PRODUCTION_MODE is False:
+            return self.utils.create_aws_session(aws_role_arn=aws_role_arn, aws_external_id=aws_external_id)
+
+        cache = self.utils.credential_cache
+        if cache is not None:
+            session = cache.cached_aws_session((aws_role_arn, aws_external_id))
+            if session is not None:
+                return session
+        response = await self._client(route=aws_session_route(),
+                                      variables=aws_session_variables(aws_role_arn, aws_external_id))
+        if cache is None:
+            return parse_aws_session_response(response)
+        return cache.store_aws_session((aws_role_arn, aws_external_id), parse_aws_session_credentials(response),
+                                       lambda: fetch_aws_session_credentials(aws_role_arn, aws_external_id))
+
+    async def get_last_scan_results(self):
+        """
+        Awaitable VectrixUtils.get_last_scan_results
+        """
+        if PRODUCTION_MODE is False:
+            return await self._client.run(self.utils.get_last_scan_results)
+
+        response = await self._client(route=GraphQLRoutes.GET_LAST_SCAN_RESULTS)
+        return parse_last_scan_results_response(response)
+
+    async def __log_sender(self, log_type: str, visibility: str, message: str):
+        """
+        With log batching enabled, the log is buffered in the wrapped VectrixUtils' log shipper, the same as the synchronous log methods.
+        Buffering runs on the request workers, as it blocks while the buffer is full with LOG_OVERFLOW=block.
+        """
+        variables = log_variables(log_type, visibility, message)
+        if self.utils.log_shipper is not None:
+            await self._client.run(self.utils.log_shipper.enqueue, variables["input"])
+            return
+        response = await self._client(route=GraphQLRoutes.CREATE_LOG, variables=variables)
+        parse_log_response(response)
+
+    async def log(self, message: str):
+        """
+        Awaitable VectrixUtils.log
+        """
+        if not isinstance(message, str):
+            raise ValueError(
+                "log requires str type parameter containing log message")
+        if PRODUCTION_MODE is False:
+            return self.utils.log(message)
+        await self.__log_sender(log_type="LOG", visibility="INTERNAL", message=message)
+
+    async def external_log(self, message: str):
+        """
+        Awaitable VectrixUtils.external_log
+        """
+        if not isinstance(message, str):
+            raise ValueError(
+                "external_log requires str type parameter containing log message")
+        if PRODUCTION_MODE is False:
+            return self.utils.external_log(message)
+        await self.__log_sender(log_type="LOG", visibility="EXTERNAL", message=message)
+
+    async def error(self, error: str):
+        """
+        Awaitable VectrixUtils.error
+        """
+        if not isinstance(error, str):
+            raise ValueError(
+                "error requires str type parameter containing error message")
+        if PRODUCTION_MODE is False:
+            return self.utils.error(error)
+        await self.__log_sender(log_type="ERROR", visibility="INTERNAL", message=error)
+
+    async def external_error(self, error: str):
+        """
+        Awaitable VectrixUtils.external_error
+        """
+        if not isinstance(error, str):
+            raise ValueError(
+                "external_error requires str type parameter containing error message")
+        if PRODUCTION_MODE is False:
+            return self.utils.external_error(error)
+        await self.__log_sender(log_type="ERROR", visibility="EXTERNAL", message=error)
+
+    def close(self):
+        self._client.close()
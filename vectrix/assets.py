@@ -3,38 +3,75 @@
 https://developer.vectrix.io/dev/components/output#assets
 """
 class Asset():
-    def __init__(self):
-        self._display_name = None
-        self._id = None
-        self._link = None
-        self._metadata = None
-        self._type = None
+    __slots__ = ("_display_name", "_id", "_link", "_metadata", "_type")
+
+    def __init__(self, type=None, id=None, display_name=None, metadata=None, link=None):
+        self._display_name = display_name
+        self._id = id
+        self._link = link
+        self._metadata = metadata
+        self._type = type
 
     """Displayed name of the Asset"""
     @property
     def display_name(self):
         return self._display_name
 
+    @display_name.setter
+    def display_name(self, display_name):
+        self._display_name = display_name
+
     """Static and unique identifier of the Asset"""
     @property
     def id(self):
         return self._id
 
+    @id.setter
+    def id(self, id):
+        self._id = id
+
     """Link to where end user can find more information about the Asset"""
     @property
     def link(self):
         return self._link
 
+    @link.setter
+    def link(self, link):
+        self._link = link
+
     """Dictionary containing relevant information about the Asset"""
     @property
     def metadata(self):
         return self._metadata
 
+    @metadata.setter
+    def metadata(self, metadata):
+        self._metadata = metadata
+
     """The type of the Asset"""
     @property
     def type(self):
         return self._type
 
+    @type.setter
+    def type(self, type):
+        self._type = type
+
+    """Lazily builds and validates one Asset per raw API record (e.g. the pages of a boto3 paginator, with result_key).
+
+    type is a fixed asset type, or a format string or callable. id, display_name and link are each a record key ("Name", or "Owner.Id" for nested keys), a format string
+    ("Bucket {Name}"), or a callable taking the record. metadata maps each metadata key to (source, priority) or
+    (source, priority, link source), sources given the same way. Elements whose source is missing are left out.
+
+    Asset.from_records(paginator.paginate(), result_key="Buckets", type="aws_s3_bucket", id="Name", display_name="Bucket: {Name}",
+                       metadata={"created": ("CreationDate", MetadataPriority.MEDIUM)})
+    """
+    @classmethod
+    def from_records(cls, records, type, id, display_name, metadata, link=None, result_key=None):
+        from .factories import assets_from_records
+        return assets_from_records(cls, records, type=type, id=id, display_name=display_name, metadata=metadata,
+                                   link=link, result_key=result_key)
+
     """Provides a dictionary representation of the Asset.
 
     This should be invoked before adding the Asset to the asset output list
@@ -0,0 +1,136 @@
+"""
+Pool of boto3 clients and resources bound to Vectrix-issued sessions
+"""
+import threading
+import weakref
+
+from .settings import AWS_MAX_POOL_CONNECTIONS
+
+_loader = None
+_loader_lock = threading.Lock()
+
+
+def shared_loader():
+    """
+    Returns the botocore data loader shared by every session that goes through share_loader, creating it on first use.
+    The loader caches the service models and endpoint data it reads, so they are only loaded (and held in memory) once per process.
+    """
+    global _loader
+    if _loader is None:
+        with _loader_lock:
+            if _loader is None:
+                from botocore.loaders import create_loader
+                _loader = create_loader()
+    return _loader
+
+
+def share_loader(botocore_session):
+    """
+    Makes a botocore session read service models through the shared loader
+    """
+    if botocore_session.get_component('data_loader') is not shared_loader():
+        botocore_session.register_component('data_loader', shared_loader())
+    return botocore_session
+
+
+def config_key(config):
+    """
+    Hashable key of a botocore Config, built from the options it was given
+    """
+    if config is None:
+        return None
+    return repr(sorted(config._user_provided_options.items()))
+
+
+class AwsClientPool:
+    """
+    Thread-safe cache of boto3 clients keyed by (session, service, region, config), so that a scan reuses a handful of
+    warm clients instead of creating one per call. Sessions are held weakly; their clients are released along with them.
+
+    boto3 clients are thread-safe and shared by every thread. boto3 resources aren't, so resources are cached per thread.
+    Every client is created with max_pool_connections HTTP connections (unless the given config sets its own).
+    """
+
+    def __init__(self, max_pool_connections: int = AWS_MAX_POOL_CONNECTIONS):
+        if max_pool_connections < 1:
+            raise ValueError("max_pool_connections is required to be at least 1")
+        self.max_pool_connections = max_pool_connections
+        self.created = 0
+        self.reused = 0
+        self._clients = weakref.WeakKeyDictionary()
+        self._session_locks = weakref.WeakKeyDictionary()
+        self._resources = threading.local()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        """
+        :returns: dict with the number of clients and resources created and the number of requests served by an existing one
+        """
+        return {"created": self.created, "reused": self.reused, "max_pool_connections": self.max_pool_connections}
+
+    def __config(self, config):
+        from botocore.config import Config
+
+        pool_config = Config(max_pool_connections=self.max_pool_connections)
+        return pool_config if config is None else pool_config.merge(config)
+
+    def __session_lock(self, session):
+        """
+        Lock that clients and resources of a session are created under. boto3 sessions aren't thread-safe, so a session only
+        creates one client or resource at a time, while different sessions create theirs in parallel.
+        """
+        with self._lock:
+            return self._session_locks.setdefault(session, threading.Lock())
+
+    def client(self, session, service_name: str, region_name: str = None, config=None):
+        """
+        :params: session - boto3 session (e.g. from create_aws_session)
+        :params: service_name - AWS service, e.g. 's3'
+        :params: region_name - AWS region, defaults to the session's region
+        :params: config - botocore.config.Config
+        :returns: pooled boto3 client
+        """
+        key = (service_name, region_name, config_key(config))
+        with self._lock:
+            clients = self._clients.setdefault(session, {})
+            if key in clients:
+                self.reused += 1
+                return clients[key]
+        # Clients are created under the session's lock, so concurrent requests for the same client create it once
+        with self.__session_lock(session):
+            with self._lock:
+                if key in clients:
+                    self.reused += 1
+                    return clients[key]
+            share_loader(session._session)
+            client = session.client(service_name, region_name=region_name, config=self.__config(config))
+            with self._lock:
+                clients[key] = client
+                self.created += 1
+            return client
+
+    def resource(self, session, service_name: str, region_name: str = None, config=None):
+        """
+        Same as client, for boto3 resources. Resources are cached per thread.
+        """
+        if not hasattr(self._resources, "resources"):
+            self._resources.resources = weakref.WeakKeyDictionary()
+        resources = self._resources.resources.setdefault(session, {})
+        key = (service_name, region_name, config_key(config))
+        if key in resources:
+            with self._lock:
+                self.reused += 1
+            return resources[key]
+        with self.__session_lock(session):
+            share_loader(session._session)
+            resource = session.resource(service_name, region_name=region_name, config=self.__config(config))
+        resources[key] = resource
+        with self._lock:
+            self.created += 1
+        return resource
+
+    def clear(self):
+        with self._lock:
+            self._clients = weakref.WeakKeyDictionary()
+            self._session_locks = weakref.WeakKeyDictionary()
+            self._resources = threading.local()
@@ -0,0 +1,106 @@
+"""
+Columnar containers of assets, issues, and events
+"""
+import sys
+
+
+class ItemBatch:
+    """
+    Holds the fields of many items in parallel lists (one list per field) instead of one dict or object per item.
+    Strings that repeat across a scan (asset types, issue and event names) are interned, so every item shares a single copy.
+
+    Batches are accepted by VectrixUtils.output in place of lists. Iterating a batch yields one dict per item,
+    built on the fly and not kept by the batch.
+    """
+    __slots__ = ("_columns",)
+
+    # Output kind, and (field, optional) in to_dict order; set by subclasses
+    KIND = None
+    FIELDS = ()
+    INTERNED_FIELDS = ()
+
+    def __init__(self, items=None):
+        self._columns = {field: [] for field, _ in self.FIELDS}
+        if items is not None:
+            self.extend(items)
+
+    def __len__(self):
+        return len(self._columns[self.FIELDS[0][0]])
+
+    def __iter__(self):
+        fields = self.FIELDS
+        columns = [self._columns[field] for field, _ in fields]
+        for row in zip(*columns):
+            yield {field: value for (field, optional), value in zip(fields, row) if not (optional and value is None)}
+
+    def __getitem__(self, index: int):
+        return {field: self._columns[field][index] for field, optional in self.FIELDS
+                if not (optional and self._columns[field][index] is None)}
+
+    def column(self, field: str):
+        """
+        :returns: the list holding the given field of every item (not a copy)
+        """
+        return self._columns[field]
+
+    def shard(self, start: int, stop: int):
+        """
+        :returns: batch of the same kind holding the items from start up to stop
+        """
+        shard = type(self)()
+        shard._columns = {field: column[start:stop] for field, column in self._columns.items()}
+        return shard
+
+    def _append(self, values: dict):
+        for field in self.INTERNED_FIELDS:
+            if isinstance(values.get(field), str):
+                values[field] = sys.intern(values[field])
+        for field, _ in self.FIELDS:
+            self._columns[field].append(values.get(field))
+
+    def extend(self, items):
+        """
+        Appends items given as dicts or as Asset / Issue / Event objects
+        """
+        allowed_keys = [field for field, _ in self.FIELDS]
+        for item in items:
+            if not isinstance(item, dict):
+                item = item.to_dict()
+            for item_key in item:
+                if item_key not in self._columns:
+                    raise ValueError("{key} dict does not allow key '{bad_key}'. Only allowed keys: {allowed_keys}. Information: https://developer.vectrix.io/dev/components/output".format(
+                        key=self.KIND, bad_key=item_key, allowed_keys=str(allowed_keys)))
+            self._append(dict(item))
+
+    def to_dicts(self):
+        return list(self)
+
+
+class AssetBatch(ItemBatch):
+    __slots__ = ()
+    KIND = "asset"
+    FIELDS = (("type", False), ("id", False), ("display_name", False), ("link", True), ("metadata", False))
+    INTERNED_FIELDS = ("type",)
+
+    def append(self, type: str, id: str, display_name: str, metadata: dict, link: str = None):
+        self._append({"type": type, "id": id, "display_name": display_name, "link": link, "metadata": metadata})
+
+
+class IssueBatch(ItemBatch):
+    __slots__ = ()
+    KIND = "issue"
+    FIELDS = (("issue", False), ("asset_id", False), ("metadata", False))
+    INTERNED_FIELDS = ("issue",)
+
+    def append(self, issue: str, asset_id: list, metadata: dict):
+        self._append({"issue": issue, "asset_id": asset_id, "metadata": metadata})
+
+
+class EventBatch(ItemBatch):
+    __slots__ = ()
+    KIND = "event"
+    FIELDS = (("event", False), ("event_time", False), ("display_name", False), ("metadata", False))
+    INTERNED_FIELDS = ("event",)
+
+    def append(self, event: str, event_time: int, display_name: str, metadata: dict):
+        self._append({"event": event, "event_time": event_time, "display_name": display_name, "metadata": metadata})
@@ -1,6 +1,10 @@
 """
 All type checking for functions for Vectrix SDK
 """
+from .batch import ItemBatch, AssetBatch, IssueBatch, EventBatch
+from .metadata import MetadataTemplate
+from .validation_cache import VALIDATION_MODES, item_hash
+from .metrics import registry as metrics
 
 
 def link_check(link):
@@ -97,118 +101,328 @@ def metadata_deep_check(metadata):
                     "Only https links are allowed to be included in metadata elements. Violated on key '{key}'. Information:  https://developer.vectrix.io/dev/components/output".format(key=key))
 
 
-def output_type_check(assets, issues, events):
+# Output schemas as (key, expected type, optional) in the order the fields are checked
+OUTPUT_SCHEMAS = {
+    "asset": (
+        ("type", str, False),
+        ("id", str, False),
+        ("display_name", str, False),
+        ("link", str, True),
+        ("metadata", dict, False)
+    ),
+    "issue": (
+        ("issue", str, False),
+        ("asset_id", list, False),
+        ("metadata", dict, False)
+    ),
+    "event": (
+        ("event", str, False),
+        ("event_time", int, False),
+        ("display_name", str, False),
+        ("metadata", dict, False)
+    )
+}
+
+METADATA_KEYS = ("priority", "value", "link")
+
+# Upper bound on the number of memoized verdicts held per kind of string
+MEMO_SIZE = 65536
+
+
+class OutputValidator:
     """
-    Verify a vectrix.output() call to ensure all submitted data correctly falls within the guidelines and if not,
-    will return an exception.
+    Compiled, single-pass validator for the items submitted through vectrix.output().
+
+    The output schemas are compiled into per-kind item validators once, when the validator is created. Verdicts for
+    strings that repeat throughout a scan (asset types and metadata key names) are memoized, so the naming convention
+    checks only run the first time a string is seen. Link verdicts only depend on the scheme prefix, so those are a
+    single prefix comparison. Error messages are identical to the ones raised by the standalone check functions.
+
+    Validation caches skip the per-item checks of items that passed them before, so a change to those checks has to bump
+    VALIDATOR_VERSION (vectrix/validation_cache.py), which discards the caches written by earlier versions.
     """
-    if not isinstance(assets, list) or not isinstance(issues, list) or not isinstance(events, list):
-        raise ValueError(
-            "output requires 3 keyword argument list type parameters: assets, issues, events")
 
-    test_elems = {
-        "asset": [
-            {"key": "type", "val": "str"},
-            {"key": "id", "val": "str"},
-            {"key": "display_name", "val": "str"},
-            {"key": "link", "val": "str", "optional": True},
-            {"key": "metadata", "val": {}}
-        ],
-        "issue": [
-            {"key": "issue", "val": "str"},
-            {"key": "asset_id", "val": []},
-            {"key": "metadata", "val": {}}
-        ],
-        "event": [
-            {"key": "event", "val": "str"},
-            {"key": "event_time", "val": 1},
-            {"key": "display_name", "val": "str"},
-            {"key": "metadata", "val": {}}
-        ]
-    }
-
-    test_keys = {
-        "asset": ["type", "id", "display_name", "link", "metadata"],
-        "issue": ["issue", "asset_id", "metadata"],
-        "event": ["event", "event_time", "display_name", "metadata"]
-    }
-
-    test_items = {
-        "asset": assets,
-        "issue": issues,
-        "event": events
-    }
-
-    # Verify all inputted types are correct
-    for key in test_items:
-        for item in test_items[key]:
+    def __init__(self, memo_size: int = MEMO_SIZE):
+        self._memo_size = memo_size
+        self._asset_types = set()
+        self._metadata_keys = set()
+
+        self._field_checks = {
+            "link": self._check_link,
+            "display_name": self._check_display_name,
+            "metadata": self._check_metadata
+        }
+        self._validate_asset_fields = self._compile("asset")
+        self.validate_asset = self._compile("asset", post_check=self.check_asset_type)
+        self.validate_issue = self._compile("issue")
+        self.validate_event = self._compile("event")
+
+    def _compile(self, kind, post_check=None):
+        """
+        Builds the item validator for a single output kind (asset, issue, event) out of its schema.
+        """
+        schema = OUTPUT_SCHEMAS[kind]
+        allowed_keys = frozenset(key for key, _, _ in schema)
+        allowed_keys_message = str([key for key, _, _ in schema])
+        fields = tuple((key, expected, expected.__name__, optional, self._field_checks.get(key))
+                       for key, expected, optional in schema)
+
+        def validate(item):
             for item_key in item:
-                if item_key not in test_keys[key]:
+                if item_key not in allowed_keys:
                     raise ValueError("{key} dict does not allow key '{bad_key}'. Only allowed keys: {allowed_keys}. Information: https://developer.vectrix.io/dev/components/output".format(
-                        key=key, bad_key=item_key, allowed_keys=str(test_keys[key])))
-            for elem in test_elems[key]:
-                if elem['key'] in item:
-                    if not isinstance(item[elem['key']], type(elem['val'])):
+                        key=kind, bad_key=item_key, allowed_keys=allowed_keys_message))
+            for key, expected, expected_name, optional, check in fields:
+                if key in item:
+                    value = item[key]
+                    if not isinstance(value, expected):
                         raise ValueError(
-                            "{msg} dict key '{key}' value needs to be {val}".format(msg=key, key=elem['key'], val=type(elem['val']).__name__))
-                    if elem['key'] == 'link':
-                        link_check(item[elem['key']])
-                    if elem['key'] == 'display_name':
-                        check_display_name = item[elem['key']]
-                        if len(check_display_name) > 0 and ":" not in check_display_name:
-                            raise ValueError(
-                                "{msg} dict key 'display_name' requires a colon that separates a key and value. Information: https://developer.vectrix.io/dev/components/output#display-name-convention".format(msg=key))
-                    if elem['key'] == "metadata":
-                        metadata = item['metadata']
-                        metadata_keys_to_check = [
-                            {"key": "priority", "val": 1},
-                            # These are allowed to be str and lists (account for below)
-                            {"key": "value", "val": "str"},
-                            {"key": "link", "val": "str"}
-                        ]
-                        metadata_keys = ["priority", "value", "link"]
-                        for metadata_key in metadata:
-                            if not isinstance(metadata[metadata_key], type({})):
-                                raise ValueError("metadata element '{key}' value needs to be {val}. Information: https://developer.vectrix.io/dev/components/output".format(
-                                    key=metadata_key, val=type({}).__name__))
-                            for check_key in metadata_keys_to_check:
-                                if check_key['key'] not in metadata[metadata_key] and check_key['key'] != "link":
-                                    raise ValueError(
-                                        "all metadata elements are required to have '{key}' key. Information: https://developer.vectrix.io/dev/components/output".format(key=check_key['key']))
-                                if check_key['key'] != "value" and check_key['key'] != "link" and not isinstance(metadata[metadata_key][check_key['key']], type(check_key['val'])):
-                                    raise ValueError(
-                                        "metadata element {elem} key '{key}' value needs to be {val}".format(elem=metadata_key, key=check_key['key'], val=type(check_key['val']).__name__))
-                                if check_key['key'] == "value":
-                                    if not isinstance(metadata[metadata_key][check_key['key']], type("")) and not isinstance(metadata[metadata_key][check_key['key']], type([])):
-                                        raise ValueError("metadata element {elem} key 'value' needs to be either (1) str or (2) list of str's".format(
-                                            elem=metadata_key))
-                                    if isinstance(metadata[metadata_key][check_key['key']], type([])):
-                                        for metadata_check_key_list_elem in metadata[metadata_key][check_key['key']]:
-                                            if not isinstance(metadata_check_key_list_elem, type("")):
-                                                raise ValueError("metadata element {elem} key 'value' can be list, but each element in the list has to be 'str'. Violated with list element value of: {violation}".format(
-                                                    violation=str(metadata_check_key_list_elem), elem=metadata_key))
-
-                            for inputted_key in metadata[metadata_key]:
-                                if inputted_key not in metadata_keys:
-                                    raise ValueError(
-                                        "metadata element isn't allowed to have '{key}' key. Only keys permitted: {allowed_keys}. Information: https://developer.vectrix.io/dev/components/output".format(key=inputted_key, allowed_keys=str(metadata_keys)))
-                        metadata_deep_check(metadata)
-                elif 'optional' not in elem or elem['optional'] is not True:
+                            "{msg} dict key '{key}' value needs to be {val}".format(msg=kind, key=key, val=expected_name))
+                    if check is not None:
+                        check(kind, value)
+                elif not optional:
+                    raise ValueError(
+                        "{msg} dict requires '{key}' key. Information: https://developer.vectrix.io/dev/components/output".format(msg=kind, key=key))
+            if post_check is not None:
+                post_check(item)
+            return item
+
+        return validate
+
+    def validate_batch(self, kind, batch):
+        """
+        Columnar counterpart of the item validators for an ItemBatch: every field is checked one column at a time.
+        """
+        for key, expected, optional in OUTPUT_SCHEMAS[kind]:
+            check = self._field_checks.get(key)
+            for value in batch.column(key):
+                if value is None:
+                    if optional:
+                        continue
+                    raise ValueError(
+                        "{msg} dict requires '{key}' key. Information: https://developer.vectrix.io/dev/components/output".format(msg=kind, key=key))
+                if not isinstance(value, expected):
                     raise ValueError(
-                        "{msg} dict requires '{key}' key. Information: https://developer.vectrix.io/dev/components/output".format(msg=key, key=elem['key']))
-                else:
-                    pass  # The key is optional, pass.
-
-    inputted_asset_ids = {}
-    for asset in assets:
-        asset_type_check(asset)
-        if asset['id'] in inputted_asset_ids:
+                        "{msg} dict key '{key}' value needs to be {val}".format(msg=kind, key=key, val=expected.__name__))
+                if check is not None:
+                    check(kind, value)
+
+    def _memoize(self, memo, value):
+        if len(memo) >= self._memo_size:
+            memo.clear()
+        memo.add(value)
+
+    def _check_link(self, kind, link):
+        if link[:8] != "https://":
+            link_check(link)
+
+    def _check_display_name(self, kind, display_name):
+        if len(display_name) > 0 and ":" not in display_name:
             raise ValueError(
-                "Duplicate asset id entry '{asset_id}'. All asset id's are required to be unique. Information: https://developer.vectrix.io/dev/components/output".format(asset_id=asset['id']))
-        else:
-            inputted_asset_ids[asset['id']] = asset
-    for issue in issues:
-        for asset in issue['asset_id']:
-            if asset not in inputted_asset_ids:
+                "{msg} dict key 'display_name' requires a colon that separates a key and value. Information: https://developer.vectrix.io/dev/components/output#display-name-convention".format(msg=kind))
+
+    def check_asset_type(self, asset):
+        """
+        Memoized asset_type_check()
+        """
+        asset_type = asset['type']
+        if asset_type not in self._asset_types:
+            asset_type_check(asset)
+            self._memoize(self._asset_types, asset_type)
+
+    def _check_metadata_key(self, key):
+        if " " in key:
+            raise ValueError(
+                "metadata keys aren't allowed to have spaces. Violated on key '{key}'. Information:  https://developer.vectrix.io/dev/components/output".format(key=key))
+        if "-" in key:
+            raise ValueError(
+                "metadata keys aren't allowed to have hyphens. Violated on key '{key}'. Information:  https://developer.vectrix.io/dev/components/output".format(key=key))
+        for char in key:
+            if char.isupper():
                 raise ValueError(
-                    "Vectrix issue ({issue}) references non-existent asset: {asset}".format(issue=issue['issue'], asset=asset))
+                    "metadata keys can't have uppercase characters. Violated on key '{key}'. Information:  https://developer.vectrix.io/dev/components/output".format(key=key))
+        self._memoize(self._metadata_keys, key)
+
+    def _check_metadata(self, kind, metadata):
+        """
+        Structural checks of every metadata element, followed by the same checks as metadata_deep_check().
+        MetadataTemplates are immutable, so each one is only checked the first time it is seen.
+        """
+        if isinstance(metadata, MetadataTemplate):
+            if not metadata.validated:
+                self._check_metadata(kind, dict(metadata))
+                metadata.validated = True
+            return
+        for metadata_key, element in metadata.items():
+            if not isinstance(element, dict):
+                raise ValueError("metadata element '{key}' value needs to be {val}. Information: https://developer.vectrix.io/dev/components/output".format(
+                    key=metadata_key, val=dict.__name__))
+            if "priority" not in element:
+                raise ValueError(
+                    "all metadata elements are required to have 'priority' key. Information: https://developer.vectrix.io/dev/components/output")
+            if not isinstance(element["priority"], int):
+                raise ValueError(
+                    "metadata element {elem} key 'priority' value needs to be int".format(elem=metadata_key))
+            if "value" not in element:
+                raise ValueError(
+                    "all metadata elements are required to have 'value' key. Information: https://developer.vectrix.io/dev/components/output")
+            value = element["value"]
+            if isinstance(value, list):
+                for list_elem in value:
+                    if not isinstance(list_elem, str):
+                        raise ValueError("metadata element {elem} key 'value' can be list, but each element in the list has to be 'str'. Violated with list element value of: {violation}".format(
+                            violation=str(list_elem), elem=metadata_key))
+            elif not isinstance(value, str):
+                raise ValueError("metadata element {elem} key 'value' needs to be either (1) str or (2) list of str's".format(
+                    elem=metadata_key))
+            if len(element) > 2 and not (len(element) == 3 and "link" in element):
+                for inputted_key in element:
+                    if inputted_key not in METADATA_KEYS:
+                        raise ValueError(
+                            "metadata element isn't allowed to have '{key}' key. Only keys permitted: {allowed_keys}. Information: https://developer.vectrix.io/dev/components/output".format(key=inputted_key, allowed_keys=str(list(METADATA_KEYS))))
+
+        for metadata_key, element in metadata.items():
+            if metadata_key not in self._metadata_keys:
+                self._check_metadata_key(metadata_key)
+            p_val = element['priority']
+            if p_val > 100 or p_val < -1:
+                raise ValueError(
+                    "metadata 'priority' key is only allowed to be between -1 and 100 (inclusive). Violated on key '{key}' with priority value '{val}'. Information:  https://developer.vectrix.io/dev/components/output".format(key=metadata_key, val=p_val))
+            if 'link' in element:
+                link = element['link']
+                if link[:8] != "https://":
+                    if link[:7] == "http://":
+                        raise ValueError(
+                            "Only secure links are allowed in metadata elements (HTTPS). Violated on key '{key}'. Information:  https://developer.vectrix.io/dev/components/output".format(key=metadata_key))
+                    raise ValueError(
+                        "Only https links are allowed to be included in metadata elements. Violated on key '{key}'. Information:  https://developer.vectrix.io/dev/components/output".format(key=metadata_key))
+
+    def add_asset_id(self, asset_id, seen_asset_ids):
+        """
+        Cross-item check that every asset id is unique. Adds asset_id to seen_asset_ids, raising if it was already seen.
+        """
+        if asset_id in seen_asset_ids:
+            raise ValueError(
+                "Duplicate asset id entry '{asset_id}'. All asset id's are required to be unique. Information: https://developer.vectrix.io/dev/components/output".format(asset_id=asset_id))
+        seen_asset_ids.add(asset_id)
+
+    def check_issue_references(self, issues, asset_ids):
+        """
+        Cross-item check that every issue only references assets within asset_ids.
+        """
+        if isinstance(issues, ItemBatch):
+            references = zip(issues.column('issue'), issues.column('asset_id'))
+        else:
+            references = ((issue['issue'], issue['asset_id']) for issue in issues)
+        for issue, issue_asset_ids in references:
+            for asset in issue_asset_ids:
+                if asset not in asset_ids:
+                    raise ValueError(
+                        "Vectrix issue ({issue}) references non-existent asset: {asset}".format(issue=issue, asset=asset))
+
+    @staticmethod
+    def _validate_items(kind, items, validate_item, cache, passed):
+        """
+        Runs validate_item on every item, skipping items whose hash is in the validation cache (if given).
+        Hashes of the items that passed are appended to passed.
+        """
+        if cache is None:
+            for item in items:
+                validate_item(item)
+            return
+        for item in items:
+            digest = item_hash(kind, item)
+            if digest is not None and digest in cache:
+                continue
+            validate_item(item)
+            if digest is not None:
+                passed.append(digest)
+
+    def validate(self, assets, issues, events, cache=None):
+        """
+        Validates every item in a single pass, then runs the asset type and cross-item checks.
+        Any of assets, issues, and events may be an ItemBatch, which is validated column by column.
+        With a ValidationCache, list items that passed before skip the per-item checks; the cross-item checks always run.
+        """
+        passed = []
+        with metrics.timer("validation.seconds", kind="asset"):
+            if isinstance(assets, ItemBatch):
+                self.validate_batch("asset", assets)
+            else:
+                self._validate_items("asset", assets, self._validate_asset_fields, cache, passed)
+        with metrics.timer("validation.seconds", kind="issue"):
+            if isinstance(issues, ItemBatch):
+                self.validate_batch("issue", issues)
+            else:
+                self._validate_items("issue", issues, self.validate_issue, cache, passed)
+        with metrics.timer("validation.seconds", kind="event"):
+            if isinstance(events, ItemBatch):
+                self.validate_batch("event", events)
+            else:
+                self._validate_items("event", events, self.validate_event, cache, passed)
+        if cache is not None:
+            cache.add(passed)
+        for kind, items in (("asset", assets), ("issue", issues), ("event", events)):
+            metrics.increment("validation.items", len(items), kind=kind)
+        with metrics.timer("validation.seconds", kind="cross_item"):
+            self.check_cross_item(assets, issues)
+
+    def check_cross_item(self, assets, issues):
+        """
+        Asset type, unique asset id, and issue reference checks. List assets are checked one at a time (type, then id), so
+        the first invalid asset is the one reported.
+        """
+        if isinstance(assets, ItemBatch):
+            # Asset types are interned and repeat throughout a batch, so each distinct type is checked once
+            for asset_type in dict.fromkeys(assets.column('type')):
+                self.check_asset_type({'type': asset_type})
+            self.check_asset_references(assets, issues)
+            return
+        asset_ids = set()
+        check_asset_type = self.check_asset_type
+        add_asset_id = self.add_asset_id
+        for asset in assets:
+            check_asset_type(asset)
+            add_asset_id(asset['id'], asset_ids)
+        self.check_issue_references(issues, asset_ids)
+
+    def check_asset_references(self, assets, issues):
+        """
+        Unique asset id and issue reference checks, which hold across items and so can't be skipped for items validated earlier
+        """
+        asset_ids = set()
+        add_asset_id = self.add_asset_id
+        for asset_id in (assets.column('id') if isinstance(assets, ItemBatch) else (asset['id'] for asset in assets)):
+            add_asset_id(asset_id, asset_ids)
+        self.check_issue_references(issues, asset_ids)
+
+
+output_validator = OutputValidator()
+
+
+def output_container_check(assets, issues, events):
+    """
+    Verify that assets, issues, and events are each given as a list or batch
+    """
+    if not isinstance(assets, (list, AssetBatch)) or not isinstance(issues, (list, IssueBatch)) or not isinstance(events, (list, EventBatch)):
+        raise ValueError(
+            "output requires 3 keyword argument list type parameters: assets, issues, events")
+
+
+def output_type_check(assets, issues, events, validation: str = "strict", cache=None):
+    """
+    Verify a vectrix.output() call to ensure all submitted data correctly falls within the guidelines and if not,
+    will return an exception.
+
+    validation is one of: strict (every item is checked), cached (items found in cache skip the per-item checks), or off
+    (the per-item checks are skipped for items that were already validated, e.g. by Asset.from_records; asset ids are still
+    checked to be unique and issues to only reference given assets)
+    """
+    if validation not in VALIDATION_MODES:
+        raise ValueError(f"validation is required to be one of {str(list(VALIDATION_MODES))}")
+    output_container_check(assets, issues, events)
+    if validation == "off":
+        with metrics.timer("validation.seconds", kind="cross_item"):
+            output_validator.check_asset_references(assets, issues)
+        return
+    output_validator.validate(assets, issues, events, cache=cache if validation == "cached" else None)
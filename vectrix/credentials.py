@@ -0,0 +1,256 @@
+"""
+Expiry-aware cache of customer credentials and AWS sessions, refreshed ahead of expiry
+"""
+import time
+import logging
+import threading
+
+from datetime import datetime, timezone
+
+from .aws import share_loader
+from .settings import AWS_SESSION_TTL, CREDENTIALS_TTL, CREDENTIAL_REFRESH_MARGIN, CREDENTIAL_IDLE_TTL
+
+logger = logging.getLogger()
+
+CREDENTIALS_KEY = ("credentials",)
+
+# Seconds to wait before retrying a failed background refresh
+REFRESH_RETRY_INTERVAL = 30
+
+
+def parse_expiration(aws_session: dict, default_ttl: float):
+    """
+    Expiry (epoch seconds) of an awsSession. If the Vectrix API returns no expiration, the session is assumed to live default_ttl seconds.
+    """
+    expiration = aws_session.get("expiration")
+    if expiration is None:
+        return time.time() + default_ttl
+    if isinstance(expiration, (int, float)):
+        return float(expiration)
+    return datetime.fromisoformat(expiration.replace("Z", "+00:00")).timestamp()
+
+
+def default_session_factory(botocore_session):
+    import boto3
+    return boto3.Session(botocore_session=botocore_session)
+
+
+class CachedCredentials:
+    __slots__ = ("value", "expires_at", "refresh_at", "fetch", "ttl", "session", "last_used")
+
+    def __init__(self, value, expires_at: float, refresh_margin: float, fetch, ttl: float):
+        self.value = value
+        self.expires_at = expires_at
+        # Short-lived entries are refreshed halfway through their lifetime rather than immediately
+        self.refresh_at = expires_at - min(refresh_margin, (expires_at - time.time()) / 2)
+        self.fetch = fetch
+        self.ttl = ttl
+        self.session = None
+        self.last_used = time.time()
+
+
+class CredentialCache:
+    """
+    Caches get_credentials results, and AWS sessions keyed by (role ARN, external id), until refresh_margin seconds before they expire.
+
+    A background worker refreshes entries once they are within refresh_margin of expiring, so callers never wait on an expired token.
+    Entries that haven't been used for idle_ttl seconds by then are evicted instead, and fetched again if they are needed later.
+    Cached AWS sessions are backed by botocore RefreshableCredentials that read from the cache, so long-lived boto3 clients pick up
+    refreshed credentials as well. botocore asks for new credentials 15 minutes before expiry, so refresh_margin should be larger than that.
+    Shorter sessions are refreshed halfway through their lifetime, and botocore's requests before then are answered from the cache.
+    """
+
+    def __init__(self, refresh_margin: float = CREDENTIAL_REFRESH_MARGIN, aws_session_ttl: float = AWS_SESSION_TTL,
+                 credentials_ttl: float = CREDENTIALS_TTL, idle_ttl: float = CREDENTIAL_IDLE_TTL, background_refresh: bool = True,
+                 session_factory=default_session_factory):
+        self.refresh_margin = refresh_margin
+        self.aws_session_ttl = aws_session_ttl
+        self.credentials_ttl = credentials_ttl
+        self.idle_ttl = idle_ttl
+        self.background_refresh = background_refresh
+        self.session_factory = session_factory
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+        self._entries = {}
+        self._key_locks = {}
+        self._condition = threading.Condition()
+        self._worker = None
+        self._closed = False
+
+    def stats(self):
+        """
+        :returns: dict with the number of cache hits, misses (fetches of uncached credentials), refreshes of expiring credentials,
+                  and evictions of idle or expired credentials
+        """
+        return {"hits": self.hits, "misses": self.misses, "refreshes": self.refreshes, "evictions": self.evictions,
+                "cached": len(self._entries)}
+
+    def get_credentials(self, fetch):
+        """
+        :params: fetch - callable returning the credentials dict from the Vectrix API, called on a miss or refresh
+        :returns: copy of the cached credentials dict
+        """
+        entry = self.__cached_entry(CREDENTIALS_KEY)
+        if entry is None:
+            entry = self.__fetch(CREDENTIALS_KEY, fetch, self.credentials_ttl)
+        return dict(entry.value)
+
+    def store_credentials(self, credentials: dict, fetch):
+        return dict(self.__store(CREDENTIALS_KEY, credentials, fetch, self.credentials_ttl, is_refresh=False).value)
+
+    def get_aws_session(self, key: tuple, fetch):
+        """
+        :params: key - (role ARN, external id)
+        :params: fetch - callable returning the awsSession dict (accessKeyId, secretAccessKey, sessionToken and optionally expiration)
+        :returns: cached boto3 session
+        """
+        key = ("aws_session",) + tuple(key)
+        entry = self.__cached_entry(key)
+        if entry is None:
+            entry = self.__fetch(key, fetch, self.aws_session_ttl)
+        return entry.session
+
+    def cached_aws_session(self, key: tuple):
+        """
+        :returns: the cached boto3 session for (role ARN, external id) if it isn't due for refresh, None otherwise
+        """
+        entry = self.__cached_entry(("aws_session",) + tuple(key))
+        return entry.session if entry is not None else None
+
+    def store_aws_session(self, key: tuple, aws_session: dict, fetch):
+        """
+        Caches an awsSession fetched by the caller (e.g. asynchronously) and returns its boto3 session
+        """
+        return self.__store(("aws_session",) + tuple(key), aws_session, fetch, self.aws_session_ttl, is_refresh=False).session
+
+    def lookup(self, key: tuple):
+        """
+        :returns: the cached value for key if it isn't due for refresh (counting a hit), None otherwise
+        """
+        entry = self.__cached_entry(key)
+        return entry.value if entry is not None else None
+
+    def clear(self):
+        with self._condition:
+            self._entries.clear()
+            self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+
+    def __key_lock(self, key: tuple):
+        with self._condition:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def __cached_entry(self, key: tuple, used: bool = True):
+        """
+        :params: used - whether this is a use of the entry (counting a hit and resetting its idle time) rather than a background refresh
+        :returns: the cached entry for key if it isn't due for refresh, None otherwise
+        """
+        entry = self._entries.get(key)
+        with self._condition:
+            if entry is not None and time.time() < min(entry.refresh_at, entry.expires_at):
+                if used:
+                    self.hits += 1
+                    entry.last_used = time.time()
+                return entry
+        return None
+
+    def __fetch(self, key: tuple, fetch, ttl: float, used: bool = True):
+        """
+        Fetches (or refreshes) the entry for key, once per key no matter how many threads are waiting on it
+        """
+        with self.__key_lock(key):
+            entry = self.__cached_entry(key, used)
+            if entry is not None:
+                return entry
+            return self.__store(key, fetch(), fetch, ttl, is_refresh=key in self._entries, used=used)
+
+    def __store(self, key: tuple, value, fetch, ttl: float, is_refresh: bool, used: bool = True):
+        expires_at = parse_expiration(value, ttl) if key[0] == "aws_session" else time.time() + ttl
+        entry = CachedCredentials(value, expires_at, self.refresh_margin, fetch, ttl)
+        previous = self._entries.get(key)
+        if previous is not None and not used:
+            entry.last_used = previous.last_used
+        if key[0] == "aws_session":
+            entry.session = previous.session if previous is not None else self.__build_session(key, entry)
+        with self._condition:
+            self._entries[key] = entry
+            if is_refresh:
+                self.refreshes += 1
+            else:
+                self.misses += 1
+            if self.background_refresh and self._worker is None and not self._closed:
+                self._worker = threading.Thread(target=self.__run, name="vectrix-credential-refresh", daemon=True)
+                self._worker.start()
+            self._condition.notify_all()
+        return entry
+
+    @staticmethod
+    def __botocore_metadata(entry: CachedCredentials):
+        return {
+            "access_key": entry.value.get("accessKeyId"),
+            "secret_key": entry.value.get("secretAccessKey"),
+            "token": entry.value.get("sessionToken"),
+            "expiry_time": datetime.fromtimestamp(entry.expires_at, timezone.utc).isoformat()
+        }
+
+    def __refresh_botocore_metadata(self, key: tuple, fetch, ttl: float):
+        """
+        Called by botocore when the session credentials are about to expire. Normally the background worker has already
+        refreshed the entry, so this returns without a request; if the entry was evicted as idle it is fetched again.
+        """
+        return self.__botocore_metadata(self.__fetch(key, fetch, ttl))
+
+    def __build_session(self, key: tuple, entry: CachedCredentials):
+        from botocore.credentials import RefreshableCredentials
+        from botocore.session import get_session
+
+        botocore_session = share_loader(get_session())
+        botocore_session._credentials = RefreshableCredentials.create_from_metadata(
+            metadata=self.__botocore_metadata(entry), refresh_using=lambda: self.__refresh_botocore_metadata(key, entry.fetch, entry.ttl),
+            method="vectrix")
+        return self.session_factory(botocore_session)
+
+    def __due_entries(self):
+        """
+        Entries that are due for refresh and have been used in the last idle_ttl seconds. Due entries that are idle or have
+        expired are evicted instead, and fetched again on next use.
+        """
+        now = time.time()
+        due = []
+        for key, entry in list(self._entries.items()):
+            if entry.refresh_at > now:
+                continue
+            if now >= entry.expires_at or now - entry.last_used > self.idle_ttl:
+                del self._entries[key]
+                self.evictions += 1
+            else:
+                due.append((key, entry))
+        return due
+
+    def __run(self):
+        while True:
+            with self._condition:
+                due = self.__due_entries()
+                while not due and not self._closed:
+                    refresh_times = [entry.refresh_at for entry in self._entries.values()]
+                    self._condition.wait(max(min(refresh_times) - time.time(), 0) if refresh_times else None)
+                    due = self.__due_entries()
+                if self._closed:
+                    return
+            for key, entry in due:
+                try:
+                    self.__fetch(key, entry.fetch, entry.ttl, used=False)
+                except Exception as e:
+                    logger.error(f"Error refreshing credentials from Vectrix API: {str(e)}")
+                    with self._condition:
+                        entry.refresh_at = time.time() + REFRESH_RETRY_INTERVAL
@@ -0,0 +1,122 @@
+"""
+Delta output: the assets, issues, and events that changed since the last scan
+"""
+import json
+import hashlib
+
+from collections import Counter
+
+from .graphql.utils import convert
+
+DELTA_KINDS = ("assets", "issues", "events")
+
+
+def canonical_item(item: dict):
+    """
+    Returns an asset, issue, or event in a form that doesn't depend on how it was produced:
+    keys are camelCase and metadata is a dict. Items passed to output and items returned by the Vectrix API
+    (camelCase keys, metadata as a JSON string) have the same canonical form.
+    """
+    canonical = {}
+    for key, value in item.items():
+        if key == 'metadata' and isinstance(value, str):
+            value = json.loads(value)
+        canonical[convert(key)] = value
+    return canonical
+
+
+def fingerprint(item: dict):
+    """
+    Hash of the canonical form of an item. Key order (of the item and of its metadata) doesn't change the fingerprint.
+    """
+    encoded = json.dumps(canonical_item(item), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def item_key(kind: str, item: dict):
+    """
+    Identity of an item across scans. Assets are identified by id, so a changed asset is a modification.
+    Issues and events have no id; they are identified by their fingerprint, so a changed issue or event is a removal plus an addition.
+    """
+    if kind == "assets":
+        return item["id"]
+    return fingerprint(item)
+
+
+def compute_delta(previous: dict, current: dict):
+    """
+    Compares the current scan results with the previous scan results
+
+    :params: previous (dict) - 'assets', 'issues', and 'events' of the last scan (as returned by get_last_scan_results)
+    :params: current (dict) - 'assets', 'issues', and 'events' of this scan
+    :returns: dict with a {'added': [items], 'modified': [items], 'removed': [keys]} entry for 'assets', 'issues', and 'events'.
+              Removed assets are listed by id, removed issues and events by fingerprint.
+    """
+    delta = {}
+    for kind in DELTA_KINDS:
+        previous_items = previous.get(kind) or []
+        current_items = current.get(kind) or []
+        if kind == "assets":
+            delta[kind] = _asset_delta(previous_items, current_items)
+        else:
+            delta[kind] = _fingerprint_delta(previous_items, current_items)
+    return delta
+
+
+def _asset_delta(previous_items: list, current_items: list):
+    previous_fingerprints = {asset["id"]: fingerprint(asset) for asset in previous_items}
+    added, modified, current_ids = [], [], set()
+    for asset in current_items:
+        current_ids.add(asset["id"])
+        previous_fingerprint = previous_fingerprints.get(asset["id"])
+        if previous_fingerprint is None:
+            added.append(asset)
+        elif previous_fingerprint != fingerprint(asset):
+            modified.append(asset)
+    removed = [asset_id for asset_id in previous_fingerprints if asset_id not in current_ids]
+    return {"added": added, "modified": modified, "removed": removed}
+
+
+def _fingerprint_delta(previous_items: list, current_items: list):
+    """
+    Issues and events may legitimately repeat, so fingerprints are compared as multisets
+    """
+    unmatched = Counter(fingerprint(item) for item in previous_items)
+    added = []
+    for item in current_items:
+        item_fingerprint = fingerprint(item)
+        if unmatched[item_fingerprint] > 0:
+            unmatched[item_fingerprint] -= 1
+        else:
+            added.append(item)
+    removed = [item_fingerprint for item_fingerprint in unmatched.elements()]
+    return {"added": added, "modified": [], "removed": removed}
+
+
+def apply_delta(previous: dict, delta: dict):
+    """
+    Applies a delta from compute_delta to the previous scan results, returning the current scan results.
+    Unchanged items keep their previous position, modified items are replaced in place, and added items are appended.
+    """
+    results = {}
+    for kind in DELTA_KINDS:
+        changes = delta[kind]
+        removed = Counter(changes["removed"])
+        replacements = {item_key(kind, item): item for item in changes["modified"]}
+        items = []
+        for item in previous.get(kind) or []:
+            key = item_key(kind, item)
+            if removed[key] > 0:
+                removed[key] -= 1
+                continue
+            items.append(replacements.get(key, item) if kind == "assets" else item)
+        items.extend(changes["added"])
+        results[kind] = items
+    return results
+
+
+def delta_size(delta: dict):
+    """
+    :returns: number of added, modified, and removed items in a delta
+    """
+    return sum(len(delta[kind][change]) for kind in DELTA_KINDS for change in ("added", "modified", "removed"))
@@ -3,32 +3,60 @@
 https://developer.vectrix.io/dev/components/output#events
 """
 class Event():
-    def __init__(self):
-        self._display_name = None
-        self._event = None
-        self._event_time = None
-        self._metadata = None
+    __slots__ = ("_display_name", "_event", "_event_time", "_metadata")
+
+    def __init__(self, event=None, event_time=None, display_name=None, metadata=None):
+        self._display_name = display_name
+        self._event = event
+        self._event_time = event_time
+        self._metadata = metadata
 
     """The identifier of the event. Displayed to customers"""
     @property
     def display_name(self):
         return self._display_name
 
+    @display_name.setter
+    def display_name(self, display_name):
+        self._display_name = display_name
+
     """Identifies the type of the event"""
     @property
     def event(self):
         return self._event
 
+    @event.setter
+    def event(self, event):
+        self._event = event
+
     """The time the event was detected"""
     @property
     def event_time(self):
         return self._event_time
 
+    @event_time.setter
+    def event_time(self, event_time):
+        self._event_time = event_time
+
     """Dictionary containing relevant information about the Event"""
     @property
     def metadata(self):
         return self._metadata
 
+    @metadata.setter
+    def metadata(self, metadata):
+        self._metadata = metadata
+
+    """Lazily builds and validates one Event per raw API record (e.g. the pages of a boto3 paginator, with result_key).
+
+    Fields and metadata are given the same way as for Asset.from_records, event the same way as type. Datetime event times are converted to epoch seconds.
+    """
+    @classmethod
+    def from_records(cls, records, event, event_time, display_name, metadata, result_key=None):
+        from .factories import events_from_records
+        return events_from_records(cls, records, event=event, event_time=event_time, display_name=display_name,
+                                   metadata=metadata, result_key=result_key)
+
     def to_dict(self):
         return {
             "display_name": self._display_name,
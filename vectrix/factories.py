@@ -0,0 +1,131 @@
+"""
+Declarative bulk factories that build Assets and Events from raw API records (e.g. boto3 paginator pages)
+"""
+from datetime import datetime
+
+from .metadata import MetadataElement
+from .checks import output_validator
+
+
+def field_getter(source):
+    """
+    Compiles a field source into a function of a record:
+    - callable: called with the record
+    - str containing '{': format string filled in from the record ("Bucket: {Name}", "{Owner[DisplayName]}"). Missing keys give None
+    - str: key of the record, with dots for nested keys ("Owner.DisplayName"). Missing keys give None
+    - anything else: constant value
+    """
+    if callable(source):
+        return source
+    if isinstance(source, str) and "{" in source:
+        def format_record(record):
+            try:
+                return source.format_map(record)
+            except LookupError:
+                return None
+        return format_record
+    if isinstance(source, str):
+        path = source.split(".")
+        if len(path) == 1:
+            return lambda record: record.get(source)
+
+        def get_path(record):
+            for key in path:
+                if not isinstance(record, dict):
+                    return None
+                record = record.get(key)
+            return record
+        return get_path
+    return lambda record: source
+
+
+def name_getter(source):
+    """
+    Same as field_getter, except that a plain str is the name itself (asset types and event names are usually fixed)
+    """
+    if isinstance(source, str) and "{" not in source:
+        return lambda record: source
+    return field_getter(source)
+
+
+def metadata_value(value):
+    """
+    Converts a raw API value into a metadata value (str or list of str)
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [metadata_value(element) for element in value]
+    return str(value)
+
+
+def metadata_builder(metadata: dict):
+    """
+    Compiles a metadata spec {metadata key: (source, priority) or (source, priority, link source)} into a function of a record.
+    Elements whose source is missing (None) are left out. Identical elements are shared through MetadataElement.intern, and
+    so is their (immutable) dict, so an element repeated throughout the records is converted once.
+    """
+    elements = []
+    for metadata_key, element_spec in metadata.items():
+        source, priority = element_spec[0], element_spec[1]
+        link = field_getter(element_spec[2]) if len(element_spec) > 2 else None
+        elements.append((metadata_key, field_getter(source), int(priority), link))
+
+    def build(record):
+        built = {}
+        for metadata_key, get_value, priority, get_link in elements:
+            value = get_value(record)
+            if value is None:
+                continue
+            built[metadata_key] = MetadataElement.intern(
+                priority, metadata_value(value), get_link(record) if get_link is not None else None).shared_dict()
+        return built
+    return build
+
+
+def iter_records(records, result_key: str = None):
+    """
+    Yields raw records, either given directly or (with result_key) from the pages of a boto3 paginator
+    """
+    if result_key is None:
+        yield from records
+        return
+    for page in records:
+        yield from page.get(result_key) or ()
+
+
+def event_time_value(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return value
+
+
+def assets_from_records(asset_class, records, type, id, display_name, metadata: dict, link=None, result_key: str = None):
+    """
+    Lazily builds and validates one Asset per record. See Asset.from_records
+    """
+    get_type, get_id, get_display_name = name_getter(type), field_getter(id), field_getter(display_name)
+    get_link = field_getter(link) if link is not None else None
+    build_metadata = metadata_builder(metadata)
+    validate_asset = output_validator.validate_asset
+    for record in iter_records(records, result_key):
+        asset = asset_class(type=get_type(record), id=get_id(record), display_name=get_display_name(record),
+                            metadata=build_metadata(record), link=get_link(record) if get_link is not None else None)
+        validate_asset(asset.to_dict())
+        yield asset
+
+
+def events_from_records(event_class, records, event, event_time, display_name, metadata: dict, result_key: str = None):
+    """
+    Lazily builds and validates one Event per record. See Event.from_records
+    """
+    get_event, get_event_time, get_display_name = name_getter(event), field_getter(event_time), field_getter(display_name)
+    build_metadata = metadata_builder(metadata)
+    validate_event = output_validator.validate_event
+    for record in iter_records(records, result_key):
+        built = event_class(event=get_event(record), event_time=event_time_value(get_event_time(record)),
+                            display_name=get_display_name(record), metadata=build_metadata(record))
+        validate_event(built.to_dict())
+        yield built
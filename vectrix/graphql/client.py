@@ -1,26 +1,189 @@
 import os
+import json
+import time
+import zlib
+import gzip
 import logging
+import threading
 
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 from .routes import GraphQLRoutes
 from .utils import snake_case_to_camel_case
-from ..settings import API_URL
+from ..metrics import registry as metrics
+from ..settings import (API_URL, HTTP_POOL_SIZE, HTTP_KEEP_ALIVE, ASYNC_MAX_IN_FLIGHT, REQUEST_COMPRESSION,
+                        REQUEST_COMPRESSION_THRESHOLD, REQUEST_COMPRESSION_LEVEL)
 
 logger = logging.getLogger()
 
+COMPRESSIONS = ("none", "gzip", "deflate")
 
-def graphql_client(route: GraphQLRoutes, variables: dict = {}):
+# Responses of servers that don't accept the Content-Encoding of a request body
+UNSUPPORTED_ENCODING_STATUS_CODES = (415,)
+
+
+def compress_body(body: bytes, compression: str, level: int):
+    if compression == "gzip":
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    return zlib.compress(body, level)
+
+
+class GraphQLTransport:
+    """
+    Persistent, pooled HTTP transport to the Vectrix GraphQL API.
+    Connections are kept alive and reused between requests, and the deployment auth headers are built once.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, keep_alive: bool = HTTP_KEEP_ALIVE, compression: str = REQUEST_COMPRESSION,
+                 compression_threshold: int = REQUEST_COMPRESSION_THRESHOLD, compression_level: int = REQUEST_COMPRESSION_LEVEL):
+        if compression not in COMPRESSIONS:
+            raise ValueError(
+                f"request compression is required to be one of {str(list(COMPRESSIONS))}")
+        # requests is imported here rather than at module import, as it is only needed once the first request is made
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.pool_size = pool_size
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({
+            'X-DEPLOYMENT-ID': os.environ.get("DEPLOYMENT_ID", ""),
+            'X-DEPLOYMENT-KEY': os.environ.get("DEPLOYMENT_KEY", "")
+        })
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+        self._requests_sent = 0
+        self._compressed_requests = 0
+        self._uncompressed_bytes = 0
+        self._compressed_bytes = 0
+        self._compression_seconds = 0.0
+        self._compression_fallbacks = 0
+        self._lock = threading.Lock()
+
+    def post(self, url: str, payload: dict):
+        return self.post_body(url, json.dumps(payload, allow_nan=False).encode("utf-8"))
+
+    def post_body(self, url: str, body: bytes):
+        """
+        Posts an already encoded JSON request body, compressing it if it is at least compression_threshold bytes.
+        If the server rejects the compressed body, it is sent again uncompressed and compression is turned off for this transport.
+        """
+        if self.compression != "none" and len(body) >= self.compression_threshold:
+            started = time.perf_counter()
+            compressed = compress_body(body, self.compression, self.compression_level)
+            elapsed = time.perf_counter() - started
+            response = self.__send(url, compressed, {'Content-Encoding': self.compression})
+            if response.status_code not in UNSUPPORTED_ENCODING_STATUS_CODES:
+                with self._lock:
+                    self._compressed_requests += 1
+                    self._uncompressed_bytes += len(body)
+                    self._compressed_bytes += len(compressed)
+                    self._compression_seconds += elapsed
+                return response
+            logger.warning(f"Vectrix API rejected {self.compression} request bodies, sending them uncompressed")
+            with self._lock:
+                self.compression = "none"
+                self._compression_fallbacks += 1
+        return self.__send(url, body, {})
+
+    def __send(self, url: str, body: bytes, headers: dict):
+        headers['Content-Type'] = 'application/json'
+        response = self.session.post(url, data=body, headers=headers)
+        with self._lock:
+            self._requests_sent += 1
+        return response
+
+    def compression_stats(self):
+        """
+        Request body compression counters of the transport.
+
+        :returns: dict with the number of compressed requests, their uncompressed and compressed bytes, the compression ratio,
+                  the time spent compressing, and the number of times the server rejected compressed bodies
+        """
+        return {
+            "compression": self.compression,
+            "compressed_requests": self._compressed_requests,
+            "uncompressed_bytes": self._uncompressed_bytes,
+            "compressed_bytes": self._compressed_bytes,
+            "ratio": self._uncompressed_bytes / self._compressed_bytes if self._compressed_bytes else None,
+            "seconds": self._compression_seconds,
+            "fallbacks": self._compression_fallbacks
+        }
+
+    def stats(self):
+        """
+        Connection reuse counters of the transport.
+
+        :returns: dict with the number of requests sent, connections opened, and requests that reused an open connection
+        """
+        pools = self.adapter.poolmanager.pools
+        connections_opened = sum(pools[key].num_connections for key in pools.keys())
+        return {
+            "requests": self._requests_sent,
+            "connections_opened": connections_opened,
+            "connections_reused": max(self._requests_sent - connections_opened, 0),
+            "pool_size": self.pool_size
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """
+    Returns the process wide GraphQLTransport, creating it on first use
+    """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = GraphQLTransport()
+                transport = _transport
+                metrics.register_gauge("transport", lambda: dict(transport.stats(), **transport.compression_stats()))
+    return _transport
+
+
+def transport_stats():
+    """
+    Connection reuse counters of the process wide GraphQLTransport
+    """
+    return get_transport().stats()
+
+
+def compression_stats():
     """
-    Small wrapper around Vectrix GraphQL API to nicely transmit and convert data
+    Request body compression counters of the process wide GraphQLTransport
     """
+    return get_transport().compression_stats()
+
+
+def graphql_client(route: GraphQLRoutes, variables: dict = {}, query: str = None, body: bytes = None):
+    """
+    Small wrapper around Vectrix GraphQL API to nicely transmit and convert data.
+    query overrides the query text of route (for queries built at runtime, such as batch_log_mutation)
+    body is sent as is instead of query and variables (for request bodies built by vectrix.graphql.encoder)
+    """
+    route_name = route.name
+    started = time.perf_counter()
     try:
-        formatted_variables = snake_case_to_camel_case(variables)
+        if body is not None:
+            response = get_transport().post_body(API_URL, body)
+        else:
+            formatted_variables = snake_case_to_camel_case(variables)
 
-        headers = {'X-DEPLOYMENT-ID': os.environ.get(
-            "DEPLOYMENT_ID", ""), 'X-DEPLOYMENT-KEY': os.environ.get("DEPLOYMENT_KEY", "")}
-        response = requests.post(
-            API_URL, json={"query": route.value, "variables": formatted_variables}, headers=headers)
+            response = get_transport().post(
+                API_URL, {"query": query or route.value, "variables": formatted_variables})
+        record_response(route_name, response)
 
         if response.status_code == 400:
             raise Exception(
@@ -29,5 +192,48 @@ def graphql_client(route: GraphQLRoutes, variables: dict = {}):
         return response.json()['data']
 
     except Exception as e:
+        metrics.increment("graphql.errors", route=route_name)
         logger.exception(e)
         return None
+    finally:
+        metrics.observe("graphql.request.seconds", time.perf_counter() - started, route=route_name)
+
+
+def record_response(route_name: str, response):
+    """
+    Counts a request of route_name, its response status, and the bytes it sent (as sent, i.e. compressed) and received
+    """
+    sent = getattr(getattr(response, "request", None), "body", None)
+    received = getattr(response, "content", None)
+    metrics.increment("graphql.requests", route=route_name)
+    metrics.increment("graphql.bytes_sent", len(sent) if isinstance(sent, (bytes, str)) else 0, route=route_name)
+    metrics.increment("graphql.bytes_received", len(received) if isinstance(received, bytes) else 0, route=route_name)
+    metrics.increment("graphql.responses", route=route_name, status=getattr(response, "status_code", None))
+
+
+class AsyncGraphQLClient:
+    """
+    Awaitable counterpart of graphql_client with bounded in-flight concurrency.
+    Requests run on the pooled GraphQLTransport through a fixed set of max_in_flight workers, so any number of coroutines
+    can await requests while at most max_in_flight requests (and threads) are ever active.
+    """
+
+    def __init__(self, max_in_flight: int = ASYNC_MAX_IN_FLIGHT):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight is required to be at least 1")
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="vectrix-graphql")
+
+    async def __call__(self, route: GraphQLRoutes, variables: dict = {}, body: bytes = None):
+        return await self.run(graphql_client, route=route, variables=variables, body=body)
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Runs a blocking call (e.g. one that makes synchronous requests) on the request workers, so it doesn't block the event loop
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(function, *args, **kwargs))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -1,4 +1,5 @@
 from enum import Enum
+from functools import lru_cache
 
 
 class GraphQLRoutes(Enum):
@@ -45,6 +46,20 @@ class GraphQLRoutes(Enum):
     }
     """
 
+    CREATE_AWS_SESSION_EXPIRATION = """
+    mutation ($input: AwsSessionCreateInput!) {
+        awsSessionCreate(input: $input){
+            errors
+            awsSession {
+                accessKeyId
+                secretAccessKey
+                sessionToken
+                expiration
+            }
+        }
+    }
+    """
+
     CREATE_LOG = """
     mutation ($input: DeploymentLogInput!) {
         deploymentLogCreate(input: $input){
@@ -68,3 +83,55 @@ class GraphQLRoutes(Enum):
         }
     }
     """
+
+    OUTPUT_RESULTS_DELTA = """
+    mutation($input: DeploymentScanDeltaInput!) {
+        deploymentScanDeltaCreate(input: $input) {
+            errors
+        }
+    }
+    """
+
+    CREATE_SCAN_SESSION = """
+    mutation {
+        deploymentScanSessionCreate {
+            errors
+            scanSession {
+                id
+            }
+        }
+    }
+    """
+
+    OUTPUT_RESULTS_CHUNK = """
+    mutation($input: DeploymentScanChunkInput!) {
+        deploymentScanChunkCreate(input: $input) {
+            errors
+        }
+    }
+    """
+
+    COMPLETE_SCAN_SESSION = """
+    mutation($input: DeploymentScanSessionCompleteInput!) {
+        deploymentScanSessionComplete(input: $input) {
+            errors
+        }
+    }
+    """
+
+
+@lru_cache(maxsize=None)
+def batch_log_mutation(count: int):
+    """
+    Builds a single mutation that creates count logs, aliasing deploymentLogCreate as log0 ... log<count - 1>
+    with the variables input0 ... input<count - 1>
+    """
+    variables = ", ".join(f"$input{index}: DeploymentLogInput!" for index in range(count))
+    mutations = "".join(f"""
+        log{index}: deploymentLogCreate(input: $input{index}){{
+            errors
+        }}""" for index in range(count))
+    return f"""
+    mutation ({variables}) {{{mutations}
+    }}
+    """
@@ -1,25 +1,58 @@
 import json
 
+from functools import lru_cache
 
+from ..metrics import registry as metrics, hit_rate
+
+# Keys come from a small vocabulary (display_name, asset_id, event_time, ...), so conversions are memoized
+CONVERT_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=CONVERT_CACHE_SIZE)
 def convert(snake_str):
     components = snake_str.split('_')
     return components[0] + ''.join(x.title() for x in components[1:])
 
 
+def convert_cache_stats():
+    info = convert.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "hit_rate": hit_rate(info.hits, info.misses)}
+
+
+metrics.register_gauge("key_conversion_cache", convert_cache_stats)
+
+
+def _converted_container(value, pending: list):
+    """
+    Returns an empty copy of a dict or list value (queued on pending to be filled in), or the value itself
+    """
+    if isinstance(value, dict):
+        container = {}
+    elif isinstance(value, list):
+        container = []
+    else:
+        return value
+    pending.append((value, container))
+    return container
+
+
 def snake_case_to_camel_case(input):
     """
-    Converts str or dict or list of dicts input to camelCase.
+    Converts str or dict input to camelCase. The keys of nested dicts are converted as well, including dicts within lists.
+    Nested values are converted iteratively, so deeply nested input doesn't hit the recursion limit.
     """
     if isinstance(input, str):
         return convert(input)
     elif isinstance(input, dict):
         formatted_dict = {}
-        for item in input:
-            if isinstance(input[item], dict):
-                formatted_dict[convert(item)] = snake_case_to_camel_case(
-                    input[item])
+        pending = [(input, formatted_dict)]
+        while pending:
+            source, target = pending.pop()
+            if isinstance(source, dict):
+                for key, value in source.items():
+                    target[convert(key)] = _converted_container(value, pending)
             else:
-                formatted_dict[convert(item)] = input[item]
+                target.extend(_converted_container(value, pending) for value in source)
         return formatted_dict
     else:
         raise Exception("Invalid input object type provided")
@@ -30,14 +63,17 @@ def vectrix_item_converter(item_list: list):
     Converts a list of assets, issues, or events into proper metadata formatting for the API request
     """
 
-    formatted_item_list = []
-    for item in item_list:
-        new_item_dict = {}
-        for elem in item:
-            if elem == 'metadata':
-                new_item_dict['metadata'] = str(json.dumps(item['metadata']))
-            else:
-                new_item_dict[snake_case_to_camel_case(elem)] = item[elem]
-        formatted_item_list.append(new_item_dict)
+    return [convert_item(item) for item in item_list]
+
 
-    return formatted_item_list
+def convert_item(item: dict):
+    """
+    Converts a single asset, issue, or event into proper metadata formatting for the API request
+    """
+    new_item_dict = {}
+    for elem in item:
+        if elem == 'metadata':
+            new_item_dict['metadata'] = str(json.dumps(item['metadata']))
+        else:
+            new_item_dict[convert(elem)] = item[elem]
+    return new_item_dict
@@ -3,26 +3,40 @@
 https://developer.vectrix.io/dev/components/output#issues
 """
 class Issue():
-    def __init__(self):
-        self._asset_id = None
-        self._issue = None
-        self._metadata = None
+    __slots__ = ("_asset_id", "_issue", "_metadata")
+
+    def __init__(self, issue=None, asset_id=None, metadata=None):
+        self._asset_id = asset_id
+        self._issue = issue
+        self._metadata = metadata
 
     """The ids of the Assets affected by the issue"""
     @property
     def asset_id(self):
         return self._asset_id
 
+    @asset_id.setter
+    def asset_id(self, asset_id):
+        self._asset_id = asset_id
+
     """Identifies the type of issue"""
     @property
     def issue(self):
         return self._issue
 
+    @issue.setter
+    def issue(self, issue):
+        self._issue = issue
+
     """Dictionary containing relevant information about the Issue"""
     @property
     def metadata(self):
         return self._metadata
 
+    @metadata.setter
+    def metadata(self, metadata):
+        self._metadata = metadata
+
     """Provides a dictionary representation of the Issue.
 
     This should be invoked before adding the Issue to the issue output list
@@ -0,0 +1,191 @@
+"""
+Background, batched shipping of Vectrix logs to the Vectrix API
+"""
+import os
+import json
+import time
+import atexit
+import logging
+import tempfile
+import threading
+
+from collections import deque
+
+from .graphql.routes import GraphQLRoutes, batch_log_mutation
+from .graphql.client import graphql_client
+from .settings import LOG_BATCH_SIZE, LOG_BUFFER_SIZE, LOG_FLUSH_INTERVAL, LOG_OVERFLOW, LOG_SPILL_PATH
+
+logger = logging.getLogger()
+
+OVERFLOW_BEHAVIOURS = ("block", "drop", "spill")
+
+
+class LogShipper:
+    """
+    In-process buffer for deploymentLogCreate inputs.
+
+    A background worker ships the buffer once it holds batch_size logs or every flush_interval seconds, packing up to
+    batch_size logs into one request through aliased mutations. When the buffer holds buffer_size logs, new logs either
+    wait for room ('block'), are discarded ('drop'), or are appended to a JSON lines file that is shipped on the next flush ('spill').
+    Batches that fail to send are appended to the same file, so they are retried on the next flush rather than lost.
+    Errors are logged (never raised), whether the background worker or a flush shipped the batch. Buffered logs are flushed at process exit.
+    """
+
+    def __init__(self, batch_size: int = LOG_BATCH_SIZE, buffer_size: int = LOG_BUFFER_SIZE,
+                 flush_interval: float = LOG_FLUSH_INTERVAL, overflow: str = LOG_OVERFLOW, spill_path: str = LOG_SPILL_PATH):
+        if overflow not in OVERFLOW_BEHAVIOURS:
+            raise ValueError(
+                f"log overflow behaviour is required to be one of {str(list(OVERFLOW_BEHAVIOURS))}")
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_path = spill_path or os.path.join(
+            tempfile.gettempdir(), f"vectrix-log-spill-{os.getpid()}.jsonl")
+
+        self.shipped = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.batches = 0
+
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+
+    def stats(self):
+        """
+        :returns: dict with the current buffer depth and the number of logs shipped, dropped, and spilled to disk
+        """
+        return {
+            "buffered": len(self._buffer),
+            "shipped": self.shipped,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "batches": self.batches
+        }
+
+    def enqueue(self, api_input: dict):
+        """
+        Adds a deploymentLogCreate input to the buffer, starting the background worker on first use
+        """
+        with self._condition:
+            if self._worker is None:
+                self.__start_worker()
+            if len(self._buffer) >= self.buffer_size:
+                if self.overflow == "drop":
+                    self.dropped += 1
+                    return
+                if self.overflow == "spill":
+                    self.__spill(api_input)
+                    return
+                while len(self._buffer) >= self.buffer_size:
+                    self._condition.notify_all()
+                    self._condition.wait()
+            self._buffer.append(api_input)
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify_all()
+
+    def flush(self):
+        """
+        Ships every buffered (and spilled) log from the calling thread
+
+        :returns: list of the errors the Vectrix API reported (which are also logged)
+        """
+        errors = self.__ship()
+        self.__log_errors(errors)
+        return errors
+
+    def close(self):
+        """
+        Stops the background worker and flushes the remaining logs
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+        self.flush()
+
+    def __start_worker(self):
+        self._worker = threading.Thread(target=self.__run, name="vectrix-log-shipper", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def __run(self):
+        while True:
+            with self._condition:
+                # Woken for other reasons too (e.g. room freed for blocked producers), so wait for a full batch or the interval
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._buffer) < self.batch_size and not self._closed and time.monotonic() < deadline:
+                    self._condition.wait(deadline - time.monotonic())
+                if self._closed:
+                    return
+            self.__log_errors(self.__ship())
+
+    @staticmethod
+    def __log_errors(errors: list):
+        if len(errors) != 0:
+            logger.error(f"Error creating log in Vectrix API: {str(errors)}")
+
+    def __spill(self, api_input: dict):
+        self.__spill_all([api_input])
+
+    def __spill_all(self, api_inputs: list):
+        with self._condition:
+            with open(self.spill_path, "a") as f:
+                f.writelines(json.dumps(api_input) + "\n" for api_input in api_inputs)
+            self.spilled += len(api_inputs)
+
+    def __take_batch(self):
+        with self._condition:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            self._condition.notify_all()
+        return batch
+
+    def __take_spilled(self):
+        """
+        Moves the spill file aside (so new spills start a fresh file) and returns its logs
+        """
+        with self._condition:
+            if self.spilled == 0 or not os.path.exists(self.spill_path):
+                return []
+            shipping_path = self.spill_path + ".shipping"
+            os.replace(self.spill_path, shipping_path)
+            self.spilled = 0
+        with open(shipping_path) as f:
+            spilled = [json.loads(line) for line in f if line.strip()]
+        os.remove(shipping_path)
+        return spilled
+
+    def __ship(self):
+        """
+        Ships the buffer followed by the spill file in batches of batch_size. Returns the errors reported by the Vectrix API.
+        The spill file is taken before sending, so batches that fail (and are spilled) are retried on the next flush, not in a loop.
+        """
+        errors = []
+        with self._send_lock:
+            spilled = self.__take_spilled()
+            batch = self.__take_batch()
+            while batch:
+                errors.extend(self.__send(batch))
+                batch = self.__take_batch()
+            for index in range(0, len(spilled), self.batch_size):
+                errors.extend(self.__send(spilled[index:index + self.batch_size]))
+        return errors
+
+    def __send(self, batch: list):
+        if len(batch) == 1:
+            response = graphql_client(route=GraphQLRoutes.CREATE_LOG, variables={"input": batch[0]})
+            mutations = [response.get("deploymentLogCreate")] if response is not None else None
+        else:
+            response = graphql_client(route=GraphQLRoutes.CREATE_LOG, query=batch_log_mutation(len(batch)),
+                                      variables={f"input{index}": api_input for index, api_input in enumerate(batch)})
+            mutations = [response.get(f"log{index}") for index in range(len(batch))] if response is not None else None
+        self.batches += 1
+        if mutations is None:
+            self.__spill_all(batch)
+            return [f"Failed sending {len(batch)} logs to Vectrix API, they are retried on the next flush"]
+        self.shipped += len(batch)
+        return [error for mutation in mutations for error in mutation.get("errors")]
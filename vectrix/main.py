@@ -1,41 +1,335 @@
 """
 Vectrix Detection Pack Utilities
 """
-import boto3
 import os
 import json
+import time
 import logging
+import threading
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from .assets import Asset
 from .events import Event
 from .issues import Issue
+from .batch import ItemBatch
 
 from .graphql.routes import GraphQLRoutes
 from .graphql.client import graphql_client
 from .graphql.utils import vectrix_item_converter
+from .graphql.encoder import encode_output_body, assemble_output_body, json_backend
 from .checks import output_type_check
-from .settings import PRODUCTION_MODE
+from .parallel import parallel_output_check
+from .delta import DELTA_KINDS, compute_delta
+from .streaming import iter_output_items, ScanSessionUploader, OutputBodyBuilder, DevScanResultsWriter
+from .logs import LogShipper
+from .storage import local_storage, atomic_write
+from .scan_results import LastScanResults, StoredLastScanResults
+from .credentials import CredentialCache
+from .aws import AwsClientPool
+from .validation_cache import ValidationCache, HASH_ENCODER
+from .metrics import registry as metrics, summary as metrics_summary, hit_rate
+from .settings import (PRODUCTION_MODE, OUTPUT_CHUNK_SIZE, OUTPUT_CHUNK_BYTES, OUTPUT_SCAN_SESSIONS, LOG_BATCHING, LOCAL_STORAGE_BACKEND,
+                       CREDENTIAL_CACHE, AWS_SESSION_WORKERS, OUTPUT_DELTA, OUTPUT_WORKERS, OUTPUT_VALIDATION, VALIDATION_CACHE_PATH,
+                       OUTPUT_METRICS_REPORT, AWS_SESSION_EXPIRATION)
 from .sentry import activate_sentry
 
+# boto3 takes a large share of import time and is only needed by create_aws_session, so it is imported on first use
+boto3 = None
+
+
+# Result of one account of VectrixUtils.create_aws_sessions: exactly one of session and error is set
+AwsSessionResult = namedtuple("AwsSessionResult", ["account", "session", "error"])
+
+
+def load_boto3():
+    """
+    Returns the boto3 module, importing it on first use
+    """
+    global boto3
+    if boto3 is None:
+        import boto3 as boto3_module
+        boto3 = boto3_module
+    return boto3
+
+
+def enforce_dict_input(assets, issues, events):
+    """Check if Asset, Issue, or Event is an instance of its associated class. If so, convert to dict for further processing.
+    Batches (AssetBatch, IssueBatch, EventBatch) are left as they are"""
+
+    if isinstance(assets, list):
+        for i in range(len(assets)):
+            if isinstance(assets[i], Asset):
+                assets[i] = assets[i].to_dict()
+
+    if isinstance(issues, list):
+        for i in range(len(issues)):
+            if isinstance(issues[i], Issue):
+                issues[i] = issues[i].to_dict()
+
+    if isinstance(events, list):
+        for i in range(len(events)):
+            if isinstance(events[i], Event):
+                events[i] = events[i].to_dict()
+
+
+def parse_state_response(response):
+    deployment = response.get("deployment", None)
+    state = json.loads(deployment.get("state", None))
+    if state is None:
+        raise Exception("Failed retrieving state from Vectrix API")
+    return state
+
+
+def output_variables(assets, issues, events, state):
+    formatted_input = {
+        "assets": vectrix_item_converter(assets),
+        "issues": vectrix_item_converter(issues),
+        "events": vectrix_item_converter(events),
+        "state": str(json.dumps(state))
+    }
+    return {"input": formatted_input}
+
+
+def parse_output_response(response):
+    deployment_scan = response.get("deploymentScanEntryCreate", None)
+    errors = deployment_scan.get("errors", None)
+    if len(errors) != 0:
+        raise Exception(
+            f"Failed outputting scan results to Vectrix API: {str(errors)}")
+
+
+def output_delta_variables(delta, state):
+    formatted_input = {kind: {
+        "added": vectrix_item_converter(delta[kind]["added"]),
+        "modified": vectrix_item_converter(delta[kind]["modified"]),
+        "removed": delta[kind]["removed"]
+    } for kind in DELTA_KINDS}
+    formatted_input["state"] = str(json.dumps(state))
+    return {"input": formatted_input}
+
+
+def delta_accepted(response):
+    """
+    Whether the Vectrix API accepted a delta output. Failed requests, servers without deploymentScanDeltaCreate, and errors
+    all count as rejected (and are counted in the output.delta_rejected metric), so the full scan results are sent instead.
+    """
+    mutation = response.get("deploymentScanDeltaCreate") if response is not None else None
+    if mutation is None or len(mutation.get("errors") or []) != 0:
+        metrics.increment("output.delta_rejected")
+        return False
+    return True
+
+
+def delta_summary(delta):
+    return {kind: {change: len(delta[kind][change]) for change in ("added", "modified", "removed")} for kind in DELTA_KINDS}
+
+
+def parse_credentials_response(response):
+    deployment = response.get("deployment", None)
+    credentials = json.loads(deployment.get("credentials", None))
+    if credentials is None:
+        raise Exception(
+            "Failed retrieving credentials from Vectrix API")
+    return credentials
+
+
+def aws_session_variables(aws_role_arn, aws_external_id):
+    aws_variables = {
+        "awsRoleArn": aws_role_arn,
+        "awsExternalId": aws_external_id
+    }
+    return {"input": aws_variables}
+
+
+def parse_aws_session_credentials(response):
+    """
+    Returns the awsSession (accessKeyId, secretAccessKey, sessionToken) of an awsSessionCreate response
+    """
+    mutation = response.get("awsSessionCreate", None)
+    aws_session = mutation.get("awsSession", None)
+    errors = mutation.get("errors", None)
+    if len(errors) != 0:
+        raise Exception(
+            f"Error retreiving AWS Session from Vectrix API: {str(errors)}")
+    return aws_session
+
+
+def aws_session_route():
+    """
+    awsSessionCreate route, selecting the session expiration with AWS_SESSION_EXPIRATION
+    """
+    return GraphQLRoutes.CREATE_AWS_SESSION_EXPIRATION if AWS_SESSION_EXPIRATION else GraphQLRoutes.CREATE_AWS_SESSION
+
+
+def fetch_aws_session_credentials(aws_role_arn, aws_external_id):
+    response = graphql_client(route=aws_session_route(),
+                              variables=aws_session_variables(aws_role_arn, aws_external_id))
+    return parse_aws_session_credentials(response)
+
+
+def fetch_credentials():
+    response = graphql_client(route=GraphQLRoutes.GET_CREDENTIALS)
+    return parse_credentials_response(response)
+
+
+def boto3_session(botocore_session):
+    """
+    Builds a boto3 session around a botocore session (holding refreshable credentials)
+    """
+    return load_boto3().Session(botocore_session=botocore_session)
+
+
+def parse_aws_session_response(response):
+    """
+    Builds an authenticated boto3 session out of an awsSessionCreate response
+    """
+    aws_session = parse_aws_session_credentials(response)
+
+    access_key_id = aws_session.get("accessKeyId")
+    secret_access_key = aws_session.get("secretAccessKey")
+    session_token = aws_session.get("sessionToken")
+
+    return load_boto3().Session(
+        aws_access_key_id=access_key_id,
+        aws_secret_access_key=secret_access_key,
+        aws_session_token=session_token)
+
+
+def parse_last_scan_results_response(response):
+    scan_results = response.get("deploymentLastScanResults")
+    return {
+        "assets": json.loads(scan_results['assets']),
+        "issues": json.loads(scan_results['issues']),
+        "events": json.loads(scan_results['events'])
+    }
+
+
+def log_variables(log_type: str, visibility: str, message: str):
+    api_input = {
+        "logType": log_type,
+        "logVisibility": visibility,
+        "logMessage": message
+    }
+    return {"input": api_input}
+
+
+def parse_log_response(response):
+    mutation = response.get("deploymentLogCreate")
+    errors = mutation.get("errors")
+    if len(errors) != 0:
+        raise Exception(
+            f"Error creating log in Vectrix API: {str(errors)}")
+
 
 class VectrixUtils:
+    """
+    Creating VectrixUtils is free of side effects: the local development directory, logging, Sentry, and state are all set up
+    on first use (or in the background through prefetch()).
+    """
+
     def __init__(self):
-        if not PRODUCTION_MODE:
-            print("**** Vectrix Detection Pack is in local development mode ****")
-            self.__init_development_mode()
-            logging.basicConfig(
-                filename=(os.getcwd() + '/.vectrix/vectrix-detection-pack.log'), level=logging.WARNING)  # TODO Test logging level change with .error and .warning
-        else:
-            activate_sentry(os.environ.get('SENTRY_DSN', None))
+        if PRODUCTION_MODE:
             self.deployment_id = os.environ.get('DEPLOYMENT_ID')
             self.deployment_key = os.environ.get('DEPLOYMENT_KEY')
             self.auth_headers = {
                 "DEPLOYMENT_ID": self.deployment_id, "DEPLOYMENT_KEY": self.deployment_key}
-        self.state = self.__init_state()
+        self.log_shipper = LogShipper() if LOG_BATCHING else None
+        self.credential_cache = CredentialCache(session_factory=boto3_session) if CREDENTIAL_CACHE else None
+        self.aws_clients = AwsClientPool()
 
         # There's some legacy reliance on production_mode being held within a class var
         self.production_mode = PRODUCTION_MODE
 
+        self._bootstrapped = False
+        self._state = None
+        self._state_future = None
+        self._last_scan_results = None
+        self._validation_cache = None
+        self._init_lock = threading.RLock()
+
+    def __gauges(self):
+        """
+        Gauges of the buffers, caches, and pools this instance keeps. They are read per snapshot rather than registered globally,
+        so several instances never replace each other's gauges (and the metrics registry holds no reference to them).
+        """
+        gauges = {
+            "aws_client_pool": lambda: dict(
+                self.aws_clients.stats(), hit_rate=hit_rate(self.aws_clients.reused, self.aws_clients.created)),
+            "validation_cache": lambda: None if self._validation_cache is None else dict(
+                self._validation_cache.stats(), hit_rate=hit_rate(self._validation_cache.hits, self._validation_cache.misses))
+        }
+        if self.log_shipper is not None:
+            gauges["logs"] = self.log_shipper.stats
+        if self.credential_cache is not None:
+            gauges["credential_cache"] = lambda: dict(
+                self.credential_cache.stats(), hit_rate=hit_rate(self.credential_cache.hits, self.credential_cache.misses))
+        return gauges
+
+    def metrics(self):
+        """
+        SDK metrics: counters and latency histograms of every GraphQL operation (requests, statuses, errors, bytes sent and received),
+        validation time per item kind, serialization time and bytes, and output time, plus gauges of this instance's log buffer and cache hit rates.
+
+        :returns: dict of 'counters', 'histograms', and 'gauges'
+        """
+        return metrics.snapshot(self.__gauges())
+
+    def __bootstrap(self):
+        """
+        One-time environment setup, run on first use of the module
+        """
+        if self._bootstrapped:
+            return
+        with self._init_lock:
+            if self._bootstrapped:
+                return
+            if not PRODUCTION_MODE:
+                print("**** Vectrix Detection Pack is in local development mode ****")
+                self.__init_development_mode()
+                logging.basicConfig(
+                    filename=(os.getcwd() + '/.vectrix/vectrix-detection-pack.log'), level=logging.WARNING)  # TODO Test logging level change with .error and .warning
+            else:
+                activate_sentry(os.environ.get('SENTRY_DSN', None))
+            self._bootstrapped = True
+
+    def __load_state(self):
+        self.__bootstrap()
+        return self.__init_state()
+
+    @property
+    def state(self):
+        """
+        Module state, loaded on first access (or by prefetch())
+        """
+        if self._state is None:
+            with self._init_lock:
+                if self._state is None:
+                    if self._state_future is not None:
+                        self._state = self._state_future.result()
+                    else:
+                        self._state = self.__load_state()
+        return self._state
+
+    @state.setter
+    def state(self, state: dict):
+        self._state = state
+
+    def prefetch(self):
+        """
+        Starts loading module state in the background, so it can overlap with other startup work.
+        The first get_state, set_state, or output call waits for it to finish (and raises if loading failed).
+
+        :returns: concurrent.futures.Future resolving to the module state
+        """
+        with self._init_lock:
+            if self._state_future is None:
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vectrix-prefetch")
+                self._state_future = executor.submit(self.__load_state)
+                executor.shutdown(wait=False)
+        return self._state_future
+
     def __init_state(self):
         """
         Initializes state depending on if the module is in production or not.
@@ -44,20 +338,10 @@ class VectrixUtils:
 
         if (PRODUCTION_MODE):
             response = graphql_client(route=GraphQLRoutes.GET_STATE)
-            deployment = response.get("deployment", None)
-            state = json.loads(deployment.get("state", None))
-            if state is None:
-                raise Exception("Failed retrieving state from Vectrix API")
-            return state
+            return parse_state_response(response)
         else:
-            state_file = os.getcwd() + "/.vectrix/module_state.json"
-            if not os.path.exists(state_file):
-                f = open(state_file, "w+")
-                f.write(json.dumps({}))
-                f.close()
-            with open(state_file) as f:
-                data = json.load(f)
-            return data
+            self._state_store = self.__local_storage()[0]
+            return self._state_store.load()
 
     def __init_development_mode(self):
         """
@@ -68,49 +352,36 @@ class VectrixUtils:
         if not os.path.exists(final_directory):
             os.mkdir(final_directory)
 
-    def __dev_hold_local_state(self, state):
+    def __local_storage(self):
         """
-        This is called within set_state if the vectrix module is in local development and will sync state to the filesystem.
+        (state store, scan results store) of the local development .vectrix directory, as selected by LOCAL_STORAGE_BACKEND
         """
-        state_file = os.getcwd() + "/.vectrix/module_state.json"
-        f = open(state_file, "w+")
-        f.write(json.dumps(state))
-        f.close()
+        return local_storage(os.getcwd() + "/.vectrix", LOCAL_STORAGE_BACKEND)
 
     def __dev_hold_last_scan_results(self, results):
         """
         This is called within output if the vectrix module is in local development and will sync scan results to the filesystem.
         """
-        state_file = os.getcwd() + "/.vectrix/last_scan_results.json"
-        f = open(state_file, "w+")
-        f.write(json.dumps(results))
-        f.close()
-
-    def __enforce_dict_input(self, assets, issues, events):
-        """Check if Asset, Issue, or Event is an instance of its associated class. If so, convert to dict for further processing"""
+        self.__local_storage()[1].write(results)
 
-        if assets is not None:
-            for i in range(len(assets)):
-                if isinstance(assets[i], Asset):
-                    assets[i] = assets[i].to_dict()
+    def __uses_sqlite(self):
+        return PRODUCTION_MODE is False and LOCAL_STORAGE_BACKEND == "sqlite"
 
-        if issues is not None:
-            for i in range(len(issues)):
-                if isinstance(issues[i], Issue):
-                    issues[i] = issues[i].to_dict()
-
-        if events is not None:
-            for i in range(len(events)):
-                if isinstance(events[i], Event):
-                    events[i] = events[i].to_dict()
-
-    def get_state(self):
+    def get_state(self, key: str = None, default=None):
         """
         Retrieve state within the vectrix module. Utilize this method to retrieve state that was previously set with set_state()
+        With a key, only that key is looked up (with the sqlite local storage backend, without loading the rest of the state).
 
-        :returns: dict containing current state.
+        :params: key (String) - Optional key to retrieve the value of
+        :params: default - Value returned when key isn't set
+        :returns: dict containing current state, or the value of key.
         """
-        return self.state
+        if key is None:
+            return self.state
+        if self.__uses_sqlite():
+            self.__bootstrap()
+            return self.__local_storage()[0].get(key, default)
+        return self.state.get(key, default)
 
     def set_state(self, new_state: dict):
         """
@@ -123,13 +394,12 @@ class VectrixUtils:
         if not isinstance(new_state, dict):
             raise ValueError("set_state requires dict type parameter")
 
-        merged_state = self.state.copy()
-        merged_state.update(new_state)
-        self.state = merged_state
+        state = self.state
+        state.update(new_state)
 
         if PRODUCTION_MODE is False:
-            self.__dev_hold_local_state(merged_state)
-        return merged_state
+            self._state_store.set(new_state, state)
+        return state
 
     def unset_state(self, key: str):
         """
@@ -141,22 +411,50 @@ class VectrixUtils:
         if not isinstance(key, str):
             raise ValueError(
                 "unset_state requires str type parameter containing log message")
-        self.state.pop(key, None)
+        state = self.state
+        state.pop(key, None)
         if PRODUCTION_MODE is False:
-            self.__dev_hold_local_state(self.state)
+            self._state_store.unset(key, state)
 
-    def output(self, *ignore, assets=None, issues=None, events=None):
+    @property
+    def validation_cache(self):
         """
-        output will send the identified assets, issues, and events to the Vectrix platform. This should always be called after a scan.
+        Cache of the hashes of items that passed validation, used by output(validation="cached"). Loaded on first access.
+        In local development mode it is kept in .vectrix/validation_cache; in production it is kept in memory for the lifetime
+        of the process (scan containers don't keep files between runs), unless VALIDATION_CACHE_PATH is set.
+        """
+        if self._validation_cache is None:
+            with self._init_lock:
+                if self._validation_cache is None:
+                    path = VALIDATION_CACHE_PATH
+                    if path is None and not PRODUCTION_MODE:
+                        path = os.getcwd() + "/.vectrix/validation_cache"
+                    self._validation_cache = ValidationCache(path)
+        return self._validation_cache
 
-        :params: assets (list) - Keyword argument of the assets identified during a scan.
-        :params: issues (list) - Keyword argument of the issues identified during a scan.
-        :params: events (list) - Keyword argument of the events identified during a scan.
+    def output(self, *ignore, assets=None, issues=None, events=None, delta: bool = OUTPUT_DELTA, workers: int = OUTPUT_WORKERS,
+               validation: str = OUTPUT_VALIDATION, report_metrics: bool = OUTPUT_METRICS_REPORT):
+        """
+        output will send the identified assets, issues, and events to the Vectrix platform. This should always be called after a scan.
+        With delta=True, only the assets, issues, and events that were added, modified, or removed since the last scan are sent. This requires a
+        Vectrix API server with delta outputs; if the delta isn't accepted, the full scan results are sent instead.
+
+        :params: assets (list or AssetBatch) - Keyword argument of the assets identified during a scan.
+        :params: issues (list or IssueBatch) - Keyword argument of the issues identified during a scan.
+        :params: events (list or EventBatch) - Keyword argument of the events identified during a scan.
+        :params: delta (bool) - Keyword argument to send the changes since the last scan instead of the full scan results.
+        :params: workers (int) - Keyword argument of the number of worker processes to validate and encode the output with.
+        :params: validation (str) - Keyword argument of the validation mode: strict (validate every item), cached (skip the per-item checks of items
+                 that passed in an earlier output or scan; needs orjson), or off (skip the per-item checks of items that were already validated; asset ids
+                 are still checked to be unique and issues to only reference given assets).
+        :params: report_metrics (bool) - Keyword argument to send the SDK metrics (see metrics()) as an internal log once the output is sent.
         :returns: (No return)
         """
-        self.__enforce_dict_input(assets, issues, events)
-        output_type_check(assets, issues, events)
+        started = time.perf_counter()
+        encoded = self._check_output(assets, issues, events, delta, workers, validation)
+        self.flush_logs()
         if PRODUCTION_MODE is False:
+            assets, issues, events = [items.to_dicts() if isinstance(items, ItemBatch) else items for items in (assets, issues, events)]
             print("(DEV MODE) Vectrix Detection Pack Output:")
             print("**** ASSETS ****")
             print(json.dumps(assets))
@@ -164,22 +462,125 @@ class VectrixUtils:
             print(json.dumps(issues))
             print("**** EVENTS ****")
             print(json.dumps(events))
+            if delta:
+                changes = compute_delta(self.get_last_scan_results(), {"assets": assets, "issues": issues, "events": events})
+                print("**** DELTA ****")
+                print(json.dumps(delta_summary(changes)))
             self.__dev_hold_last_scan_results(
                 {"assets": assets, "issues": issues, "events": events})
         else:
-            formatted_input = {
-                "assets": vectrix_item_converter(assets),
-                "issues": vectrix_item_converter(issues),
-                "events": vectrix_item_converter(events),
-                "state": str(json.dumps(self.state))
-            }
-            response = graphql_client(
-                route=GraphQLRoutes.OUTPUT_RESULTS, variables={"input": formatted_input})
-            deployment_scan = response.get("deploymentScanEntryCreate", None)
-            errors = deployment_scan.get("errors", None)
-            if len(errors) != 0:
-                raise Exception(
-                    f"Failed outputting scan results to Vectrix API: {str(errors)}")
+            sent = False
+            if delta:
+                variables = self._output_delta_variables(self.get_last_scan_results(), assets, issues, events)
+                sent = delta_accepted(graphql_client(route=GraphQLRoutes.OUTPUT_RESULTS_DELTA, variables=variables))
+            if not sent:
+                body = self._output_body(assets, issues, events, encoded)
+                response = graphql_client(route=GraphQLRoutes.OUTPUT_RESULTS, body=body)
+                parse_output_response(response)
+        self._output_sent(started, report_metrics)
+
+    def _check_output(self, assets, issues, events, delta: bool, workers: int, validation: str):
+        """
+        Validates the assets, issues, and events of an output (shared with AsyncVectrixUtils.output).
+        Objects in lists are converted to dicts in place.
+
+        :returns: (assets, issues, events) as encoded by the worker processes when workers > 1, None otherwise
+        """
+        self.__bootstrap()
+        if workers < 1:
+            raise ValueError("workers is required to be at least 1")
+        if workers > 1 and validation != "strict":
+            raise ValueError("workers can only be used with strict validation")
+        if validation == "cached" and HASH_ENCODER != "orjson":
+            logging.warning('validation="cached" needs orjson to be faster than strict validation (pip install orjson), '
+                            'validating strictly instead')
+            validation = "strict"
+        enforce_dict_input(assets, issues, events)
+        if workers > 1:
+            backend = json_backend() if PRODUCTION_MODE is not False and not delta else None
+            # Includes encoding, which the workers do along with validation
+            with metrics.timer("validation.seconds", kind="parallel"):
+                return parallel_output_check(assets, issues, events, workers, backend=backend)
+        if validation == "cached":
+            output_type_check(assets, issues, events, validation, cache=self.validation_cache)
+            self.validation_cache.save()
+        else:
+            output_type_check(assets, issues, events, validation)
+        return None
+
+    def _output_delta_variables(self, last_scan_results: dict, assets, issues, events):
+        """
+        Variables of the deploymentScanDeltaCreate mutation of an output (shared with AsyncVectrixUtils.output)
+        """
+        changes = compute_delta(last_scan_results, {"assets": assets, "issues": issues, "events": events})
+        with metrics.timer("serialization.seconds"):
+            return output_delta_variables(changes, self.state)
+
+    def _output_body(self, assets, issues, events, encoded=None):
+        """
+        Request body of the deploymentScanEntryCreate mutation of an output (shared with AsyncVectrixUtils.output)
+        """
+        with metrics.timer("serialization.seconds"):
+            if encoded is not None:
+                body = assemble_output_body(GraphQLRoutes.OUTPUT_RESULTS.value, *encoded, self.state, json_backend())
+            else:
+                body = encode_output_body(GraphQLRoutes.OUTPUT_RESULTS.value, assets, issues, events, self.state)
+        metrics.increment("serialization.bytes", len(body))
+        return body
+
+    def _output_sent(self, started: float, report_metrics: bool):
+        """
+        Records the output time, dumps the metrics to .vectrix/metrics.json (local development), and reports them as an internal log if requested
+        """
+        metrics.observe("output.seconds", time.perf_counter() - started)
+        if PRODUCTION_MODE is False:
+            atomic_write(os.getcwd() + "/.vectrix/metrics.json", json.dumps(self.metrics(), indent=2, default=str))
+        if report_metrics:
+            self.log("Vectrix SDK metrics: " + json.dumps(metrics_summary(self.metrics()), default=str))
+
+    def output_stream(self, *ignore, assets=None, issues=None, events=None, chunk_size: int = OUTPUT_CHUNK_SIZE, chunk_bytes: int = OUTPUT_CHUNK_BYTES,
+                      scan_sessions: bool = OUTPUT_SCAN_SESSIONS):
+        """
+        output_stream is the streaming counterpart of output. It accepts any iterable (lists, generators, ...) of assets, issues, and events
+        and validates and encodes them one item at a time, holding only their encoding, then sends them to the Vectrix platform the way output does.
+        With scan_sessions=True (on Vectrix API servers that support scan sessions), items are instead sent in chunks of at most chunk_size items
+        (or roughly chunk_bytes bytes) under a single scan session, so memory use is proportional to the chunk size rather than to the size of the scan.
+        Assets are consumed first, then issues, then events. If an item fails validation, nothing is stored as the last scan.
+
+        :params: assets (iterable) - Keyword argument of the assets identified during a scan.
+        :params: issues (iterable) - Keyword argument of the issues identified during a scan.
+        :params: events (iterable) - Keyword argument of the events identified during a scan.
+        :params: chunk_size (int) - Maximum number of items sent per request (scan sessions only).
+        :params: chunk_bytes (int) - Approximate maximum number of bytes sent per request (scan sessions only).
+        :params: scan_sessions (bool) - Keyword argument to send the items in chunks under a scan session.
+        :returns: (No return)
+        """
+        self.__bootstrap()
+        items = iter_output_items(assets, issues, events)
+        self.flush_logs()
+        if PRODUCTION_MODE is False:
+            writer = DevScanResultsWriter(self.__local_storage()[1].open_writer())
+            try:
+                for kind, item in items:
+                    writer.write(kind, item)
+            except BaseException:
+                writer.abort()
+                raise
+            writer.complete()
+        elif scan_sessions:
+            uploader = ScanSessionUploader(chunk_size, chunk_bytes)
+            uploader.start()
+            for kind, item in items:
+                uploader.add(kind, item)
+            uploader.complete(self.state)
+        else:
+            builder = OutputBodyBuilder()
+            for kind, item in items:
+                builder.add(kind, item)
+            body = builder.body(self.state)
+            metrics.increment("serialization.bytes", len(body))
+            response = graphql_client(route=GraphQLRoutes.OUTPUT_RESULTS, body=body)
+            parse_output_response(response)
 
     def get_credentials(self):
         """
@@ -188,94 +589,152 @@ class VectrixUtils:
         :params: (None)
         :returns: dict of credentials (keys within dict depend on the cloud vendor, For more information, visit https://developer.vectrix.io/module-development/module-access)
         """
+        self.__bootstrap()
         if PRODUCTION_MODE is False:
             raise NotImplementedError(
                 "get_credentials isn't allowed within local development, please handle yourself then implement once moving vectrix module to production")
+        elif self.credential_cache is not None:
+            return self.credential_cache.get_credentials(fetch_credentials)
         else:
-            response = graphql_client(route=GraphQLRoutes.GET_CREDENTIALS)
-            deployment = response.get("deployment", None)
-            credentials = json.loads(deployment.get("credentials", None))
-            if credentials is None:
-                raise Exception(
-                    "Failed retrieving credentials from Vectrix API")
-            return credentials
+            return fetch_credentials()
 
     def create_aws_session(self, aws_role_arn=None, aws_external_id=None):
         """
         This will return an authenticated boto3 session to access a customer AWS environment. For more information, visit https://developer.vectrix.io/module-development/module-access/aws-access
+        Sessions are cached per role ARN and external id, and their credentials are refreshed in the background before they expire.
+        With the credential cache (CREDENTIAL_CACHE, on by default) every thread gets the same session object. boto3 sessions aren't
+        thread-safe, so threads should create clients through aws_client (or aws_resource), which serializes client creation per session,
+        rather than calling session.client themselves.
 
         :param: aws_role_arn (String) - Customer AWS Role ARN (can be retrieved from get_credentials)
         :param: aws_external_id (String) - Customer AWS External ID (can be retrieved from get_credentials)
         :returns: authenticated boto3 session object
         """
+        self.__bootstrap()
         if PRODUCTION_MODE is False:
             raise NotImplementedError(
                 "create_aws_session isn't allowed within local development, please handle yourself then implement once moving vectrix module to production")
 
-        aws_variables = {
-            "awsRoleArn": aws_role_arn,
-            "awsExternalId": aws_external_id
-        }
+        if self.credential_cache is not None:
+            return self.credential_cache.get_aws_session(
+                (aws_role_arn, aws_external_id), lambda: fetch_aws_session_credentials(aws_role_arn, aws_external_id))
+        response = graphql_client(route=GraphQLRoutes.CREATE_AWS_SESSION,
+                                  variables=aws_session_variables(aws_role_arn, aws_external_id))
+        return parse_aws_session_response(response)
 
-        response = graphql_client(route=GraphQLRoutes.CREATE_AWS_SESSION, variables={
-                                  "input": aws_variables})
-        mutation = response.get("awsSessionCreate", None)
-        aws_session = mutation.get("awsSession", None)
-        errors = mutation.get("errors", None)
-        if len(errors) != 0:
-            raise Exception(
-                f"Error retreiving AWS Session from Vectrix API: {str(errors)}")
+    def create_aws_sessions(self, accounts, max_workers: int = AWS_SESSION_WORKERS):
+        """
+        Creates authenticated boto3 sessions for many customer AWS accounts concurrently, yielding each result as soon as it is ready.
+        A failure for one account doesn't stop the others: the exception create_aws_session would have raised is returned in the result instead.
 
-        access_key_id = aws_session.get("accessKeyId")
-        secret_access_key = aws_session.get("secretAccessKey")
-        session_token = aws_session.get("sessionToken")
+        :param: accounts (iterable) - (aws_role_arn, aws_external_id) tuples
+        :param: max_workers (int) - Maximum number of sessions being created at once
+        :returns: generator of AwsSessionResult(account, session, error) in completion order
+        """
+        self.__bootstrap()
+        if PRODUCTION_MODE is False:
+            raise NotImplementedError(
+                "create_aws_sessions isn't allowed within local development, please handle yourself then implement once moving vectrix module to production")
+        if max_workers < 1:
+            raise ValueError("max_workers is required to be at least 1")
+        return self.__fan_out_aws_sessions(list(accounts), max_workers)
 
-        aws_session = boto3.Session(
-            aws_access_key_id=access_key_id,
-            aws_secret_access_key=secret_access_key,
-            aws_session_token=session_token)
+    def __fan_out_aws_sessions(self, accounts: list, max_workers: int):
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vectrix-aws-session")
+        futures = {executor.submit(self.create_aws_session, aws_role_arn=account[0], aws_external_id=account[1]): account
+                   for account in accounts}
+        try:
+            for future in as_completed(futures):
+                error = future.exception()
+                yield AwsSessionResult(futures[future], future.result() if error is None else None, error)
+        finally:
+            # The caller may stop consuming early; don't create sessions nobody will receive
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
 
-        return aws_session
+    def aws_client(self, session, service_name: str, region_name: str = None, config=None):
+        """
+        Returns a pooled boto3 client for a session from create_aws_session. Repeated calls with the same session, service, region, and config
+        return the same (thread-safe) client, and service models are loaded once per process rather than once per client.
+
+        :param: session - boto3 session (from create_aws_session or create_aws_sessions)
+        :param: service_name (String) - AWS service, e.g. 's3'
+        :param: region_name (String) - AWS region, defaults to the session's region
+        :param: config (botocore.config.Config) - Optional client configuration. max_pool_connections defaults to AWS_MAX_POOL_CONNECTIONS
+        :returns: boto3 client
+        """
+        return self.aws_clients.client(session, service_name, region_name=region_name, config=config)
+
+    def aws_resource(self, session, service_name: str, region_name: str = None, config=None):
+        """
+        Same as aws_client for boto3 resources. boto3 resources aren't thread-safe, so each thread gets its own pooled resource.
+
+        :returns: boto3 resource
+        """
+        return self.aws_clients.resource(session, service_name, region_name=region_name, config=config)
+
+    def credential_cache_stats(self):
+        """
+        :returns: dict with the hit, miss, refresh, and eviction counters of the get_credentials / create_aws_session cache
+        """
+        if self.credential_cache is None:
+            return {"hits": 0, "misses": 0, "refreshes": 0, "evictions": 0, "cached": 0}
+        return self.credential_cache.stats()
 
     def get_last_scan_results(self):
         """
         This will return the last scan results of a module within a dictionary of keys 'assets' 'issues' and 'events' - For more information, visit https://developer.vectrix.io/module-development/module-state#last-scan-results
         """
+        self.__bootstrap()
         if PRODUCTION_MODE is False:
-            scan_file = os.getcwd() + "/.vectrix/last_scan_results.json"
-            if not os.path.exists(scan_file):
-                return {"assets": [], "issues": [], "events": []}
-            else:
-                with open(scan_file) as f:
-                    data = json.load(f)
-                return data
+            return self.__local_storage()[1].read()
         else:
             response = graphql_client(
                 route=GraphQLRoutes.GET_LAST_SCAN_RESULTS)
-            scan_results = response.get("deploymentLastScanResults")
-            return {
-                "assets": json.loads(scan_results['assets']),
-                "issues": json.loads(scan_results['issues']),
-                "events": json.loads(scan_results['events'])
-            }
+            return parse_last_scan_results_response(response)
+
+    def last_scan_results(self):
+        """
+        Indexed view over get_last_scan_results, for looking up assets by id or type, issues by asset id, and events by type and time range.
+        The last scan results are retrieved on first call and reused for the rest of the process, so they describe the scan before this one
+        even after output is called. With the sqlite local storage backend, lookups are point reads of .vectrix/vectrix.db instead.
+
+        :returns: LastScanResults
+        """
+        if self._last_scan_results is None:
+            with self._init_lock:
+                if self._last_scan_results is None:
+                    if self.__uses_sqlite():
+                        self.__bootstrap()
+                        self._last_scan_results = StoredLastScanResults(self.__local_storage()[1])
+                    else:
+                        self._last_scan_results = LastScanResults(self.get_last_scan_results())
+        return self._last_scan_results
 
     def __log_sender(self, log_type: str, visibility: str, message: str):
         """
-        Internal helper function to send logs to Vectrix API
+        Internal helper function to send logs to Vectrix API.
+        With log batching enabled, the log is buffered and shipped in the background (see flush_logs)
         """
+        variables = log_variables(log_type, visibility, message)
+        if self.log_shipper is not None:
+            self.log_shipper.enqueue(variables["input"])
+            return
 
-        api_input = {
-            "logType": log_type,
-            "logVisibility": visibility,
-            "logMessage": message
-        }
         response = graphql_client(
-            route=GraphQLRoutes.CREATE_LOG, variables={"input": api_input})
-        mutation = response.get("deploymentLogCreate")
-        errors = mutation.get("errors")
-        if len(errors) != 0:
-            raise Exception(
-                f"Error creating log in Vectrix API: {str(errors)}")
+            route=GraphQLRoutes.CREATE_LOG, variables=variables)
+        parse_log_response(response)
+
+    def flush_logs(self):
+        """
+        Ships every buffered log to the Vectrix API. This is called by output and when the process exits.
+        Logs the Vectrix API rejects are reported through logging rather than raised, so they never fail an output.
+
+        :returns: (No return)
+        """
+        if self.log_shipper is not None:
+            self.log_shipper.flush()
 
     def log(self, message: str):
         """
@@ -284,6 +743,7 @@ class VectrixUtils:
         :param: String for log message
         :returns: (No return)
         """
+        self.__bootstrap()
         if not isinstance(message, str):
             raise ValueError(
                 "log requires str type parameter containing log message")
@@ -300,6 +760,7 @@ class VectrixUtils:
         :param: String for log message
         :returns: (No return)
         """
+        self.__bootstrap()
         if not isinstance(message, str):
             raise ValueError(
                 "external_log requires str type parameter containing log message")
@@ -316,6 +777,7 @@ class VectrixUtils:
         :param: String for error message
         :returns: (No return)
         """
+        self.__bootstrap()
         if not isinstance(error, str):
             raise ValueError(
                 "error requires str type parameter containing error message")
@@ -332,6 +794,7 @@ class VectrixUtils:
         :param: String for error message
         :returns: (No return)
         """
+        self.__bootstrap()
         if not isinstance(error, str):
             raise ValueError(
                 "external_error requires str type parameter containing error message")
@@ -2,21 +2,49 @@ import re
 
 from enum import IntEnum
 
+URL_PATTERN = re.compile(r"(?P<url>https?://[^\s]+)")
+
+# Upper bound on the number of interned MetadataElements
+INTERN_SIZE = 65536
+
 """Represents a vectrix metadata.
 
 https://developer.vectrix.io/dev/components/output#metadata-structure
 """
 class MetadataElement():
+    __slots__ = ("_priority", "_value", "_link", "_shared_dict")
+
+    _interned = {}
+
     def __init__(self, priority, value, link=None):
         self._priority = priority
         self._value = value
         self._link = link
+        self._shared_dict = None
 
-        if link == None and isinstance(value, str):
-            url = re.search(r"(?P<url>https?://[^\s]+)", value)
+        # Values without "http" can't hold a link, so most values skip the regular expression
+        if link == None and isinstance(value, str) and "http" in value:
+            url = URL_PATTERN.search(value)
             if url != None:
                 self._link = url.group()
 
+    """Returns a shared MetadataElement for (priority, value, link).
+
+    MetadataElements are immutable, so identical elements (e.g. the same region or account number on every asset)
+    can be created once and reused. Elements with list values aren't interned.
+    """
+    @classmethod
+    def intern(cls, priority, value, link=None):
+        if not isinstance(value, str):
+            return cls(priority, value, link)
+        key = (int(priority), value, link)
+        element = cls._interned.get(key)
+        if element is None:
+            if len(cls._interned) >= INTERN_SIZE:
+                cls._interned.clear()
+            element = cls._interned.setdefault(key, cls(priority, value, link))
+        return element
+
     """Range between -1 and 100 that denotes the priority of the MetadataElement"""
     @property
     def priority(self):
@@ -47,6 +75,68 @@ class MetadataElement():
 
         return result
 
+    """Provides the dictionary representation of the Metadata, built once and shared by every item using this MetadataElement.
+
+    Used with interned elements, so the same element on many Assets, Issues, or Events is one dict. The dict is immutable.
+    """
+    def shared_dict(self):
+        if self._shared_dict is None:
+            self._shared_dict = FrozenMetadataDict(self.to_dict())
+        return self._shared_dict
+
+
+"""Immutable metadata element dict, shared by every item with the same MetadataElement"""
+class FrozenMetadataDict(dict):
+    def __immutable(self, *args, **kwargs):
+        raise TypeError("shared metadata elements are immutable, build a new metadata element dict to change one")
+
+    __setitem__ = __delitem__ = __ior__ = update = pop = popitem = clear = setdefault = __immutable
+
+    def __reduce__(self):
+        return (FrozenMetadataDict, (dict(self),))
+
+
+"""Immutable metadata mapping shared by many Assets, Issues, or Events.
+
+The mapping is built once from MetadataElements (or metadata dicts), validated once by vectrix.output,
+and serialized once per JSON encoder no matter how many items reference it. Its element dicts are immutable as well
+(list values are copied), so the validation and serialization can't go stale.
+"""
+class MetadataTemplate(dict):
+    def __init__(self, elements):
+        super().__init__((key, self.__frozen_element(element)) for key, element in elements.items())
+        self.validated = False
+        self._serialized = {}
+
+    def serialized(self, backend):
+        """JSON string of the mapping, encoded once per backend"""
+        encoded = self._serialized.get(backend.name)
+        if encoded is None:
+            encoded = self._serialized[backend.name] = backend.dumps_str(dict(self))
+        return encoded
+
+    """Returns a new (plain dict) metadata mapping with the template's elements and additional elements"""
+    def merge(self, elements):
+        merged = {key: dict(element) for key, element in self.items()}
+        merged.update((key, element.to_dict() if isinstance(element, MetadataElement) else element)
+                      for key, element in elements.items())
+        return merged
+
+    @staticmethod
+    def __frozen_element(element):
+        element = element.to_dict() if isinstance(element, MetadataElement) else dict(element)
+        if isinstance(element.get('value'), list):
+            element['value'] = list(element['value'])
+        return FrozenMetadataDict(element)
+
+    def __immutable(self, *args, **kwargs):
+        raise TypeError("MetadataTemplate is immutable, use merge() to build a new metadata mapping")
+
+    __setitem__ = __delitem__ = __ior__ = update = pop = popitem = clear = setdefault = __immutable
+
+    def __reduce__(self):
+        return (MetadataTemplate, (dict(self),))
+
 
 """Enum for the metadata priority
 
@@ -0,0 +1,161 @@
+"""
+In-process metrics: counters, latency histograms, and gauges read from the SDK's caches and buffers
+"""
+import time
+import threading
+
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket holds everything slower
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def metric_key(name: str, labels: dict):
+    """
+    Name of a metric with its labels, e.g. graphql.requests{route=GET_STATE}
+    """
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{label}={value}" for label, value in sorted(labels.items())) + "}"
+
+
+class Histogram:
+    __slots__ = ("bounds", "buckets", "count", "sum", "max")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        index = 0
+        for bound in self.bounds:
+            if value <= bound:
+                break
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float):
+        """
+        Upper bound of the bucket holding the q-quantile (the maximum for the last bucket)
+        """
+        if self.count == 0:
+            return None
+        rank, seen = q * self.count, 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {("+Inf" if index == len(self.bounds) else str(self.bounds[index])): count
+                        for index, count in enumerate(self.buckets)}
+        }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of counters and histograms, plus gauges: callables that are read when a snapshot is taken
+    (for values other components already track, such as buffer depths and cache counters)
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = metric_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = metric_key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """
+        Observes the seconds spent in the with block into the histogram name
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def register_gauge(self, name: str, read):
+        """
+        :params: read - callable returning a number or a dict of numbers; a later registration under the same name replaces it
+        """
+        with self._lock:
+            self._gauges[name] = read
+
+    def counter(self, name: str, **labels):
+        return self._counters.get(metric_key(name, labels), 0)
+
+    def histogram(self, name: str, **labels):
+        histogram = self._histograms.get(metric_key(name, labels))
+        return histogram.to_dict() if histogram is not None else None
+
+    def snapshot(self, gauges: dict = None):
+        """
+        :params: gauges - additional {name: read} gauges read for this snapshot only (e.g. those of one VectrixUtils instance)
+        :returns: dict of 'counters', 'histograms', and 'gauges'. Gauges that fail to read are left out.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: histogram.to_dict() for key, histogram in self._histograms.items()}
+            gauges = dict(self._gauges, **(gauges or {}))
+        read_gauges = {}
+        for name, read in gauges.items():
+            try:
+                read_gauges[name] = read()
+            except Exception:
+                continue
+        return {"counters": counters, "histograms": histograms, "gauges": read_gauges}
+
+    def reset(self):
+        """
+        Clears counters and histograms (gauges stay registered)
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def summary(snapshot: dict):
+    """
+    Compact form of a snapshot for reporting: histograms are reduced to their count, total seconds, and 95th percentile
+    """
+    return {
+        "counters": snapshot["counters"],
+        "histograms": {key: {"count": histogram["count"], "sum": round(histogram["sum"], 6), "p95": histogram["p95"]}
+                       for key, histogram in snapshot["histograms"].items()},
+        "gauges": snapshot["gauges"]
+    }
+
+
+def hit_rate(hits: int, misses: int):
+    return hits / (hits + misses) if hits + misses else None
+
+
+registry = MetricsRegistry()
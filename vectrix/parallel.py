@@ -0,0 +1,198 @@
+"""
+Process-pool validation and encoding of large outputs
+"""
+import os
+import ast
+import sys
+import atexit
+import logging
+import threading
+import multiprocessing
+
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import ItemBatch
+from .checks import output_container_check, output_validator, output_type_check
+from .graphql.encoder import iter_encoded, encode_items, json_backend
+
+logger = logging.getLogger()
+
+# Kinds with fewer items than this are handled by a single shard
+MIN_SHARD_SIZE = 1000
+
+# Workers are started from a clean server process (or spawned where forkserver isn't available) rather than forked: by the time an
+# output is validated the process runs the log shipper, credential refresher, HTTP pool, and prefetch threads, and a forked
+# child can deadlock on a lock one of them held. Worker functions must therefore be importable from this module, and every worker
+# imports the detection pack's main module again (see main_module_guarded).
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def process_pool(workers: int):
+    """
+    Returns the process pool with the given number of workers, creating it on first use. Pools are kept for the
+    lifetime of the process, so repeated outputs don't pay the worker start-up cost again.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(START_METHOD))
+        return pool
+
+
+@atexit.register
+def shutdown_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False)
+        _pools.clear()
+
+
+def is_main_guard(node):
+    """
+    Whether an AST node is an if __name__ == "__main__": statement
+    """
+    if not isinstance(node, ast.If) or not isinstance(node.test, ast.Compare) or len(node.test.comparators) != 1:
+        return False
+    operands = [node.test.left, node.test.comparators[0]]
+    return (isinstance(node.test.ops[0], ast.Eq) and any(isinstance(operand, ast.Name) and operand.id == "__name__" for operand in operands)
+            and any(isinstance(operand, ast.Constant) and operand.value == "__main__" for operand in operands))
+
+
+@lru_cache(maxsize=None)
+def source_is_guarded(path: str):
+    """
+    Whether the script at path has a top-level if __name__ == "__main__": guard
+    """
+    try:
+        with open(path, "rb") as source:
+            tree = ast.parse(source.read(), filename=path)
+    except (OSError, SyntaxError, ValueError):
+        return False
+    return any(is_main_guard(node) for node in tree.body)
+
+
+def main_module_guarded():
+    """
+    Whether worker processes can import the main module again without running the scan. Like every spawned or forkserver
+    process, a worker re-runs the main script (as __mp_main__) before it takes work, so a detection pack that scans at the top
+    level of its script, without an if __name__ == "__main__": guard, would run its whole scan again in every worker.
+
+    Interactive sessions, python -c, and packages run with python -m (whose __main__ module isn't re-run) are always safe.
+    """
+    main_module = sys.modules.get("__main__")
+    spec = getattr(main_module, "__spec__", None)
+    if spec is not None and spec.name is not None:
+        if spec.name == "__main__" or spec.name.endswith(".__main__"):
+            return True
+        path = spec.origin
+    else:
+        path = getattr(main_module, "__file__", None)
+    if path is None or os.path.splitext(os.path.basename(path))[0] == "ipython":
+        return True
+    return source_is_guarded(os.path.abspath(path))
+
+
+def shards(items, workers: int):
+    """
+    Splits a list or batch into at most workers contiguous shards of at least MIN_SHARD_SIZE items
+    """
+    count = len(items)
+    shard_size = max(MIN_SHARD_SIZE, -(-count // workers))
+    for start in range(0, count, shard_size):
+        if isinstance(items, ItemBatch):
+            yield items.shard(start, start + shard_size)
+        else:
+            yield items[start:start + shard_size]
+
+
+def process_shard(kind: str, items, backend_name: str = None):
+    """
+    Runs in a worker process: validates every item of a shard on its own (without the cross-item checks) and encodes it
+    when backend_name is given.
+
+    :returns: None if an item is invalid, otherwise (encoded items joined by the item separator or None, ids) where ids are
+              the asset ids of an asset shard in order, or the set of asset ids referenced by an issue shard
+    """
+    try:
+        if isinstance(items, ItemBatch):
+            output_validator.validate_batch(kind, items)
+            if kind == "asset":
+                for asset_type in dict.fromkeys(items.column('type')):
+                    output_validator.check_asset_type({'type': asset_type})
+        else:
+            validate = getattr(output_validator, "validate_" + kind)
+            for item in items:
+                validate(item)
+    except ValueError:
+        return None
+
+    ids = None
+    if kind == "asset":
+        ids = items.column('id') if isinstance(items, ItemBatch) else [asset['id'] for asset in items]
+    elif kind == "issue":
+        references = items.column('asset_id') if isinstance(items, ItemBatch) else (issue['asset_id'] for issue in items)
+        ids = set()
+        for asset_ids in references:
+            ids.update(asset_ids)
+
+    encoded = None
+    if backend_name is not None:
+        backend = json_backend(backend_name)
+        encoded = backend.item_separator.join(iter_encoded(items, backend))
+    return encoded, ids
+
+
+def parallel_output_check(assets, issues, events, workers: int, backend=None):
+    """
+    Parallel counterpart of output_type_check: assets, issues, and events are sharded across a pool of worker processes
+    that validate (and, with a backend, encode) them. The cross-item checks then run on the asset ids and issue references
+    the shards return.
+
+    When any check fails, the whole output is validated again by the serial validator, so the error raised is exactly the
+    one output_type_check raises.
+
+    Detection packs whose main script isn't guarded by if __name__ == "__main__": are validated (and encoded) serially
+    instead, with a warning, as the workers would run the pack's scan again.
+
+    :returns: None, or (with a backend) the encoded asset, issue, and event arrays
+    """
+    output_container_check(assets, issues, events)
+    if not main_module_guarded():
+        logger.warning("Validating the output serially: worker processes re-run the detection pack's main script, which "
+                       "needs an if __name__ == \"__main__\": guard around the scan to use workers")
+        output_type_check(assets, issues, events)
+        if backend is None:
+            return None
+        return tuple(encode_items(items, backend) for items in (assets, issues, events))
+    backend_name = backend.name if backend is not None else None
+    pool = process_pool(workers)
+    futures = {kind: [pool.submit(process_shard, kind, shard, backend_name) for shard in shards(items, workers)]
+               for kind, items in (("asset", assets), ("issue", issues), ("event", events))}
+    results = {kind: [future.result() for future in kind_futures] for kind, kind_futures in futures.items()}
+
+    valid = all(result is not None for kind_results in results.values() for result in kind_results)
+    if valid:
+        asset_ids = set()
+        asset_count = 0
+        for _, ids in results["asset"]:
+            asset_ids.update(ids)
+            asset_count += len(ids)
+        references = set()
+        for _, ids in results["issue"]:
+            references.update(ids)
+        valid = asset_count == len(asset_ids) and references <= asset_ids
+    if not valid:
+        output_container_check(assets, issues, events)
+        output_validator.validate(assets, issues, events)
+        # The serial validator only disagrees with the shards if they were given items that changed in between
+        raise ValueError("output failed validation")
+
+    if backend is None:
+        return None
+    return tuple(b"[" + backend.item_separator.join(encoded for encoded, _ in results[kind] if encoded) + b"]"
+                 for kind in ("asset", "issue", "event"))
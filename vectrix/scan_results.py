@@ -0,0 +1,121 @@
+"""
+Indexed view over the last scan results of a module
+"""
+from bisect import bisect_left
+from collections import defaultdict
+
+from .graphql.utils import convert
+
+
+def item_field(item: dict, key: str):
+    """
+    Reads a field from an item in either form: as passed to output (snake_case keys) or as returned by the Vectrix API (camelCase keys)
+    """
+    if key in item:
+        return item[key]
+    return item.get(convert(key))
+
+
+class LastScanResults:
+    """
+    Read-only view over the 'assets', 'issues', and 'events' returned by get_last_scan_results, with constant time
+    lookups of assets by id and type, issues by referenced asset id, and events by type (and time range).
+    Items are returned exactly as the last scan results hold them.
+    """
+
+    def __init__(self, results: dict):
+        self.assets = results.get("assets") or []
+        self.issues = results.get("issues") or []
+        self.events = results.get("events") or []
+
+        self._assets_by_id = {}
+        self._assets_by_type = defaultdict(list)
+        for asset in self.assets:
+            self._assets_by_id[item_field(asset, "id")] = asset
+            self._assets_by_type[item_field(asset, "type")].append(asset)
+
+        self._issues_by_asset = defaultdict(list)
+        for issue in self.issues:
+            for asset_id in dict.fromkeys(item_field(issue, "asset_id") or ()):
+                self._issues_by_asset[asset_id].append(issue)
+
+        events_by_type = defaultdict(list)
+        for position, event in enumerate(self.events):
+            events_by_type[item_field(event, "event")].append((item_field(event, "event_time"), position, event))
+        self._events_by_type = {}
+        for event_type, entries in events_by_type.items():
+            entries.sort(key=lambda entry: entry[:2])
+            self._events_by_type[event_type] = ([entry[0] for entry in entries], [entry[2] for entry in entries])
+
+    def __contains__(self, asset_id: str):
+        return asset_id in self._assets_by_id
+
+    def to_dict(self):
+        return {"assets": self.assets, "issues": self.issues, "events": self.events}
+
+    def get_asset(self, asset_id: str):
+        """
+        :returns: the asset with the given id, or None if it wasn't in the last scan
+        """
+        return self._assets_by_id.get(asset_id)
+
+    def assets_of_type(self, asset_type: str):
+        return list(self._assets_by_type.get(asset_type, ()))
+
+    def issues_for_asset(self, asset_id: str):
+        return list(self._issues_by_asset.get(asset_id, ()))
+
+    def events_of_type(self, event: str, start: int = None, end: int = None):
+        """
+        Events of the given type with start <= event_time < end (either bound is optional), ordered by event_time
+        """
+        if event not in self._events_by_type:
+            return []
+        times, events = self._events_by_type[event]
+        low = 0 if start is None else bisect_left(times, start)
+        high = len(times) if end is None else bisect_left(times, end)
+        return events[low:high]
+
+
+class StoredLastScanResults(LastScanResults):
+    """
+    LastScanResults whose lookups are point reads of a local development SQLiteStore, so the last scan is never loaded as a whole
+    unless assets, issues, events, or to_dict() are used. It is pinned to the scan that was last when it was created.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._generation = store.scan_generation()
+        self._results = None
+
+    def __results(self):
+        if self._results is None:
+            self._results = self._store.read(self._generation)
+        return self._results
+
+    @property
+    def assets(self):
+        return self.__results()["assets"]
+
+    @property
+    def issues(self):
+        return self.__results()["issues"]
+
+    @property
+    def events(self):
+        return self.__results()["events"]
+
+    def __contains__(self, asset_id: str):
+        return self.get_asset(asset_id) is not None
+
+    def get_asset(self, asset_id: str):
+        return self._store.get_asset(asset_id, self._generation)
+
+    def assets_of_type(self, asset_type: str):
+        return self._store.assets_of_type(asset_type, self._generation)
+
+    def issues_for_asset(self, asset_id: str):
+        return self._store.issues_for_asset(asset_id, self._generation)
+
+    def events_of_type(self, event: str, start: int = None, end: int = None):
+        return self._store.events_of_type(event, start, end, self._generation)
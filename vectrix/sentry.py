@@ -1,7 +1,6 @@
-from sentry_sdk import init
-
-
 def activate_sentry(sentry_webhook: str):
     if not sentry_webhook:
         raise Exception("No webhook provided to activate sentry.")
+    # Sentry is only needed in production, so it is imported on first use
+    from sentry_sdk import init
     init(sentry_webhook)
@@ -2,3 +2,77 @@ import os
 
 PRODUCTION_MODE = os.environ.get('PRODUCTION_MODE') == "TRUE"
 API_URL = os.environ.get('PLATFORM_URL', None)
+
+# Maximum number of items and (approximate) bytes sent per chunk by VectrixUtils.output_stream
+OUTPUT_CHUNK_SIZE = int(os.environ.get('OUTPUT_CHUNK_SIZE', 1000))
+OUTPUT_CHUNK_BYTES = int(os.environ.get('OUTPUT_CHUNK_BYTES', 4 * 1024 * 1024))
+
+# Send VectrixUtils.output_stream in chunks under a scan session. Only Vectrix API servers with the deploymentScanSession mutations
+# support it; otherwise output_stream sends a single deploymentScanEntryCreate like output
+OUTPUT_SCAN_SESSIONS = os.environ.get('OUTPUT_SCAN_SESSIONS') == "TRUE"
+
+# Send only the changes since the last scan from VectrixUtils.output (see its delta argument). Only Vectrix API servers with the
+# deploymentScanDeltaCreate mutation accept delta outputs; whenever the delta isn't accepted, the full scan results are sent instead
+OUTPUT_DELTA = os.environ.get('OUTPUT_DELTA') == "TRUE"
+
+# Number of worker processes VectrixUtils.output validates and encodes large outputs with (1 validates and encodes in-process)
+OUTPUT_WORKERS = int(os.environ.get('OUTPUT_WORKERS', 1))
+
+# Default validation of VectrixUtils.output (strict, cached, or off). The cached mode keeps the hashes of up to VALIDATION_CACHE_SIZE
+# valid items in VALIDATION_CACHE_PATH (by default .vectrix/validation_cache in the current directory in local development mode, and
+# in memory for the lifetime of the process in production). Cached validation is only
+# slightly faster than strict validation (about 1.1x for unchanged items), and needs orjson: without it output validates strictly
+OUTPUT_VALIDATION = os.environ.get('OUTPUT_VALIDATION', "strict")
+VALIDATION_CACHE_SIZE = int(os.environ.get('VALIDATION_CACHE_SIZE', 100000))
+VALIDATION_CACHE_PATH = os.environ.get('VALIDATION_CACHE_PATH', None)
+
+# Report the SDK metrics (vectrix.metrics()) as an internal log at the end of every VectrixUtils.output
+OUTPUT_METRICS_REPORT = os.environ.get('OUTPUT_METRICS_REPORT') == "TRUE"
+
+# JSON encoder for output request bodies: auto (orjson if installed, else json), orjson, or json
+JSON_BACKEND = os.environ.get('JSON_BACKEND', "auto")
+
+# Connection pool used by the GraphQL client
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+HTTP_KEEP_ALIVE = os.environ.get('HTTP_KEEP_ALIVE') != "FALSE"
+
+# Number of threads VectrixUtils.create_aws_sessions creates sessions with (at most one pooled connection each)
+AWS_SESSION_WORKERS = int(os.environ.get('AWS_SESSION_WORKERS', HTTP_POOL_SIZE))
+
+# HTTP connections per boto3 client created by VectrixUtils.aws_client / aws_resource
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', 25))
+
+# Compression of GraphQL request bodies of at least REQUEST_COMPRESSION_THRESHOLD bytes: none, gzip, or deflate
+REQUEST_COMPRESSION = os.environ.get('REQUEST_COMPRESSION', "none")
+REQUEST_COMPRESSION_THRESHOLD = int(os.environ.get('REQUEST_COMPRESSION_THRESHOLD', 64 * 1024))
+REQUEST_COMPRESSION_LEVEL = int(os.environ.get('REQUEST_COMPRESSION_LEVEL', 6))
+
+# Maximum number of concurrent in-flight requests made through AsyncVectrixUtils
+ASYNC_MAX_IN_FLIGHT = int(os.environ.get('ASYNC_MAX_IN_FLIGHT', 16))
+
+# Background log shipping (LOG_OVERFLOW is one of: block, drop, spill)
+LOG_BATCHING = os.environ.get('LOG_BATCHING') != "FALSE"
+LOG_BATCH_SIZE = int(os.environ.get('LOG_BATCH_SIZE', 100))
+LOG_BUFFER_SIZE = int(os.environ.get('LOG_BUFFER_SIZE', 10000))
+LOG_FLUSH_INTERVAL = float(os.environ.get('LOG_FLUSH_INTERVAL', 1.0))
+LOG_OVERFLOW = os.environ.get('LOG_OVERFLOW', "block")
+LOG_SPILL_PATH = os.environ.get('LOG_SPILL_PATH', None)
+
+# Number of journaled state patches after which local development state is compacted into module_state.json
+STATE_COMPACT_AFTER = int(os.environ.get('STATE_COMPACT_AFTER', 1000))
+
+# Local development storage backend for state and last scan results: json (.vectrix/*.json files) or sqlite (.vectrix/vectrix.db)
+LOCAL_STORAGE_BACKEND = os.environ.get('LOCAL_STORAGE_BACKEND', "json")
+
+# Caching of get_credentials and create_aws_session results. Cached entries are refreshed in the background CREDENTIAL_REFRESH_MARGIN
+# seconds before they expire (or halfway through their lifetime, if shorter), unless they haven't been used for CREDENTIAL_IDLE_TTL
+# seconds, in which case they are evicted instead.
+# With AWS_SESSION_EXPIRATION, create_aws_session asks the Vectrix API for the expiration of each session; only servers whose awsSession
+# has an expiration field accept it. Sessions without one are assumed to live AWS_SESSION_TTL seconds, by default the shortest
+# session STS issues (15 minutes), so a cached session is never served after it expires
+CREDENTIAL_CACHE = os.environ.get('CREDENTIAL_CACHE') != "FALSE"
+CREDENTIALS_TTL = int(os.environ.get('CREDENTIALS_TTL', 300))
+AWS_SESSION_TTL = int(os.environ.get('AWS_SESSION_TTL', 900))
+AWS_SESSION_EXPIRATION = os.environ.get('AWS_SESSION_EXPIRATION') == "TRUE"
+CREDENTIAL_REFRESH_MARGIN = int(os.environ.get('CREDENTIAL_REFRESH_MARGIN', 1200))
+CREDENTIAL_IDLE_TTL = int(os.environ.get('CREDENTIAL_IDLE_TTL', 900))
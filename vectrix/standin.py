@@ -0,0 +1,271 @@
+"""
+Local stand-in for the Vectrix GraphQL API, for testing and load testing the SDK offline.
+
+Run it on its own with: python -m vectrix.standin --port 8080 [--latency 0.05] [--error-rate 0.01] [--max-rps 100]
+and point the SDK at it with PLATFORM_URL=http://127.0.0.1:8080/graphql PRODUCTION_MODE=TRUE
+"""
+import json
+import math
+import time
+import zlib
+import gzip
+import random
+import argparse
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .delta import apply_delta
+from .graphql.routes import GraphQLRoutes
+
+
+class StandInServer:
+    """
+    Threaded HTTP server that implements every GraphQLRoutes operation against in-memory state and scan results,
+    and records each request (route, variables, size, encoding, status, and handling time).
+
+    :params: state - initial module state
+    :params: latency - seconds added to every request, route_latency - {GraphQLRoutes: seconds} overriding it per route
+    :params: denied_external_ids - external ids for which awsSessionCreate answers AccessDenied
+    :params: accept_encodings - request body encodings accepted; others are answered with 415
+    :params: error_rate - fraction of requests answered with error_status (4xx or 5xx) instead of being handled, seeded by seed
+    :params: max_requests_per_second - requests beyond this rate (with bursts of up to burst requests) are answered with 429
+    """
+
+    def __init__(self, state=None, latency: float = 0, denied_external_ids=(), accept_encodings=("gzip", "deflate"),
+                 route_latency: dict = None, error_rate: float = 0, error_status: int = 500, max_requests_per_second: float = None,
+                 burst: int = None, seed: int = None, host: str = "127.0.0.1", port: int = 0):
+        if not 400 <= error_status < 600:
+            raise ValueError("error_status is required to be a 4xx or 5xx status code")
+        self.state = state if state is not None else {}
+        self.latency = latency
+        self.route_latency = dict(route_latency or {})
+        self.denied_external_ids = set(denied_external_ids)
+        self.accept_encodings = set(accept_encodings)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_requests_per_second = max_requests_per_second
+        self.burst = burst if burst is not None else max(1, int(max_requests_per_second or 1))
+        self.requests = []
+        self.logs = []
+        self.scan_sessions = {}
+        self.last_scan = None
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._random = random.Random(seed)
+        self._injected = []
+        self._tokens = float(self.burst)
+        self._tokens_updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._routes = {route.value: route for route in GraphQLRoutes}
+        self._server = ThreadingHTTPServer((host, port), self.__handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    @property
+    def url(self):
+        return "http://{0}:{1}/graphql".format(*self._server.server_address)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def requests_for(self, route: GraphQLRoutes):
+        return [request for request in self.requests if request["route"] is route]
+
+    def fail_next(self, status: int = 500, count: int = 1, route: GraphQLRoutes = None):
+        """
+        Answers the next count requests (of route, if given) with status instead of handling them
+        """
+        with self._lock:
+            self._injected.append({"status": status, "count": count, "route": route})
+
+    def stats(self):
+        """
+        :returns: dict with the number of requests (in total, per route, and per status), bytes received,
+                  and the median, 95th percentile, and maximum handling time in seconds
+        """
+        with self._lock:
+            requests = list(self.requests)
+        seconds = sorted(request["seconds"] for request in requests)
+        by_route, by_status = {}, {}
+        for request in requests:
+            route = request["route"].name if request["route"] is not None else None
+            by_route[route] = by_route.get(route, 0) + 1
+            by_status[request["status"]] = by_status.get(request["status"], 0) + 1
+        return {
+            "requests": len(requests),
+            "by_route": by_route,
+            "by_status": by_status,
+            "bytes_received": sum(request["size"] for request in requests),
+            "max_in_flight": self.max_in_flight,
+            "p50_seconds": seconds[len(seconds) // 2] if seconds else None,
+            "p95_seconds": seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))] if seconds else None,
+            "max_seconds": seconds[-1] if seconds else None
+        }
+
+    def _throttled(self):
+        """
+        Token bucket of max_requests_per_second. :returns: seconds until a request would be accepted, or 0 if this one is
+        """
+        if self.max_requests_per_second is None:
+            return 0
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._tokens_updated) * self.max_requests_per_second)
+        self._tokens_updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.max_requests_per_second
+
+    def _injected_status(self, route: GraphQLRoutes):
+        for injected in self._injected:
+            if injected["route"] is None or injected["route"] is route:
+                injected["count"] -= 1
+                if injected["count"] <= 0:
+                    self._injected.remove(injected)
+                return injected["status"]
+        if self.error_rate and self._random.random() < self.error_rate:
+            return self.error_status
+        return None
+
+    def _record(self, route, variables, size: int, encoding, status: int, started: float):
+        with self._lock:
+            self.requests.append({"route": route, "variables": variables, "size": size, "encoding": encoding, "status": status,
+                                  "seconds": time.perf_counter() - started})
+
+    def __handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            wbufsize = -1
+
+            def log_message(self, *args):
+                pass
+
+            def respond(self, status: int, payload: dict = None, headers: dict = None):
+                response = json.dumps(payload).encode() if payload is not None else b""
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                if payload is not None:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def do_POST(self):
+                started = time.perf_counter()
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                encoding = self.headers.get("Content-Encoding")
+                if encoding is not None and encoding not in server.accept_encodings:
+                    server._record(None, None, len(body), encoding, 415, started)
+                    return self.respond(415)
+                decoded = gzip.decompress(body) if encoding == "gzip" else zlib.decompress(body) if encoding == "deflate" else body
+                payload = json.loads(decoded)
+                try:
+                    route = server.route_for(payload["query"])
+                except KeyError:
+                    server._record(None, payload.get("variables"), len(body), encoding, 400, started)
+                    return self.respond(400, {"errors": [{"message": "Unknown query"}]})
+                with server._lock:
+                    retry_after = server._throttled()
+                    status = server._injected_status(route) if not retry_after else 429
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                time.sleep(server.route_latency.get(route, server.latency))
+                with server._lock:
+                    server.in_flight -= 1
+                    data = server.handle(route, payload["variables"]) if status is None else None
+                server._record(route, payload["variables"], len(body), encoding, status or 200, started)
+                if status == 429:
+                    return self.respond(429, {"errors": [{"message": "Too many requests"}]}, {"Retry-After": str(math.ceil(retry_after))})
+                if status is not None:
+                    return self.respond(status, {"errors": [{"message": "Injected error"}]})
+                self.respond(200, {"data": data})
+
+        return Handler
+
+    def route_for(self, query: str):
+        if query in self._routes:
+            return self._routes[query]
+        if "deploymentLogCreate" in query:
+            return GraphQLRoutes.CREATE_LOG  # batch_log_mutation
+        raise KeyError(query)
+
+    def handle(self, route: GraphQLRoutes, variables: dict):
+        if route is GraphQLRoutes.GET_STATE:
+            return {"deployment": {"state": json.dumps(self.state)}}
+        if route is GraphQLRoutes.GET_CREDENTIALS:
+            return {"deployment": {"credentials": json.dumps({"AWS_ROLE_ARN": "arn:aws:iam::123456789012:role/vectrix"})}}
+        if route is GraphQLRoutes.GET_LAST_SCAN_RESULTS:
+            last_scan = self.last_scan or {"assets": [], "issues": [], "events": []}
+            return {"deploymentLastScanResults": {kind: json.dumps(last_scan[kind]) for kind in ("assets", "issues", "events")}}
+        if route in (GraphQLRoutes.CREATE_AWS_SESSION, GraphQLRoutes.CREATE_AWS_SESSION_EXPIRATION):
+            if variables["input"]["awsExternalId"] in self.denied_external_ids:
+                return {"awsSessionCreate": {"errors": ["AccessDenied: not authorized to perform sts:AssumeRole"], "awsSession": None}}
+            aws_session = {"accessKeyId": "AKIA" + variables["input"]["awsExternalId"], "secretAccessKey": "secret", "sessionToken": "token"}
+            if route is GraphQLRoutes.CREATE_AWS_SESSION_EXPIRATION:
+                aws_session["expiration"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 3600))
+            return {"awsSessionCreate": {"errors": [], "awsSession": aws_session}}
+        if route is GraphQLRoutes.CREATE_LOG:
+            if "input" in variables:
+                self.logs.append(variables["input"])
+                return {"deploymentLogCreate": {"errors": []}}
+            for index in range(len(variables)):
+                self.logs.append(variables[f"input{index}"])
+            return {f"log{index}": {"errors": []} for index in range(len(variables))}
+        if route is GraphQLRoutes.OUTPUT_RESULTS:
+            self.last_scan = variables["input"]
+            self.state = json.loads(variables["input"]["state"])
+            return {"deploymentScanEntryCreate": {"errors": []}}
+        if route is GraphQLRoutes.OUTPUT_RESULTS_DELTA:
+            last_scan = self.last_scan or {"assets": [], "issues": [], "events": []}
+            self.last_scan = apply_delta(last_scan, variables["input"])
+            self.state = json.loads(variables["input"]["state"])
+            return {"deploymentScanDeltaCreate": {"errors": []}}
+        if route is GraphQLRoutes.CREATE_SCAN_SESSION:
+            scan_session_id = str(len(self.scan_sessions) + 1)
+            self.scan_sessions[scan_session_id] = {"assets": [], "issues": [], "events": []}
+            return {"deploymentScanSessionCreate": {"errors": [], "scanSession": {"id": scan_session_id}}}
+        if route is GraphQLRoutes.OUTPUT_RESULTS_CHUNK:
+            chunk = variables["input"]
+            for kind in ("assets", "issues", "events"):
+                self.scan_sessions[chunk["scanSessionId"]][kind].extend(chunk[kind])
+            return {"deploymentScanChunkCreate": {"errors": []}}
+        if route is GraphQLRoutes.COMPLETE_SCAN_SESSION:
+            self.last_scan = dict(self.scan_sessions.pop(variables["input"]["scanSessionId"]))
+            self.state = json.loads(variables["input"]["state"])
+            return {"deploymentScanSessionComplete": {"errors": []}}
+        return {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0, help="seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--max-rps", type=float, default=None, help="requests per second beyond which requests are answered with 429")
+    parser.add_argument("--seed", type=int, default=None)
+    arguments = parser.parse_args(argv)
+
+    server = StandInServer(latency=arguments.latency, error_rate=arguments.error_rate, error_status=arguments.error_status,
+                           max_requests_per_second=arguments.max_rps, seed=arguments.seed, host=arguments.host, port=arguments.port)
+    with server:
+        print(f"Vectrix stand-in API listening on {server.url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    print(json.dumps(server.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
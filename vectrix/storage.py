@@ -0,0 +1,455 @@
+"""
+Local development storage within the .vectrix directory
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from contextlib import contextmanager
+
+from .settings import STATE_COMPACT_AFTER, LOCAL_STORAGE_BACKEND
+
+SCAN_KINDS = ("assets", "issues", "events")
+
+
+def atomic_write(path: str, data: str):
+    """
+    Writes data to path through a temporary file that is renamed over path, so a crash never leaves a truncated file behind
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class JournaledStateStore:
+    """
+    Local development module state held as a snapshot (module_state.json) plus an append-only journal of patches applied since
+    (module_state.journal, one JSON object per line: {"set": {...}} or {"unset": key}).
+
+    Each set_state/unset_state only appends its own patch. Once the journal holds compact_after patches, the current state is
+    written as the new snapshot (atomically) and the journal is emptied. Loading replays the journal on top of the snapshot,
+    ignoring a trailing line that was only partially written.
+    """
+
+    def __init__(self, directory: str, compact_after: int = STATE_COMPACT_AFTER):
+        self.snapshot_path = os.path.join(directory, "module_state.json")
+        self.journal_path = os.path.join(directory, "module_state.journal")
+        self.compact_after = compact_after
+        self._journal = None
+        self._journal_entries = 0
+
+    def load(self):
+        """
+        :returns: dict containing the stored state
+        """
+        if not os.path.exists(self.snapshot_path):
+            atomic_write(self.snapshot_path, json.dumps({}))
+        with open(self.snapshot_path) as f:
+            state = json.load(f)
+
+        self._journal_entries = 0
+        partial_patch = False
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        partial_patch = True  # Partially written patch from a crash, it was never acknowledged
+                        break
+                    self.__apply(state, json.loads(line))
+                    self._journal_entries += 1
+
+        # Compacting also drops a partially written patch, so new patches aren't appended onto it
+        if partial_patch or self._journal_entries >= self.compact_after:
+            self.compact(state)
+        return state
+
+    @staticmethod
+    def __apply(state: dict, patch: dict):
+        if "set" in patch:
+            state.update(patch["set"])
+        else:
+            state.pop(patch["unset"], None)
+
+    def __append(self, patch: dict, state: dict):
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a")
+        self._journal.write(json.dumps(patch) + "\n")
+        self._journal.flush()
+        self._journal_entries += 1
+        if self._journal_entries >= self.compact_after:
+            self.compact(state)
+
+    def set(self, new_state: dict, state: dict):
+        """
+        Journals a set_state patch. state is the (already merged) current state, used when compacting.
+        """
+        self.__append({"set": new_state}, state)
+
+    def unset(self, key: str, state: dict):
+        """
+        Journals an unset_state patch. state is the (already updated) current state, used when compacting.
+        """
+        self.__append({"unset": key}, state)
+
+    def compact(self, state: dict):
+        """
+        Writes state as the new snapshot and empties the journal
+        """
+        atomic_write(self.snapshot_path, json.dumps(state))
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "w")
+        self._journal_entries = 0
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+class JsonScanResultsStore:
+    """
+    Local development last scan results held in last_scan_results.json
+    """
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, "last_scan_results.json")
+
+    def read(self):
+        """
+        :returns: dict with the 'assets', 'issues', and 'events' of the last scan
+        """
+        if not os.path.exists(self.path):
+            return {"assets": [], "issues": [], "events": []}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def write(self, results: dict):
+        atomic_write(self.path, json.dumps(results))
+
+    def open_writer(self):
+        return JsonScanResultsWriter(self.path)
+
+
+class JsonScanResultsWriter:
+    """
+    Incrementally writes last_scan_results.json in the same format as JsonScanResultsStore.write.
+    The file is only replaced once the writer is completed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path + ".tmp", "w")
+        self._file.write("{")
+        self._kinds = 0
+        self._first_item = True
+
+    def begin(self, kind: str):
+        if self._kinds:
+            self._file.write("], ")
+        self._file.write(f'"{kind}": [')
+        self._kinds += 1
+        self._first_item = True
+
+    def write(self, kind: str, item: dict, encoded: str):
+        if not self._first_item:
+            self._file.write(", ")
+        self._file.write(encoded)
+        self._first_item = False
+
+    def complete(self):
+        self._file.write("]}")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self.path + ".tmp")
+
+
+class SQLiteStore:
+    """
+    Local development state and last scan results held in a SQLite database (vectrix.db).
+
+    State keys are rows, so set_state/unset_state only write the keys they touch and get() reads a single key.
+    Scan items are rows indexed by asset id, type (asset type, issue, or event), issue asset references, and event time, so
+    single items can be looked up without loading the whole scan. The database runs in WAL mode with a busy timeout, so
+    several local worker processes can read and write it at once; a new scan is written under its own generation and only
+    replaces the previous one in a single short transaction once it is complete.
+
+    The replaced generation is kept until the next one replaces it, so lookups pinned to it (see StoredLastScanResults) keep
+    working across one output. Generations being written are tracked in meta along with the time their writer last committed.
+    Activating a generation deletes every other generation that is neither the replaced one nor being written, including
+    those left behind by writers that crashed or haven't committed for WRITER_TIMEOUT seconds.
+    """
+
+    BATCH_SIZE = 1000
+
+    # Seconds after which a writer that hasn't committed a batch is considered to have crashed
+    WRITER_TIMEOUT = 3600
+
+    def __init__(self, directory: str, timeout: float = 30):
+        self.path = os.path.join(directory, "vectrix.db")
+        self._connection = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._transaction() as cursor:
+            cursor.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            cursor.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            cursor.execute("""CREATE TABLE IF NOT EXISTS scan_items (
+                generation INTEGER NOT NULL, kind TEXT NOT NULL, position INTEGER NOT NULL,
+                item_id TEXT, item_type TEXT, event_time INTEGER, body TEXT NOT NULL,
+                PRIMARY KEY (generation, kind, position))""")
+            cursor.execute("CREATE INDEX IF NOT EXISTS scan_items_id ON scan_items (generation, item_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS scan_items_type ON scan_items (generation, kind, item_type)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS scan_items_time ON scan_items (generation, kind, event_time)")
+            cursor.execute("""CREATE TABLE IF NOT EXISTS issue_assets (
+                generation INTEGER NOT NULL, position INTEGER NOT NULL, asset_id TEXT NOT NULL)""")
+            cursor.execute("CREATE INDEX IF NOT EXISTS issue_assets_id ON issue_assets (generation, asset_id)")
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+
+    def _query(self, sql: str, parameters=()):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    # State
+
+    def load(self):
+        """
+        :returns: dict containing the stored state
+        """
+        return {key: json.loads(value) for key, value in self._query("SELECT key, value FROM state")}
+
+    def get(self, key: str, default=None):
+        rows = self._query("SELECT value FROM state WHERE key = ?", (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def set(self, new_state: dict, state: dict = None):
+        with self._transaction() as cursor:
+            cursor.executemany("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                               [(key, json.dumps(value)) for key, value in new_state.items()])
+
+    def unset(self, key: str, state: dict = None):
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    # Scan results
+
+    def scan_generation(self):
+        """
+        :returns: generation of the last scan (0 before any scan was stored)
+        """
+        rows = self._query("SELECT value FROM meta WHERE key = 'scan_generation'")
+        return rows[0][0] if rows else 0
+
+    def _next_generation(self):
+        with self._transaction() as cursor:
+            cursor.execute("INSERT INTO meta (key, value) VALUES ('next_generation', 1) "
+                           "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+            generation = cursor.execute("SELECT value FROM meta WHERE key = 'next_generation'").fetchone()[0]
+            cursor.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (self.__writer_key(generation), int(time.time())))
+            return generation
+
+    @staticmethod
+    def __writer_key(generation: int):
+        return "writer:{0}".format(generation)
+
+    def _heartbeat(self, cursor, generation: int):
+        """
+        Records that the writer of generation is still alive. Raises if its generation was discarded as stale in the meantime.
+        """
+        cursor.execute("UPDATE meta SET value = ? WHERE key = ?", (int(time.time()), self.__writer_key(generation)))
+        if cursor.rowcount == 0:
+            raise RuntimeError(f"scan results writer of generation {generation} timed out and was discarded")
+
+    def _activate(self, generation: int):
+        with self._transaction() as cursor:
+            self._heartbeat(cursor, generation)
+            cursor.execute("DELETE FROM meta WHERE key = ?", (self.__writer_key(generation),))
+            meta = dict(cursor.execute("SELECT key, value FROM meta WHERE key IN ('scan_generation', 'next_generation', 'cleaned_generation')"))
+            replaced = meta.get("scan_generation")
+            cursor.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('scan_generation', ?)", (generation,))
+            if replaced is not None:
+                cursor.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('previous_scan_generation', ?)", (replaced,))
+
+            kept = {generation} if replaced is None else {generation, replaced}
+            stale_before = int(time.time()) - self.WRITER_TIMEOUT
+            for key, heartbeat in cursor.execute("SELECT key, value FROM meta WHERE key LIKE 'writer:%'").fetchall():
+                if heartbeat < stale_before:
+                    cursor.execute("DELETE FROM meta WHERE key = ?", (key,))
+                else:
+                    kept.add(int(key.split(":")[1]))
+            # Every generation below cleaned_generation other than the kept ones was already deleted
+            bounds = (meta.get("cleaned_generation", 0), meta["next_generation"])
+            placeholders = ", ".join("?" * len(kept))
+            for table in ("scan_items", "issue_assets"):
+                cursor.execute(f"DELETE FROM {table} WHERE generation >= ? AND generation <= ? AND generation NOT IN ({placeholders})",
+                               bounds + tuple(kept))
+            cursor.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('cleaned_generation', ?)", (min(kept),))
+
+    def _discard(self, generation: int):
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM meta WHERE key = ?", (self.__writer_key(generation),))
+            cursor.execute("DELETE FROM scan_items WHERE generation = ?", (generation,))
+            cursor.execute("DELETE FROM issue_assets WHERE generation = ?", (generation,))
+
+    def read(self, generation: int = None):
+        """
+        :returns: dict with the 'assets', 'issues', and 'events' of the last scan (or of the given generation)
+        """
+        results = {kind: [] for kind in SCAN_KINDS}
+        rows = self._query("SELECT kind, body FROM scan_items WHERE generation = ? ORDER BY kind, position",
+                           (self.__generation(generation),))
+        for kind, body in rows:
+            results[kind].append(json.loads(body))
+        return results
+
+    def __generation(self, generation: int = None):
+        return generation if generation is not None else self.scan_generation()
+
+    def write(self, results: dict):
+        writer = self.open_writer()
+        try:
+            for kind in SCAN_KINDS:
+                writer.begin(kind)
+                for item in results.get(kind) or ():
+                    writer.write(kind, item, json.dumps(item))
+        except BaseException:
+            writer.abort()
+            raise
+        writer.complete()
+
+    def open_writer(self):
+        return SQLiteScanResultsWriter(self)
+
+    # Lookups read the last scan, or the given generation of it
+
+    def get_asset(self, asset_id: str, generation: int = None):
+        rows = self._query("SELECT body FROM scan_items WHERE generation = ? AND kind = 'assets' AND item_id = ?",
+                           (self.__generation(generation), asset_id))
+        return json.loads(rows[0][0]) if rows else None
+
+    def assets_of_type(self, asset_type: str, generation: int = None):
+        rows = self._query("SELECT body FROM scan_items WHERE generation = ? AND kind = 'assets' AND item_type = ? ORDER BY position",
+                           (self.__generation(generation), asset_type))
+        return [json.loads(body) for body, in rows]
+
+    def issues_for_asset(self, asset_id: str, generation: int = None):
+        rows = self._query("""SELECT DISTINCT scan_items.position, body FROM issue_assets
+            JOIN scan_items ON scan_items.generation = issue_assets.generation AND scan_items.kind = 'issues'
+                AND scan_items.position = issue_assets.position
+            WHERE issue_assets.generation = ? AND issue_assets.asset_id = ? ORDER BY scan_items.position""",
+                           (self.__generation(generation), asset_id))
+        return [json.loads(body) for _, body in rows]
+
+    def events_of_type(self, event: str, start: int = None, end: int = None, generation: int = None):
+        """
+        Events of the given type with start <= event_time < end (either bound is optional), ordered by event_time
+        """
+        sql = "SELECT body FROM scan_items WHERE generation = ? AND kind = 'events' AND item_type = ?"
+        parameters = [self.__generation(generation), event]
+        if start is not None:
+            sql += " AND event_time >= ?"
+            parameters.append(start)
+        if end is not None:
+            sql += " AND event_time < ?"
+            parameters.append(end)
+        rows = self._query(sql + " ORDER BY event_time, position", parameters)
+        return [json.loads(body) for body, in rows]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class SQLiteScanResultsWriter:
+    """
+    Incrementally writes scan items into a new generation of a SQLiteStore, committing every SQLiteStore.BATCH_SIZE items.
+    The previous scan stays readable until the writer is completed.
+    """
+
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+        self.generation = store._next_generation()
+        self._positions = {kind: 0 for kind in SCAN_KINDS}
+        self._items = []
+        self._issue_assets = []
+
+    def begin(self, kind: str):
+        pass
+
+    def write(self, kind: str, item: dict, encoded: str):
+        position = self._positions[kind]
+        self._positions[kind] += 1
+        if kind == "assets":
+            row = (item.get("id"), item.get("type"), None)
+        elif kind == "issues":
+            row = (None, item.get("issue"), None)
+            self._issue_assets.extend((self.generation, position, asset_id) for asset_id in item.get("asset_id") or ())
+        else:
+            row = (None, item.get("event"), item.get("event_time"))
+        self._items.append((self.generation, kind, position) + row + (encoded,))
+        if len(self._items) >= SQLiteStore.BATCH_SIZE:
+            self.__flush()
+
+    def __flush(self):
+        with self.store._transaction() as cursor:
+            self.store._heartbeat(cursor, self.generation)
+            cursor.executemany("INSERT INTO scan_items (generation, kind, position, item_id, item_type, event_time, body) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)", self._items)
+            cursor.executemany("INSERT INTO issue_assets (generation, position, asset_id) VALUES (?, ?, ?)", self._issue_assets)
+        self._items = []
+        self._issue_assets = []
+
+    def complete(self):
+        self.__flush()
+        self.store._activate(self.generation)
+
+    def abort(self):
+        self._items = []
+        self._issue_assets = []
+        self.store._discard(self.generation)
+
+
+STORAGE_BACKENDS = ("json", "sqlite")
+
+_local_storage = {}
+_local_storage_lock = threading.Lock()
+
+
+def local_storage(directory: str, backend: str = LOCAL_STORAGE_BACKEND):
+    """
+    Returns the (state store, scan results store) pair of the given backend for a .vectrix directory.
+    Stores are created once per directory and backend.
+    """
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(
+            f"LOCAL_STORAGE_BACKEND is required to be one of {str(list(STORAGE_BACKENDS))}")
+    with _local_storage_lock:
+        key = (backend, os.path.abspath(directory))
+        if key not in _local_storage:
+            if backend == "sqlite":
+                store = SQLiteStore(directory)
+                _local_storage[key] = (store, store)
+            else:
+                _local_storage[key] = (JournaledStateStore(directory), JsonScanResultsStore(directory))
+        return _local_storage[key]
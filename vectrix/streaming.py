@@ -0,0 +1,185 @@
+"""
+Incremental (streaming) output of assets, issues, and events
+"""
+import sys
+import json
+
+from .assets import Asset
+from .events import Event
+from .issues import Issue
+
+from .graphql.routes import GraphQLRoutes
+from .graphql.client import graphql_client
+from .graphql.utils import convert_item
+from .graphql.encoder import json_backend, encode_item, assemble_output_body
+from .checks import output_validator
+
+OUTPUT_KINDS = ("assets", "issues", "events")
+
+
+def iter_output_items(assets=None, issues=None, events=None):
+    """
+    Validates assets, issues, and events one item at a time and yields (kind, item dict) tuples.
+    Assets are consumed first, then issues, then events, so issue references can be checked against every asset id seen.
+    Only the asset ids are held in memory.
+    """
+    asset_ids = set()
+    for asset in assets or ():
+        if isinstance(asset, Asset):
+            asset = asset.to_dict()
+        output_validator.validate_asset(asset)
+        output_validator.add_asset_id(asset['id'], asset_ids)
+        yield "assets", asset
+
+    for issue in issues or ():
+        if isinstance(issue, Issue):
+            issue = issue.to_dict()
+        output_validator.validate_issue(issue)
+        output_validator.check_issue_references((issue,), asset_ids)
+        yield "issues", issue
+
+    for event in events or ():
+        if isinstance(event, Event):
+            event = event.to_dict()
+        output_validator.validate_event(event)
+        yield "events", event
+
+
+class ScanSessionUploader:
+    """
+    Sends converted items to the Vectrix API in bounded chunks within a single scan session.
+    A chunk is sent once it holds chunk_size items or roughly chunk_bytes bytes, whichever comes first.
+    The scan session only becomes the module's last scan once complete() is called.
+    """
+
+    def __init__(self, chunk_size: int, chunk_bytes: int):
+        if chunk_size < 1:
+            raise ValueError("chunk_size is required to be at least 1")
+        self.chunk_size = chunk_size
+        self.chunk_bytes = chunk_bytes
+        self._backend = json_backend()
+        self.scan_session_id = None
+        self.chunks_sent = 0
+        self.__reset_chunk()
+
+    def __reset_chunk(self):
+        self._chunk = {kind: [] for kind in OUTPUT_KINDS}
+        self._chunk_items = 0
+        self._chunk_size_bytes = 0
+
+    @staticmethod
+    def __check_errors(response, mutation_name: str, message: str):
+        mutation = response.get(mutation_name, None)
+        errors = mutation.get("errors", None)
+        if len(errors) != 0:
+            raise Exception(f"{message}: {str(errors)}")
+        return mutation
+
+    def start(self):
+        """
+        Opens the scan session that every chunk is sent under
+        """
+        response = graphql_client(route=GraphQLRoutes.CREATE_SCAN_SESSION)
+        mutation = self.__check_errors(
+            response, "deploymentScanSessionCreate", "Failed creating scan session in Vectrix API")
+        self.scan_session_id = mutation.get("scanSession").get("id")
+
+    def add(self, kind: str, item: dict):
+        """
+        Adds a validated item to the current chunk, sending the chunk when it is full
+        """
+        converted = convert_item(item)
+        self._chunk[kind].append(converted)
+        self._chunk_items += 1
+        # The converted item already holds its metadata as a JSON string, so its encoding counts every field once
+        self._chunk_size_bytes += len(self._backend.dumps(converted))
+        if self._chunk_items >= self.chunk_size or self._chunk_size_bytes >= self.chunk_bytes:
+            self.flush()
+
+    def flush(self):
+        """
+        Sends the current chunk (if it holds any items)
+        """
+        if self._chunk_items == 0:
+            return
+        chunk_input = {"scan_session_id": self.scan_session_id}
+        chunk_input.update(self._chunk)
+        response = graphql_client(
+            route=GraphQLRoutes.OUTPUT_RESULTS_CHUNK, variables={"input": chunk_input})
+        self.__check_errors(response, "deploymentScanChunkCreate",
+                            "Failed outputting scan results chunk to Vectrix API")
+        self.chunks_sent += 1
+        self.__reset_chunk()
+
+    def complete(self, state: dict):
+        """
+        Sends the remaining items and completes the scan session along with the module state
+        """
+        self.flush()
+        response = graphql_client(route=GraphQLRoutes.COMPLETE_SCAN_SESSION, variables={"input": {
+            "scan_session_id": self.scan_session_id, "state": str(json.dumps(state))}})
+        self.__check_errors(response, "deploymentScanSessionComplete",
+                            "Failed completing scan session in Vectrix API")
+
+
+class OutputBodyBuilder:
+    """
+    Encodes validated items as they arrive and builds a single deploymentScanEntryCreate request body out of them, the way
+    output sends scan results. Only the encoded items are held in memory.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or json_backend()
+        self._encoded = {kind: [] for kind in OUTPUT_KINDS}
+
+    def add(self, kind: str, item: dict):
+        self._encoded[kind].append(encode_item(item, self.backend))
+
+    def body(self, state: dict):
+        encoded = [b"[" + self.backend.item_separator.join(self._encoded[kind]) + b"]" for kind in OUTPUT_KINDS]
+        return assemble_output_body(GraphQLRoutes.OUTPUT_RESULTS.value, *encoded, state, self.backend)
+
+
+class DevScanResultsWriter:
+    """
+    Prints items as they arrive, producing the same output as VectrixUtils.output in local development mode without
+    holding the items in memory, and forwards them to a local storage results writer.
+    """
+
+    def __init__(self, results_writer):
+        self._results_writer = results_writer
+        self._kind = None
+        self._first_item = True
+        print("(DEV MODE) Vectrix Detection Pack Output:")
+
+    def __begin(self, kind: str):
+        if self._kind is not None:
+            print("]")
+        print(f"**** {kind.upper()} ****")
+        sys.stdout.write("[")
+        self._results_writer.begin(kind)
+        self._kind = kind
+        self._first_item = True
+
+    def __advance_to(self, kind: str):
+        """
+        Begins every kind up to and including kind (kinds always arrive in OUTPUT_KINDS order)
+        """
+        while self._kind != kind:
+            next_index = 0 if self._kind is None else OUTPUT_KINDS.index(self._kind) + 1
+            self.__begin(OUTPUT_KINDS[next_index])
+
+    def write(self, kind: str, item: dict):
+        self.__advance_to(kind)
+        encoded = json.dumps(item)
+        sys.stdout.write(encoded if self._first_item else ", " + encoded)
+        self._results_writer.write(kind, item, encoded)
+        self._first_item = False
+
+    def complete(self):
+        self.__advance_to(OUTPUT_KINDS[-1])
+        print("]")
+        self._results_writer.complete()
+
+    def abort(self):
+        self._results_writer.abort()
@@ -0,0 +1,127 @@
+"""
+Cache of the content hashes of items that passed validation, persisted across scans
+"""
+import os
+import json
+import hashlib
+import logging
+
+from collections import OrderedDict
+
+from .storage import atomic_write
+from .settings import VALIDATION_CACHE_SIZE
+
+logger = logging.getLogger()
+
+VALIDATION_MODES = ("strict", "cached", "off")
+
+# Version of the per-item checks (OutputValidator). Cache files start with it, and caches written for another version are
+# discarded, so items validated by an earlier SDK are checked against new rules after an upgrade
+VALIDATOR_VERSION = 1
+CACHE_HEADER = "vectrix-validation-cache {0}".format(VALIDATOR_VERSION)
+
+try:
+    import orjson
+    HASH_ENCODER = "orjson"
+
+    def canonical_bytes(item: dict):
+        try:
+            return orjson.dumps(item, option=orjson.OPT_SORT_KEYS)
+        except orjson.JSONEncodeError:
+            return json.dumps(item, sort_keys=True, separators=(",", ":")).encode("utf-8")
+except ImportError:
+    HASH_ENCODER = "json"
+
+    def canonical_bytes(item: dict):
+        return json.dumps(item, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def item_hash(kind: str, item: dict):
+    """
+    Hash of the content of an item, independent of key order. None if the item can't be serialized (it then can't be valid either).
+    Hashing costs nearly as much as the per-item checks it skips, and with the json module it costs about three times as much,
+    so output only uses the cache with orjson installed (see ValidationCache).
+    """
+    try:
+        encoded = canonical_bytes(item)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.blake2b(kind.encode("utf-8") + b"\0" + encoded, digest_size=16).hexdigest()
+
+
+class ValidationCache:
+    """
+    Bounded set of hashes of items that passed the per-item checks, evicting the least recently seen hash once full.
+    The cache is loaded from and saved to a file (a CACHE_HEADER line, then one hash per line, least recently seen first), so it
+    carries over to the next scan. A file with another header was written for other checks and is discarded.
+
+    The speedup is modest: benchmarks/validation_cache validates 50,000 unchanged assets with 10 metadata elements each in 0.19s
+    with a warm cache against 0.22s strictly (1.1x) with orjson, and in 0.74s (0.3x) with the json module, which is why output
+    falls back to strict validation without orjson.
+    """
+
+    def __init__(self, path: str = None, max_size: int = VALIDATION_CACHE_SIZE):
+        if max_size < 1:
+            raise ValueError("max_size is required to be at least 1")
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._hashes = OrderedDict()
+        self._changed = False
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def __contains__(self, digest):
+        if digest in self._hashes:
+            self._hashes.move_to_end(digest)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def stats(self):
+        """
+        :returns: dict with the number of items that skipped validation (hits), that were validated (misses), and cached hashes
+        """
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self._hashes), "max_size": self.max_size}
+
+    def add(self, digests):
+        for digest in digests:
+            self._hashes[digest] = None
+            self._hashes.move_to_end(digest)
+            self._changed = True
+        while len(self._hashes) > self.max_size:
+            self._hashes.popitem(last=False)
+
+    def clear(self):
+        self._hashes.clear()
+        self._changed = True
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                if f.readline().strip() != CACHE_HEADER:
+                    logger.info("Discarding validation cache written for another validator version")
+                    self._changed = True
+                    return
+                self.add(line.strip() for line in f if line.strip())
+        except OSError as e:
+            logger.warning(f"Could not load validation cache: {str(e)}")
+        self._changed = False
+
+    def save(self):
+        """
+        Writes the cache to its file if hashes were added since it was loaded
+        """
+        if self.path is None or not self._changed:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            atomic_write(self.path, CACHE_HEADER + "\n" + "".join(digest + "\n" for digest in self._hashes))
+            self._changed = False
+        except OSError as e:
+            logger.warning(f"Could not save validation cache: {str(e)}")